@@ -0,0 +1,10 @@
+# Benchmarks for the batched tools, run from Maya's script editor, e.g.
+#   from CETools.benchmarks import retime; retime.benchmark_retime()
+# Each one builds its own test scene, times the batched path against the command loop it replaced, checks both give
+# the same result, deletes what it made and returns the numbers.
+
+
+def report(name, reference_seconds, batched_seconds, mismatches, detail=''):
+    print(f'{name}: command loop {reference_seconds:.2f}s, batched {batched_seconds:.2f}s '
+          f'({reference_seconds / max(batched_seconds, 1e-9):.1f}x){detail}')
+    print(f'{name} parity: {"ok" if not mismatches else ", ".join(mismatches) + " differ"}')
@@ -0,0 +1,74 @@
+import time
+
+import numpy as np
+import maya.cmds as cmds
+
+from CETools.benchmarks import report
+from CETools.functions.commonFunctions import set_keys
+from CETools.functions.matchmove import RETIME_ATTRIBUTES, retime_keys
+
+
+def command_retime_keys(targets, old_time, new_time):
+    # The loop run_retime used before retime_keys, unchanged: a keyframe query and a setKeyframe per sample, reads
+    # and writes interleaved
+    end_frame = 0.0
+    for target in targets:
+        for o, n in zip(old_time, new_time):
+            for at in ['translateX', 'translateY', 'translateZ', 'rotateX', 'rotateY', 'rotateZ']:
+                cmds.setAttr(f"{target}.{at}", lock=False)
+                value = cmds.keyframe(target, q=1, at=at, eval=1, t=(o,))
+                if value:
+                    cmds.setKeyframe(target, time=(n,), v=value[0], at=at)
+                if end_frame == 0.0:
+                    if o > max(new_time):
+                        end_frame = n
+    return end_frame
+
+
+def curve_keys(node, attribute):
+    # (keys, 2) times and values, and the in and out tangent type of every key
+    keys = np.reshape(np.array(cmds.keyframe(node, q=1, at=attribute, tc=1, vc=1) or [], dtype=np.float64), (-1, 2))
+    return keys, cmds.keyTangent(node, q=1, at=attribute, itt=1, ott=1) or []
+
+
+def benchmark_retime(frame_count=2000, object_count=20, tolerance=1e-6):
+    # Keys two identical sets of locators, retimes one with retime_keys and the other with the old command loop and
+    # checks key times, values and tangent types match. The new frames are placed after the keyed range, where the
+    # old loop never reads back a key it wrote itself, so both are expected to give the same curves.
+    rng = np.random.default_rng(0)
+    key_times = np.arange(1001, 1001 + frame_count, dtype=np.float64)
+    curves = rng.normal(size=(object_count, len(RETIME_ATTRIBUTES), frame_count)).cumsum(axis=2)
+    # Slow the plate down to 80 %, so most new frames land between whole frames
+    old_time = key_times.copy()
+    new_time = key_times[-1] + 10 + (old_time - 1001) * 0.8
+
+    engine_nodes, command_nodes = [], []
+    for nodes, label in ((engine_nodes, 'engine'), (command_nodes, 'command')):
+        for i in range(object_count):
+            loc = cmds.spaceLocator(name=f'CE_bench_retime_{label}_{i}')[0]
+            for a, at in enumerate(RETIME_ATTRIBUTES):
+                set_keys(loc, at, key_times, curves[i, a])
+            nodes.append(loc)
+
+    start = time.perf_counter()
+    engine_end = retime_keys(engine_nodes, old_time, new_time)
+    engine_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    command_end = command_retime_keys(command_nodes, old_time, new_time)
+    command_seconds = time.perf_counter() - start
+
+    mismatches = [] if engine_end == command_end else ['end frame']
+    for engine_node, command_node in zip(engine_nodes, command_nodes):
+        for at in RETIME_ATTRIBUTES:
+            engine_keys, engine_tangents = curve_keys(engine_node, at)
+            command_keys, command_tangents = curve_keys(command_node, at)
+            if engine_keys.shape != command_keys.shape or not np.allclose(engine_keys, command_keys, atol=tolerance):
+                mismatches.append(f'{engine_node}.{at} keys')
+            if engine_tangents != command_tangents:
+                mismatches.append(f'{engine_node}.{at} tangents')
+
+    cmds.delete(engine_nodes + command_nodes)
+
+    report('retime', command_seconds, engine_seconds, mismatches)
+    return {'command_seconds': command_seconds, 'engine_seconds': engine_seconds, 'mismatches': mismatches}
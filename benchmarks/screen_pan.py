@@ -0,0 +1,71 @@
+import time
+
+import numpy as np
+import maya.cmds as cmds
+import maya.api.OpenMaya as om2
+
+from CETools.benchmarks import report
+from CETools.functions.commonFunctions import set_keys
+from CETools.functions.matchmove import pan_settings, key_screen_pan
+
+
+def command_screen_pan(camera, target, frames, focal_length):
+    # The frame by frame loop cam_focus_2d ran before key_screen_pan
+    camera_scale, h_film_offset, v_film_offset = pan_settings(camera)
+    for f in frames:
+        cam_world = om2.MMatrix(cmds.getAttr('%s.worldMatrix' % camera, t=f))
+        sel_pos = om2.MPoint(cmds.getAttr('%s.worldPosition[0]' % target, t=f)[0])
+
+        relative_pos = sel_pos * cam_world.inverse()
+
+        x = -(focal_length * (relative_pos[0] / relative_pos[2])) / 25.4
+        y = -(focal_length * (relative_pos[1] / relative_pos[2])) / 25.4
+
+        horizontal_pan = (x / camera_scale) - h_film_offset
+        vertical_pan = (y / camera_scale) - v_film_offset
+
+        cmds.setAttr('%s.horizontalPan' % camera, horizontal_pan)
+        cmds.setAttr('%s.verticalPan' % camera, vertical_pan)
+
+        cmds.setKeyframe('%s.horizontalPan' % camera, time=f, v=horizontal_pan)
+        cmds.setKeyframe('%s.verticalPan' % camera, time=f, v=vertical_pan)
+
+
+def benchmark_cam_focus_2d(frame_count=5000, tolerance=1e-6):
+    # Pans two identical cameras onto the same moving locator, one with the frame loop and one with key_screen_pan,
+    # and checks the pan keys and their tangent types match
+    rng = np.random.default_rng(0)
+    frames = np.arange(1001, 1001 + frame_count, dtype=np.float64)
+    motion = rng.normal(scale=0.05, size=(frame_count, 6)).cumsum(axis=0)
+
+    target = cmds.spaceLocator(name='CE_bench_pan_target')[0]
+    cmds.setAttr(f'{target}.translateZ', -50)
+    cameras = []
+    for label in ('command', 'engine'):
+        camera = cmds.camera(name=f'CE_bench_pan_{label}')[0]
+        for i, at in enumerate(('tx', 'ty', 'tz', 'rx', 'ry', 'rz')):
+            set_keys(camera, at, frames, motion[:, i])
+        cameras.append(camera)
+    shapes = [cmds.listRelatives(camera, s=1, f=1)[0] for camera in cameras]
+    focal_length = cmds.getAttr(f'{cameras[0]}.focalLength')
+
+    start = time.perf_counter()
+    command_screen_pan(cameras[0], target, frames, focal_length)
+    command_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    key_screen_pan(cameras[1], target, frames, focal_length)
+    engine_seconds = time.perf_counter() - start
+
+    mismatches = []
+    for at in ('horizontalPan', 'verticalPan'):
+        keys = [np.array(cmds.keyframe(shape, q=1, at=at, tc=1, vc=1), dtype=np.float64) for shape in shapes]
+        if keys[0].shape != keys[1].shape or not np.allclose(keys[0], keys[1], atol=tolerance):
+            mismatches.append(f'{at} keys')
+        if len({tuple(cmds.keyTangent(shape, q=1, at=at, itt=1, ott=1)) for shape in shapes}) != 1:
+            mismatches.append(f'{at} tangents')
+
+    cmds.delete(cameras + [target])
+
+    report('cam_focus_2d', command_seconds, engine_seconds, mismatches, f' for {frame_count} frames')
+    return {'command_seconds': command_seconds, 'engine_seconds': engine_seconds, 'mismatches': mismatches}
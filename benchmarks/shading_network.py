@@ -0,0 +1,98 @@
+import time
+
+import maya.cmds as cmds
+
+from CETools.benchmarks import report
+from CETools.functions.shading_network import NetworkSpec, PLACE2D_ATTRIBUTES, build_network
+
+
+class CommandCounter(object):
+    # Counts every maya.cmds call made while active, plugin commands included, by wrapping the commands
+    def __init__(self):
+        self.count = 0
+        self.originals = {}
+
+    def __enter__(self):
+        for name in dir(cmds):
+            command = getattr(cmds, name)
+            if not name.startswith('_') and callable(command):
+                self.originals[name] = command
+                setattr(cmds, name, self.counted(command))
+        return self
+
+    def __exit__(self, typ, val, tb):
+        for name, command in self.originals.items():
+            setattr(cmds, name, command)
+        self.originals = {}
+
+    def counted(self, command):
+        def wrapper(*args, **kwargs):
+            self.count += 1
+            return command(*args, **kwargs)
+        return wrapper
+
+
+def command_build(material_count, textures_per_material):
+    # How connect_textures built networks before specs, a shadingNode, connectAttr or setAttr per node and plug
+    created = []
+    for m in range(material_count):
+        shader = cmds.shadingNode('lambert', asShader=True, name=f'CE_bench_cmds_{m}')
+        created.append(shader)
+        for t in range(textures_per_material):
+            file_node = cmds.shadingNode('file', asTexture=True, isColorManaged=True, name=f'{shader}_file{t}')
+            place_2d_texture = cmds.shadingNode('place2dTexture', asUtility=True)
+            created.extend((file_node, place_2d_texture))
+            cmds.connectAttr(f'{place_2d_texture}.outUV', f'{file_node}.uvCoord', f=True)
+            cmds.connectAttr(f'{place_2d_texture}.outUvFilterSize', f'{file_node}.uvFilterSize', f=True)
+            for attribute in PLACE2D_ATTRIBUTES:
+                cmds.connectAttr(f'{place_2d_texture}.{attribute}', f'{file_node}.{attribute}', f=True)
+            cmds.setAttr(f'{file_node}.fileTextureName', f'/textures/bench_{m}_{t}.png', type='string')
+    return created
+
+
+def spec_build(material_count, textures_per_material):
+    spec = NetworkSpec()
+    for m in range(material_count):
+        spec.shader('lambert', f'CE_bench_spec_{m}')
+        for t in range(textures_per_material):
+            spec.file_texture(f'CE_bench_spec_{m}_file{t}', f'/textures/bench_{m}_{t}.png')
+    return spec, build_network(spec)
+
+
+def file_summary(file_node):
+    # What a file node ends up with: its texture, a place2dTexture feeding its uvs, a hypershade texture list entry
+    # and color management
+    return (cmds.getAttr(f'{file_node}.fileTextureName'),
+            bool(cmds.listConnections(f'{file_node}.uvCoord', s=1, d=0, type='place2dTexture')),
+            bool(cmds.listConnections(f'{file_node}.message', s=0, d=1, type='defaultTextureList')),
+            bool(cmds.listConnections(f'{file_node}.colorManagementEnabled', s=1, d=0)))
+
+
+def benchmark_build(material_count=300, textures_per_material=4):
+    # Builds the same file texture networks command by command and through a spec, counts the maya.cmds calls each
+    # one makes and times them, then deletes everything it made
+    with CommandCounter() as command_counter:
+        start = time.perf_counter()
+        created = command_build(material_count, textures_per_material)
+        command_seconds = time.perf_counter() - start
+    command_nodes = len(created)
+    command_files = [node for node in created if cmds.nodeType(node) == 'file']
+
+    with CommandCounter() as spec_counter:
+        start = time.perf_counter()
+        spec, spec_nodes = spec_build(material_count, textures_per_material)
+        spec_seconds = time.perf_counter() - start
+    created.extend(spec_nodes)
+
+    spec_files = [name for name, node_spec in zip(spec_nodes, spec.nodes) if node_spec.node_type == 'file']
+    mismatches = [] if list(map(file_summary, command_files)) == list(map(file_summary, spec_files)) else \
+        ['file nodes']
+
+    cmds.delete([node for node in created if cmds.objExists(node)])
+
+    report('build_network', command_seconds, spec_seconds, mismatches,
+           f', {command_counter.count} commands and {command_nodes} nodes against {spec_counter.count} commands and '
+           f'{len(spec_nodes)} nodes')
+    return {'command_seconds': command_seconds, 'command_count': command_counter.count,
+            'command_nodes': command_nodes, 'spec_seconds': spec_seconds, 'spec_count': spec_counter.count,
+            'spec_nodes': len(spec_nodes)}
@@ -1,7 +1,12 @@
 import os
 import math
 
+import numpy as np
 import maya.cmds as cmds
+import maya.api.OpenMaya as om2
+import maya.api.OpenMayaAnim as oma
+
+from CETools.functions.matrix_math import to_matrices
 
 
 class UndoStack(object):
@@ -15,6 +20,46 @@ class UndoStack(object):
         cmds.undoInfo(closeChunk=True)
 
 
+MODIFIER_PLUGIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'plugins',
+                               'ce_modifier_command.py')
+_pending_modifiers = []
+
+
+def do_modifier(modifier):
+    # Run an MDGModifier/MDagModifier as a single undoable ceDoModifier command instead of calling doIt() directly,
+    # which would leave the edit out of the undo queue
+    if not cmds.pluginInfo(MODIFIER_PLUGIN, q=True, loaded=True):
+        cmds.loadPlugin(MODIFIER_PLUGIN, quiet=True)
+    _pending_modifiers.append(modifier)
+    try:
+        cmds.ceDoModifier()
+    finally:
+        # Only left over when the command failed before picking it up
+        if _pending_modifiers and _pending_modifiers[-1] is modifier:
+            _pending_modifiers.pop()
+
+
+def take_pending_modifier():
+    return _pending_modifiers.pop() if _pending_modifiers else None
+
+
+class EvaluationMode(object):
+    # Temporarily switch the evaluation manager mode ('off' for DG, 'serial' or 'parallel'), restoring it after
+    def __init__(self, mode=None):
+        self.mode = mode
+        self.previous_mode = None
+
+    def __enter__(self):
+        if self.mode:
+            self.previous_mode = cmds.evaluationManager(q=True, mode=True)[0]
+            if self.previous_mode != self.mode:
+                cmds.evaluationManager(mode=self.mode)
+
+    def __exit__(self, typ, val, tb):
+        if self.mode and self.previous_mode != self.mode:
+            cmds.evaluationManager(mode=self.previous_mode)
+
+
 def refresh_dir(text_fields):
     scene_file = cmds.file(q=1, loc=1, un=0)
     if '/tasks' in scene_file:
@@ -141,6 +186,279 @@ def get_manip_xform(ctx):
     return pos, rot
 
 
+def get_playback_frames():
+    frame_start = cmds.playbackOptions(q=True, minTime=True)
+    frame_end = cmds.playbackOptions(q=True, maxTime=True)
+    return np.arange(int(frame_start), int(frame_end) + 1, dtype=np.float64)
+
+
+SCENE_MESSAGES = (om2.MSceneMessage.kAfterNew, om2.MSceneMessage.kAfterOpen, om2.MSceneMessage.kAfterImport,
+                  om2.MSceneMessage.kAfterCreateReference, om2.MSceneMessage.kAfterRemoveReference,
+                  om2.MSceneMessage.kAfterLoadReference, om2.MSceneMessage.kAfterUnloadReference)
+
+
+def add_scene_callbacks(callback):
+    # Call back on new/open/import, reference changes and undo/redo. Returns the callback ids.
+    callback_ids = [om2.MSceneMessage.addCallback(message, callback) for message in SCENE_MESSAGES]
+    for event in ('Undo', 'Redo'):
+        callback_ids.append(om2.MEventMessage.addEventCallback(event, callback))
+    return callback_ids
+
+
+# Attribute changes that can move a node: values set, inputs connected or disconnected
+_sample_changes = (om2.MNodeMessage.kAttributeSet | om2.MNodeMessage.kConnectionMade |
+                   om2.MNodeMessage.kConnectionBroken)
+
+
+def node_uuid(node):
+    return om2.MFnDependencyNode(node).uuid().asString()
+
+
+def upstream_nodes(node, depth=2):
+    # Non-DAG nodes feeding node, anim curves and the pairBlends and unit conversions between them and the node
+    found = []
+    pending = [node]
+    for _ in range(depth):
+        sources = []
+        for current in pending:
+            for plug in om2.MFnDependencyNode(current).getConnections():
+                if not plug.isDestination:
+                    continue
+                source = plug.source().node()
+                if not source.hasFn(om2.MFn.kDagNode) and not any(source == other for other in found + sources):
+                    sources.append(source)
+        found.extend(sources)
+        pending = sources
+    return found
+
+
+class TransformSampleCache(object):
+    # Per-node world matrices over a frame range, kept between tool runs and keyed by node UUID so renames and
+    # reparents of the same node keep hitting the cache. A node's samples are dropped when an attribute on it, on
+    # one of its parents or on the anim curves driving them is set or connected, when any of them is reparented and
+    # when one of those curves is edited. Scene changes, undo/redo and time unit changes drop everything. Changes
+    # that only reach a node through other DAG nodes (constraint targets, expressions) aren't tracked.
+    def __init__(self):
+        self.samples = {}
+        # {watched node UUID: UUIDs of the cached nodes that depend on it}
+        self.dependents = {}
+        self.node_callback_ids = []
+        self.callback_ids = []
+
+    def get(self, node, frames):
+        frames = np.asarray(frames, dtype=np.float64)
+        sel = om2.MSelectionList()
+        sel.add(node)
+        dag_path = sel.getDagPath(0)
+        key = node_uuid(dag_path.node())
+
+        node_samples = self.samples.get(key)
+        if node_samples is None:
+            self.watch(key, dag_path)
+            node_samples = self.samples[key] = {}
+        matrices = node_samples.get(frames.tobytes())
+        if matrices is None:
+            matrices = to_matrices([cmds.getAttr(f'{node}.worldMatrix[0]', t=frame) for frame in frames])
+            matrices.setflags(write=False)
+            node_samples[frames.tobytes()] = matrices
+        return matrices
+
+    def watch(self, key, dag_path):
+        # Callbacks on the node, its parents and their anim curves, each watched node gets them once
+        if not self.callback_ids:
+            self.add_callbacks()
+        dag_path = om2.MDagPath(dag_path)
+        while dag_path.length():
+            dag_node = dag_path.node()
+            for watched in [dag_node] + upstream_nodes(dag_node):
+                watched_key = node_uuid(watched)
+                if watched_key not in self.dependents:
+                    self.dependents[watched_key] = set()
+                    self.node_callback_ids.append(om2.MNodeMessage.addAttributeChangedCallback(
+                        watched, self.attribute_changed, watched_key))
+                    if watched.hasFn(om2.MFn.kDagNode):
+                        self.node_callback_ids.append(om2.MDagMessage.addAllDagChangesDagPathCallback(
+                            om2.MDagPath(dag_path), self.dag_changed, watched_key))
+                self.dependents[watched_key].add(key)
+            dag_path.pop()
+
+    def drop(self, watched_key):
+        for key in self.dependents.get(watched_key, ()):
+            self.samples.pop(key, None)
+
+    def attribute_changed(self, message, plug, other_plug, watched_key):
+        if message & _sample_changes:
+            self.drop(watched_key)
+
+    def dag_changed(self, message, child, parent, watched_key):
+        self.drop(watched_key)
+
+    def curves_edited(self, curves, *args):
+        for curve in curves:
+            self.drop(node_uuid(curve))
+
+    def clear(self, *args):
+        self.samples.clear()
+        self.dependents.clear()
+        if self.node_callback_ids:
+            om2.MMessage.removeCallbacks(self.node_callback_ids)
+        self.node_callback_ids = []
+
+    def add_callbacks(self):
+        self.callback_ids = add_scene_callbacks(self.clear)
+        self.callback_ids.append(om2.MEventMessage.addEventCallback('timeUnitChanged', self.clear))
+        self.callback_ids.append(oma.MAnimMessage.addAnimCurveEditedCallback(self.curves_edited))
+
+    def remove_callbacks(self):
+        self.clear()
+        if self.callback_ids:
+            om2.MMessage.removeCallbacks(self.callback_ids)
+        self.callback_ids = []
+
+
+transform_sample_cache = TransformSampleCache()
+
+
+def sample_world_matrices(node, frames, use_cache=True):
+    # Evaluate the world matrix in a time context for each frame, the timeline never moves.
+    # Cached results are shared between tools and read-only, copy them before editing.
+    if use_cache:
+        return transform_sample_cache.get(node, frames)
+    return to_matrices([cmds.getAttr(f'{node}.worldMatrix[0]', t=frame) for frame in frames])
+
+
+def sample_attribute(plug, frames):
+    return np.array([cmds.getAttr(plug, t=frame) for frame in frames], dtype=np.float64)
+
+
+def get_anim_curve(node, attribute=None):
+    # Returns an MFnAnimCurve for the curve driving node.attribute, or None if the attribute isn't keyed.
+    # Without an attribute, node is taken to be the anim curve itself.
+    if attribute is None:
+        curves = [node]
+    else:
+        curves = cmds.keyframe(node, q=1, at=attribute, n=1)
+        if not curves:
+            return None
+    sel = om2.MSelectionList()
+    sel.add(curves[0])
+    return oma.MFnAnimCurve(sel.getDependNode(0))
+
+
+def anim_curve_unit_scale(fn_curve):
+    # Factor from the curve's internal units to UI units
+    curve_type = fn_curve.animCurveType
+    if curve_type in (oma.MFnAnimCurve.kAnimCurveTA, oma.MFnAnimCurve.kAnimCurveUA):
+        return om2.MAngle(1.0).asUnits(om2.MAngle.uiUnit())
+    elif curve_type in (oma.MFnAnimCurve.kAnimCurveTL, oma.MFnAnimCurve.kAnimCurveUL):
+        return om2.MDistance(1.0).asUnits(om2.MDistance.uiUnit())
+    return 1.0
+
+
+def evaluate_anim_curve(fn_curve, times):
+    # Values come back in UI units to match cmds.keyframe(q=1, eval=1)
+    time_unit = om2.MTime.uiUnit()
+    values = np.fromiter((fn_curve.evaluate(om2.MTime(t, time_unit)) for t in times), dtype=np.float64,
+                         count=len(times))
+    return values * anim_curve_unit_scale(fn_curve)
+
+
+def sample_anim_curve(node, attribute, times):
+    # Evaluate an attribute's anim curve at many times without going through cmds.keyframe once per sample.
+    fn_curve = get_anim_curve(node, attribute)
+    if fn_curve is None:
+        return None
+    return evaluate_anim_curve(fn_curve, times)
+
+
+def set_key_values(curve, indices, times, values):
+    # Overwrite existing keys on a curve with one keyTimeValue setAttr per run of consecutive key indices.
+    # Tangent types are left alone, times and values are in UI units.
+    indices = np.asarray(indices, dtype=np.int64)
+    pairs = np.column_stack((times, values))
+    runs = np.split(np.arange(len(indices)), np.flatnonzero(np.diff(indices) != 1) + 1)
+    for run in runs:
+        if not run.size:
+            continue
+        first, last = indices[run[0]], indices[run[-1]]
+        cmds.setAttr(f'{curve}.ktv[{first}:{last}]', *pairs[run].ravel().tolist())
+
+
+def nearest_keys(key_times, times):
+    # Index of the closest key for each time, key times come back rounded to the curve's tick resolution
+    if len(key_times) < 2:
+        return np.zeros(len(times), dtype=np.int64)
+    indices = np.clip(np.searchsorted(key_times, times), 1, len(key_times) - 1)
+    indices -= np.abs(key_times[indices - 1] - times) <= np.abs(key_times[indices] - times)
+    return indices
+
+
+def default_tangents():
+    # The user's default in and out tangent types, what setKeyframe gives new keys
+    return (cmds.keyTangent(q=True, g=True, inTangentType=True)[0],
+            cmds.keyTangent(q=True, g=True, outTangentType=True)[0])
+
+
+def set_key_tangents(curve, indices, in_tangent, out_tangent):
+    # Set the tangent types of many keys with one keyTangent, key indices are grouped into (first, last) runs
+    indices = np.unique(np.asarray(indices, dtype=np.int64))
+    if not indices.size:
+        return
+    runs = np.split(indices, np.flatnonzero(np.diff(indices) != 1) + 1)
+    cmds.keyTangent(curve, index=[(int(run[0]), int(run[-1])) for run in runs], inTangentType=in_tangent,
+                    outTangentType=out_tangent)
+
+
+def set_keys(node, attribute, times, values):
+    # Key many values in one go, like calling setKeyframe for each (time, value) in order but without a command per
+    # key. Existing curves get the missing times inserted with one setKeyframe -insert and every value written with
+    # keyTimeValue setAttr runs. Inserted keys come with fixed tangents fitted to the old curve, so they are switched
+    # to the user's default tangent types afterwards, keys that already existed keep theirs. Unkeyed attributes get
+    # a new curve filled with a single setAttr. Everything stays in the undo queue and the keyframe clipboard is
+    # never touched.
+    times = np.asarray(times, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    if not times.size:
+        return
+
+    # Sort by time, the last value given for a frame wins (same as calling setKeyframe in order)
+    _, last = np.unique(times[::-1], return_index=True)
+    order = len(times) - 1 - last
+    times, values = times[order], values[order]
+
+    # Shape attributes (camera pans, focal length...) can be passed on the transform
+    if not cmds.attributeQuery(attribute, node=node, exists=True):
+        node = (cmds.listRelatives(node, s=True, f=True) or [node])[0]
+
+    plug = f'{node}.{attribute}'
+    curves = cmds.keyframe(plug, q=True, name=True)
+    if not curves and cmds.connectionInfo(plug, isDestination=True):
+        # Driven attributes (constraints, expressions) get their curve and pairBlend from setKeyframe
+        cmds.setKeyframe(plug, time=(times[0],), value=values[0])
+        curves = cmds.keyframe(plug, q=True, name=True)
+
+    if not curves:
+        attr_type = cmds.getAttr(plug, type=True)
+        curve_type = {'doubleLinear': 'animCurveTL', 'doubleAngle': 'animCurveTA'}.get(attr_type, 'animCurveTU')
+        long_name = cmds.attributeQuery(attribute, node=node, longName=True)
+        curve = cmds.createNode(curve_type, name=f'{node.split("|")[-1]}_{long_name}', skipSelect=True)
+        cmds.setAttr(f'{curve}.ktv[0:{len(times) - 1}]', *np.column_stack((times, values)).ravel().tolist())
+        set_key_tangents(curve, np.arange(len(times)), *default_tangents())
+        cmds.connectAttr(f'{curve}.output', plug)
+        return
+
+    curve = curves[0]
+    key_times = np.array(cmds.keyframe(curve, q=True, timeChange=True) or [], dtype=np.float64)
+    missing = times[~np.isin(times, key_times)] if key_times.size else times
+    if missing.size:
+        cmds.setKeyframe(plug, time=missing.tolist(), insert=True)
+        key_times = np.array(cmds.keyframe(curve, q=True, timeChange=True), dtype=np.float64)
+
+    set_key_values(curve, nearest_keys(key_times, times), times, values)
+    if missing.size:
+        set_key_tangents(curve, nearest_keys(key_times, missing), *default_tangents())
+
+
 def lock_attributes(objects, attributes):
     for obj in objects:
         for at in attributes:
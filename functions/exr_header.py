@@ -0,0 +1,85 @@
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+# Minimal OpenEXR header reader, only the attribute table at the start of the file is read, never any pixels.
+# https://openexr.com/en/latest/OpenEXRFileLayout.html
+
+EXR_MAGIC = 20000630
+_box2i = struct.Struct('<iiii')
+
+
+class ExrHeaderError(ValueError):
+    pass
+
+
+def read_cstring(f, limit=256):
+    chars = bytearray()
+    while True:
+        char = f.read(1)
+        if not char:
+            raise ExrHeaderError('Unexpected end of file in header.')
+        if char == b'\0':
+            return chars.decode('ascii', 'replace')
+        chars += char
+        if len(chars) > limit:
+            raise ExrHeaderError('Header attribute name too long.')
+
+
+def read_exr_header(file_path, attributes=('dataWindow', 'displayWindow', 'pixelAspectRatio')):
+    # Returns {name: value} for the wanted attributes of the first part. box2i values come back as
+    # (x_min, y_min, x_max, y_max), floats as float, anything else as raw bytes.
+    header = {}
+    with open(file_path, 'rb') as f:
+        magic, version = struct.unpack('<ii', f.read(8))
+        if magic != EXR_MAGIC:
+            raise ExrHeaderError(f'{file_path} is not an OpenEXR file.')
+
+        while True:
+            name = read_cstring(f)
+            if not name:
+                break
+            attribute_type = read_cstring(f)
+            size = struct.unpack('<i', f.read(4))[0]
+            if name not in attributes:
+                f.seek(size, os.SEEK_CUR)
+                continue
+
+            data = f.read(size)
+            if attribute_type == 'box2i':
+                header[name] = _box2i.unpack(data)
+            elif attribute_type == 'float':
+                header[name] = struct.unpack('<f', data)[0]
+            else:
+                header[name] = data
+
+            if len(header) == len(attributes):
+                break
+    return header
+
+
+def window_size(window):
+    x_min, y_min, x_max, y_max = window
+    return x_max - x_min + 1, y_max - y_min + 1
+
+
+def read_exr_sizes(file_path):
+    # (data width, data height, display width, display height)
+    header = read_exr_header(file_path, attributes=('dataWindow', 'displayWindow'))
+    return window_size(header['dataWindow']) + window_size(header['displayWindow'])
+
+
+def read_exr_sizes_many(file_paths, workers=None):
+    # Headers are a few hundred bytes, reading them is all file system latency, so threads are enough.
+    # Returns sizes in the order given, None for files that couldn't be read.
+    def safe_read(file_path):
+        try:
+            return read_exr_sizes(file_path)
+        except (OSError, ExrHeaderError, KeyError, struct.error):
+            return None
+
+    file_paths = list(file_paths)
+    if len(file_paths) < 2:
+        return [safe_read(file_path) for file_path in file_paths]
+    with ThreadPoolExecutor(max_workers=workers or min(32, len(file_paths))) as pool:
+        return list(pool.map(safe_read, file_paths))
@@ -0,0 +1,190 @@
+import numpy as np
+import maya.cmds as cmds
+import maya.api.OpenMaya as om2
+
+from CETools.functions.commonFunctions import sample_world_matrices, sample_attribute
+
+# Frustum culling for many objects at once. Bounding boxes come in as (N, 8, 3) world space corners and the
+# camera as (6, 4) planes (nx, ny, nz, d), a point p is inside a plane when p.n + d > 0.
+
+# Bit pattern for the 8 corners of a box, 0 = min and 1 = max on each axis
+_corner_bits = np.array([[(i >> axis) & 1 for axis in range(3)] for i in range(8)], dtype=bool)
+
+
+def box_corners(mins, maxs, matrices=None):
+    # (N, 3) local min/max and optional (N, 4, 4) matrices to (N, 8, 3) corners, transformed when matrices are given
+    mins = np.asarray(mins, dtype=np.float64).reshape(-1, 1, 3)
+    maxs = np.asarray(maxs, dtype=np.float64).reshape(-1, 1, 3)
+    corners = np.where(_corner_bits, maxs, mins)
+    if matrices is None:
+        return corners
+
+    homogeneous = np.concatenate([corners, np.ones(corners.shape[:2] + (1,))], axis=2)
+    return np.einsum('nci,nij->ncj', homogeneous, np.asarray(matrices, dtype=np.float64))[..., :3]
+
+
+def perspective_planes(left, right, bottom, top, near, far):
+    # Camera space planes from the frustum extents at the near clip, the camera looks down -z.
+    # Extents can be arrays (one frustum per frame), giving (F, 6, 4).
+    left, right, bottom, top = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in (left, right, bottom,
+                                                                                               top)))
+    zero = np.zeros_like(left)
+    near = np.full_like(left, near)
+    planes = np.stack([
+        np.stack([-near, zero, -right, zero], axis=-1),  # right
+        np.stack([near, zero, left, zero], axis=-1),  # left
+        np.stack([zero, near, bottom, zero], axis=-1),  # bottom
+        np.stack([zero, -near, -top, zero], axis=-1),  # top
+        np.stack([zero, zero, zero + 1.0, zero + far], axis=-1),  # far
+        np.stack([zero, zero, zero - 1.0, -near], axis=-1),  # near
+    ], axis=-2)
+    return normalize_planes(planes)
+
+
+def orthographic_planes(left, right, bottom, top, near, far):
+    left, right, bottom, top = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in (left, right, bottom,
+                                                                                               top)))
+    zero = np.zeros_like(left)
+    one = zero + 1.0
+    planes = np.stack([
+        np.stack([-one, zero, zero, right], axis=-1),
+        np.stack([one, zero, zero, -left], axis=-1),
+        np.stack([zero, one, zero, -bottom], axis=-1),
+        np.stack([zero, -one, zero, top], axis=-1),
+        np.stack([zero, zero, one, zero + far], axis=-1),
+        np.stack([zero, zero, -one, zero - near], axis=-1),
+    ], axis=-2)
+    return planes
+
+
+def normalize_planes(planes):
+    lengths = np.linalg.norm(planes[..., :3], axis=-1, keepdims=True)
+    lengths[lengths == 0.0] = 1.0
+    return planes / lengths
+
+
+def world_planes(planes, cam_matrices):
+    # Camera space planes (F, 6, 4) or (6, 4) and camera world matrices (F, 4, 4) to world space planes (F, 6, 4).
+    # p_cam = p_world @ inverse(cam), so p_cam . plane = p_world . (inverse(cam) @ plane).
+    inverse = np.linalg.inv(np.asarray(cam_matrices, dtype=np.float64).reshape(-1, 4, 4))
+    planes = np.broadcast_to(planes, (len(inverse),) + np.shape(planes)[-2:])
+    return np.einsum('fij,fkj->fki', inverse, planes)
+
+
+def corners_in_planes(corners, planes):
+    # (N, 8, 3) corners against one set of (6, 4) world planes. An object is culled only when all of its corners
+    # are behind the same plane, so anything crossing the frustum counts as visible.
+    homogeneous = np.concatenate([corners, np.ones(corners.shape[:2] + (1,))], axis=2)
+    distances = homogeneous @ planes.T
+    return ~np.any(np.all(distances < 0.0, axis=1), axis=1)
+
+
+def visible_per_frame(corners, planes_per_frame):
+    # (F, N) visibility for every object on every frame
+    return np.stack([corners_in_planes(corners, planes) for planes in planes_per_frame])
+
+
+def ever_visible(corners, planes_per_frame):
+    # (N,) True for objects inside the frustum on at least one frame. Objects already found visible are
+    # dropped from the test, so the cost shrinks frame by frame.
+    visible = np.zeros(len(corners), dtype=bool)
+    remaining = np.arange(len(corners))
+    for planes in planes_per_frame:
+        if not len(remaining):
+            break
+        hits = corners_in_planes(corners[remaining], planes)
+        visible[remaining[hits]] = True
+        remaining = remaining[~hits]
+    return visible
+
+
+def get_camera_fn(camera):
+    sel = om2.MSelectionList()
+    sel.add(camera)
+    dag_path = sel.getDagPath(0)
+    if not dag_path.hasFn(om2.MFn.kCamera):
+        dag_path.extendToShape()
+    return dag_path, om2.MFnCamera(dag_path)
+
+
+def camera_planes(camera, frames=None):
+    # Camera space frustum planes, (6, 4) for the current frame or (F, 6, 4) when frames are given.
+    # Near/far clip and the film back are read once, an animated focal length scales the extents per frame.
+    dag_path, fn_camera = get_camera_fn(camera)
+    near = fn_camera.nearClippingPlane
+    far = fn_camera.farClippingPlane
+    left, right, bottom, top = fn_camera.getViewingFrustum(fn_camera.aspectRatio(), False, True)
+
+    if fn_camera.isOrtho():
+        return orthographic_planes(left, right, bottom, top, near, far)
+
+    if frames is not None:
+        scale = fn_camera.focalLength / sample_attribute(f'{dag_path.fullPathName()}.focalLength', frames)
+        left, right, bottom, top = (value * scale for value in (left, right, bottom, top))
+    return perspective_planes(left, right, bottom, top, near, far)
+
+
+def camera_world_planes(camera, frames):
+    # (F, 6, 4) world space planes for a moving camera
+    dag_path, _ = get_camera_fn(camera)
+    cam_matrices = sample_world_matrices(dag_path.fullPathName(), frames)
+    return world_planes(camera_planes(camera, frames), cam_matrices)
+
+
+def find_dag_path(name):
+    # MDagPath for a node name, None if it doesn't exist or isn't a DAG node
+    sel = om2.MSelectionList()
+    try:
+        sel.add(name)
+        return sel.getDagPath(0)
+    except (RuntimeError, TypeError):
+        return None
+
+
+def dag_bounding_boxes(dag_paths):
+    # (N, 8, 3) world space corners, zero sized boxes at the origin for missing paths
+    mins = np.zeros((len(dag_paths), 3))
+    maxs = np.zeros((len(dag_paths), 3))
+    matrices = np.tile(np.identity(4), (len(dag_paths), 1, 1))
+    for i, dag_path in enumerate(dag_paths):
+        if dag_path is None:
+            continue
+        bbox = om2.MFnDagNode(dag_path).boundingBox
+        mins[i] = tuple(bbox.min)[:3]
+        maxs[i] = tuple(bbox.max)[:3]
+        matrices[i] = np.reshape(tuple(dag_path.exclusiveMatrix()), (4, 4))
+    return box_corners(mins, maxs, matrices)
+
+
+def gather_bounding_boxes(nodes=None):
+    # World space corners for every node in one OpenMaya pass. Without nodes every non-intermediate geometry
+    # shape in the scene is used. Names that don't resolve to a DAG node are left out.
+    # Returns (long names, (N, 8, 3) corners).
+    if nodes is None:
+        nodes = cmds.ls(geometry=True, noIntermediate=True, long=True)
+
+    dag_paths = [dag_path for dag_path in (find_dag_path(node) for node in nodes) if dag_path is not None]
+    return [dag_path.fullPathName() for dag_path in dag_paths], dag_bounding_boxes(dag_paths)
+
+
+def node_bounding_boxes(nodes):
+    # One entry per name given, repeats included. Returns ((N,) found mask, (N, 8, 3) corners).
+    dag_paths = [find_dag_path(node) for node in nodes]
+    found = np.array([dag_path is not None for dag_path in dag_paths], dtype=bool)
+    return found, dag_bounding_boxes(dag_paths)
+
+
+def frustum_visibility(camera, corners, frames=None):
+    # (N,) visibility of the corners on the current frame, or on any of the given frames
+    if frames is None:
+        dag_path, _ = get_camera_fn(camera)
+        cam_matrix = np.reshape(tuple(dag_path.inclusiveMatrix()), (1, 4, 4))
+        return corners_in_planes(corners, world_planes(camera_planes(camera), cam_matrix)[0])
+    return ever_visible(corners, camera_world_planes(camera, np.asarray(frames, dtype=np.float64)))
+
+
+def objects_in_frustum(camera, nodes=None, frames=None):
+    # Long names of the objects visible from camera
+    names, corners = gather_bounding_boxes(nodes)
+    visible = frustum_visibility(camera, corners, frames)
+    return [name for name, is_visible in zip(names, visible) if is_visible]
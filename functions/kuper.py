@@ -0,0 +1,74 @@
+import numpy as np
+import maya.cmds as cmds
+
+from CETools.functions.commonFunctions import get_playback_frames, sample_world_matrices, sample_attribute
+from CETools.functions.matrix_math import matrix_to_euler, translation
+
+CAMERA_HEADER = 'Axes = frame, VTrack, VEW, VNS, Vpan, VTilt, VRoll, focal\n'
+OBJECT_HEADER = 'Axes = frame, VTrack, VEW, VNS, Vpan, VTilt, VRoll\n'
+
+# order is = Frame, Tz, Tx, Ty, -Ry, Rx, -Rz (with spaces), cameras add focal length
+CAMERA_FORMAT = '%.6f %.9f %.9f %.9f %.9f %.9f %.9f %.9f'
+OBJECT_FORMAT = '%.6f %.9f %.9f %.9f %.9f %.9f %.9f'
+
+
+def sample_focal_length(camera, frames):
+    camera_shape = cmds.listRelatives(camera, type='camera', f=True) or [camera]
+    return sample_attribute(f'{camera_shape[0]}.focalLength', frames)
+
+
+def kuper_rows(frames, matrices, rotate_order=0, focal=None):
+    translates = translation(matrices)
+    rotates = matrix_to_euler(matrices, rotate_order)
+
+    columns = [frames, translates[:, 2], translates[:, 0], translates[:, 1], -rotates[:, 1], rotates[:, 0],
+               -rotates[:, 2]]
+    if focal is not None:
+        columns.append(focal)
+    return np.column_stack(columns)
+
+
+def camera_rows(camera, frames):
+    rotate_order = cmds.getAttr(f'{camera}.rotateOrder')
+    return kuper_rows(frames, sample_world_matrices(camera, frames), rotate_order,
+                      focal=sample_focal_length(camera, frames))
+
+
+def object_rows(obj, frames):
+    rotate_order = cmds.getAttr(f'{obj}.rotateOrder')
+    return kuper_rows(frames, sample_world_matrices(obj, frames), rotate_order)
+
+
+def write_rows(f_kuper, header, rows, row_format):
+    f_kuper.write(header)
+    np.savetxt(f_kuper, rows, fmt=row_format)
+
+
+def write_points(f_kuper, which_type, which_grp):
+    f_kuper.write('\npoints_%s = %s\n' % (which_type, which_grp))
+
+    locator_list = []
+    for child in cmds.listRelatives(which_grp, type='transform', c=True, f=True) or []:
+        shapes = cmds.listRelatives(child, s=True, c=True, f=True)
+        if shapes and cmds.objectType(shapes[0]) == 'locator':
+            locator_list.append(child)
+
+    for transform in locator_list:
+        t = cmds.xform(transform, q=1, ws=1, t=1)
+        f_kuper.write(transform.split('|')[-1] + " point x: " + str(t[0]) + " y: " + str(t[1]) + " z: " + str(t[2])
+                      + "\n")
+
+
+def write_kuper(file_path, cameras=(), objects=(), point_groups=(), frames=None):
+    # Sample everything first, then write the whole file in a single pass
+    if frames is None:
+        frames = get_playback_frames()
+
+    blocks = [(CAMERA_HEADER, camera_rows(camera, frames), CAMERA_FORMAT) for camera in cameras]
+    blocks.extend((OBJECT_HEADER, object_rows(obj, frames), OBJECT_FORMAT) for obj in objects)
+
+    with open(file_path, 'w') as f_kuper:
+        for header, rows, row_format in blocks:
+            write_rows(f_kuper, header, rows, row_format)
+        for grp in point_groups:
+            write_points(f_kuper, 'grp', grp)
@@ -0,0 +1,114 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+# Headless Kuper export for a whole shot list. Run through mayapy:
+#   mayapy -m CETools.functions.kuper_batch manifest.json /path/to/output
+#
+# The manifest is a json list of shots:
+#   [{"name": "sh010", "scene": "/path/sh010.ma", "cameras": ["|camTrack|CamMain"],
+#     "objects": ["|car_grp"], "point_groups": ["|survey_grp"], "frame_range": [1001, 1100]}]
+# frame_range is optional and defaults to the playback range saved with the scene.
+
+
+def read_manifest(manifest_path):
+    with open(manifest_path, 'r') as f:
+        shots = json.load(f)
+
+    for i, shot in enumerate(shots):
+        if not shot.get('scene'):
+            raise ValueError(f'Shot {i} in {manifest_path} has no scene.')
+        shot.setdefault('name', os.path.splitext(os.path.basename(shot['scene']))[0])
+    return shots
+
+
+def init_standalone():
+    # Each worker process gets its own Maya session
+    import maya.standalone
+    maya.standalone.initialize(name='python')
+
+
+def export_shot(shot, output_dir):
+    # Worker side: open the shot's scene and write its .asc. Scene access goes through maya.cmds and the
+    # sample cache, so stub maya modules in sys.modules and an uncached sampler are enough to run it outside Maya.
+    import maya.cmds as cmds
+    from CETools.functions import kuper
+
+    start = time.perf_counter()
+    result = {'name': shot['name'], 'scene': shot['scene'], 'path': None, 'seconds': 0.0, 'error': None}
+
+    try:
+        cmds.file(shot['scene'], open=True, force=True, prompt=False)
+
+        frames = None
+        if shot.get('frame_range'):
+            frame_start, frame_end = shot['frame_range']
+            frames = np.arange(int(frame_start), int(frame_end) + 1, dtype=np.float64)
+
+        file_path = os.path.join(output_dir, f"{shot['name']}.asc")
+        kuper.write_kuper(file_path, cameras=shot.get('cameras', ()), objects=shot.get('objects', ()),
+                          point_groups=shot.get('point_groups', ()), frames=frames)
+        result['path'] = file_path
+    except Exception as e:
+        result['error'] = f'{type(e).__name__}: {e}'
+
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def run_batch(shots, output_dir, workers=None, mayapy=None, initializer=init_standalone):
+    # Export every shot in a pool of mayapy processes and return the per-shot results in manifest order.
+    # Pass mayapy when launching from inside a Maya session, otherwise the workers would start maya.exe.
+    os.makedirs(output_dir, exist_ok=True)
+
+    context = multiprocessing.get_context('spawn')
+    if mayapy:
+        context.set_executable(mayapy)
+
+    workers = workers or min(len(shots), os.cpu_count() or 1) or 1
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=initializer) as pool:
+        futures = {pool.submit(export_shot, shot, output_dir): i for i, shot in enumerate(shots)}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                # A worker that died (crash, license failure) breaks the pool, every shot it takes down is marked
+                # failed and the shots already exported are kept
+                shot = shots[futures[future]]
+                result = {'name': shot['name'], 'scene': shot['scene'], 'path': None, 'seconds': 0.0,
+                          'error': f'{type(e).__name__}: {e}'}
+            results[futures[future]] = result
+            if result['error']:
+                logging.warning(f"{result['name']} failed after {result['seconds']:.2f}s: {result['error']}")
+            else:
+                print(f"{result['name']} exported in {result['seconds']:.2f}s -> {result['path']}")
+
+    return [results[i] for i in range(len(shots))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Batch export Kuper (.asc) files from a shot manifest.')
+    parser.add_argument('manifest', help='json list of shots')
+    parser.add_argument('output_dir', help='folder the .asc files are written to')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='number of mayapy processes')
+    parser.add_argument('--mayapy', default=None, help='mayapy executable used for the workers')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = run_batch(read_manifest(args.manifest), args.output_dir, workers=args.workers, mayapy=args.mayapy)
+    failed = [r for r in results if r['error']]
+
+    print(f'{len(results) - len(failed)}/{len(results)} shots exported in {time.perf_counter() - start:.2f}s')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,17 +1,22 @@
 import logging
 
 import maya.cmds as cmds
-import maya.OpenMaya as OpenMaya
+import maya.api.OpenMaya as om2
 
 from os import path
-from glob import iglob
 from re import findall
-from json import dump
 from colorsys import hsv_to_rgb
 from math import floor
 import json
 
 from CETools.functions.commonFunctions import UndoStack
+from CETools.functions import frustum
+from CETools.functions.texture_sets import index_texture_sets, match_materials, highest_tile, udim_tiles
+from CETools.functions.texture_probe import probe_many, texture_colorspace, mismatched_tiles, current_tx, tx_path, \
+    wants_tx, RAW_COLORSPACE
+from CETools.functions.shading_network import NetworkSpec, build_network
+from CETools.functions.tx_queue import queue_tx_conversion
+from CETools.functions.shader_connections import save_shader_connections
 
 
 def setup_turntable(anim_steps):
@@ -147,89 +152,98 @@ def fill_node_array(node_plug, input_plugs):
 
 def assign_material_by_name(matching_string, new_shader, all_terms, match_path, use_material):
     shapes = cmds.ls(geometry=True, sl=1, dag=1, l=1)
-    selected = cmds.listRelatives(shapes, p=True, f=True)
+    selected = list(dict.fromkeys(cmds.listRelatives(shapes, p=True, f=True) or []))
 
     if not shapes or not selected:
         logging.warning('No objects have been selected.')
+        return
 
     with UndoStack('assign_mat_by_name'):
 
+        # Searchable names, shading groups and materials are gathered in bulk instead of per object
         selection_dict = {}
-        for s in selected:
-            if use_material:
-                shapes_in_sel = cmds.listRelatives(s, s=1, f=1)
-                shading_groups = cmds.listConnections(shapes_in_sel, type='shadingEngine')
-                shaders = cmds.ls(cmds.listConnections(shading_groups), materials=1, l=1)
-                if not shaders:
-                    continue
-                for shader in shaders:
-                    if match_path:
-                        selection_dict[shader] = shader.lower()
-                    else:
-                        selection_dict[shader] = shader.lower().split(':')[-1]
-
-            elif match_path is True:
-                selection_dict[s] = s.lower()
-            else:
-                selection_dict[s] = cmds.ls(s)[0].lower()
+        if use_material:
+            shading_groups = list(set(cmds.listConnections(shapes, type='shadingEngine') or []))
+            shaders = cmds.ls(cmds.listConnections(shading_groups), materials=1, l=1) if shading_groups else []
+            for shader in shaders:
+                selection_dict[shader] = shader.lower() if match_path else shader.lower().split(':')[-1]
+        elif match_path is True:
+            selection_dict = {s: s.lower() for s in selected}
+        else:
+            selection_dict = {s: name.lower() for s, name in zip(selected, cmds.ls(selected))}
 
         matching_strings = matching_string.lower().split()
-
-        if all_terms:
-            matching_objects = [sel for sel in selection_dict.keys() if
-                                all(match in selection_dict[sel] for match in matching_strings)]
-        else:
-            matching_objects = [sel for sel in selection_dict.keys() if
-                                any(match in selection_dict[sel] for match in matching_strings)]
+        test = all if all_terms else any
+        matching_objects = [sel for sel, text in selection_dict.items() if test(match in text for match in
+                                                                                  matching_strings)]
 
         if use_material:
-            set_members = []
-            for matching_shader in matching_objects:
-                old_sgs = cmds.listConnections(f'{matching_shader}.outColor')
-                if old_sgs:
-                    for sg in old_sgs:
-                        members = cmds.ls(cmds.sets(sg, q=1), l=1)
-                        # Verify and take only objects that are in selection
-                        matching_members = [x for x in members if
-                                            x.split(".")[0] in selected or x.split(".")[0] in shapes]
-                        set_members.extend(matching_members)
-
-            new_members = list(set(set_members))
-
-            new_sg = cmds.listConnections(f'{new_shader}.outColor')[0]
-            if new_sg:
-                cmds.sets(new_members, e=1, fe=new_sg)
-
+            # Verify and take only members that are in selection. listConnections falls back to the selection
+            # when given nothing, so no matching shader means no members.
+            in_selection = set(selected) | set(shapes)
+            new_members = set()
+            shading_groups = cmds.listConnections([f'{shader}.outColor' for shader in matching_objects],
+                                                  type='shadingEngine') if matching_objects else None
+            for sg in set(shading_groups or []):
+                members = cmds.ls(cmds.sets(sg, q=1), l=1)
+                new_members.update(x for x in members if x.split('.')[0] in in_selection)
+            new_members = list(new_members)
         else:
-            cmds.select(matching_objects, r=1)
-            cmds.hyperShade(assign=new_shader)
+            new_members = matching_objects
+
+        if new_members:
+            # Bare shaders get a shading group, as hyperShade -assign used to create
+            new_sg = cmds.listConnections(f'{new_shader}.outColor', type='shadingEngine')
+            cmds.sets(new_members, e=1, fe=new_sg[0] if new_sg else create_shading_group(new_shader))
+
+
+def shader_members(selected):
+    # {shader: [selected objects]} from one pass over the scene's shading engines. Each object goes under the first
+    # shader found for it, in selection order.
+    wanted = set(selected)
+    owners = {}
+    it = om2.MItDependencyNodes(om2.MFn.kShadingEngine)
+    while not it.isDone():
+        fn_set = om2.MFnSet(it.thisNode())
+        sources = fn_set.findPlug('surfaceShader', False).connectedTo(True, False)
+        if sources:
+            shader = om2.MFnDependencyNode(sources[0].node()).name()
+            members = fn_set.getMembers(False)
+            for i in range(members.length()):
+                try:
+                    dag_path = members.getDagPath(i)
+                except (TypeError, RuntimeError):
+                    continue
+                if dag_path.node().hasFn(om2.MFn.kShape):
+                    dag_path.pop()
+                name = dag_path.fullPathName()
+                if name in wanted and name not in owners:
+                    owners[name] = shader
+        it.next()
+
+    shader_data = {}
+    for sel in selected:
+        if sel in owners:
+            shader_data.setdefault(owners[sel], []).append(sel)
+    return shader_data
 
 
 def write_shader_connections():
-    file_path = cmds.fileDialog2(fileFilter="*.json", dialogStyle=2)
+    # Files ending in .gz are written in the compressed columnar format
+    file_path = cmds.fileDialog2(fileFilter="Shader Connections (*.json);;Compressed Shader Connections (*.gz)",
+                                 dialogStyle=2)
 
     if not file_path:
         logging.warning('Save process aborted.')
         return
 
     selected = cmds.ls(sl=1, l=1)
-    shapes_in_sel = cmds.listRelatives(selected, s=1, f=1)
-    shading_groups = cmds.listConnections(shapes_in_sel, type='shadingEngine')
-    shaders = cmds.ls(cmds.listConnections(shading_groups), materials=1)
-
-    shader_data = {}
-
-    for shader in shaders:
-        shader_data[shader] = []
-
-    for sel in selected:
-        shape = cmds.listRelatives(sel, s=1, f=1)
-        shader_group = cmds.listConnections(shape, type='shadingEngine')
-        shader = cmds.ls(cmds.listConnections(shader_group), materials=1)[0]
-        shader_data[shader].append(sel)
+    shader_data = shader_members(selected)
+    if len(shader_data) == 0:
+        logging.warning('None of the selected objects have a shader.')
+        return
 
-    with open(file_path[0], 'w') as json_file:
-        dump(shader_data, json_file, indent=4)
+    save_shader_connections(shader_data, file_path[0])
 
 
 def assign_shader_to_curves(width, shader):
@@ -242,6 +256,9 @@ def assign_shader_to_curves(width, shader):
             cmds.connectAttr(f'{shape}.aiCurveShader', shader)
 
 
+RAW_TEXTURE_ATTRIBUTES = {'colorSpace': 'Utility - Raw', 'alphaIsLuminance': True}
+
+
 def texture_to_raw(file_node):
     cmds.setAttr(f'{file_node}.colorSpace', 'Utility - Raw', type='string')
     cmds.setAttr(f'{file_node}.alphaIsLuminance', 1)
@@ -259,7 +276,7 @@ def create_ai_standard_surface(name='aiStandardSurface'):
     return shader, shading_group
 
 
-def connect_textures(folder_path, diffuse, specular, metalness, normals, displacement):
+def connect_textures(folder_path, diffuse, specular, metalness, normals, displacement, convert_tx=None):
     texture_types = {
         'BaseColor': ['outColor', 'baseColor', diffuse],
         'Roughness': ['outAlpha', 'specular', specular],
@@ -268,116 +285,93 @@ def connect_textures(folder_path, diffuse, specular, metalness, normals, displac
         'Height': ['outAlpha', 'height', displacement],
     }
     # 'Emissive': ['outAlpha', 'emission']
-    attributes = (
-        "coverage", "translateFrame", "rotateFrame", "mirrorU", "mirrorV", "stagger", "wrapU", "wrapV", "repeatUV",
-        "vertexUvOne", "vertexUvTwo", "vertexUvThree", "vertexCameraOne", "noiseUV", "offset", "rotateUV")
-
-    shading_group = ''
 
     if not path.exists(folder_path):
         cmds.error("Invalid file path")
         return
 
-    image_files = [f for f in iglob(f'{folder_path}/*') if f.endswith((".png", ".jpg", ".tiff"))]
-    image_files.sort(key=lambda f: int(''.join(filter(str.isdigit, f))))
-
-    image_files = [f for f in iglob(f'{folder_path}/*') if f.endswith((".png", ".jpg", ".tiff"))]
-    material_groups = {}
-    for file in image_files:
-        for texture_type in texture_types.keys():
-            if texture_type in file:
-                file_name = path.basename(file)
-                shader_name = file_name.split(texture_type)[0]
-                highest_tile_id = findall(r"\d{4}", file_name)[-1]
-                if shader_name not in material_groups.keys():
-                    material_groups[shader_name] = {}
-                if texture_type not in material_groups[shader_name].keys():
-                    material_groups[shader_name][texture_type] = {}
-                material_groups[shader_name][texture_type][highest_tile_id] = file
-
-    scene_materials = cmds.ls(mat=1)
+    material_groups = index_texture_sets(folder_path, channels=tuple(texture_types))
+    similar_materials = match_materials(material_groups, cmds.ls(mat=1))
+
+    # Headers of every texture that gets linked, read up front in one parallel pass
+    image_infos = probe_many([file_path for shader_key in material_groups
+                              for texture, tiles in material_groups[shader_key].items()
+                              if texture_types[texture][2] is not False for file_path in tiles.values()])
+    tx_candidates = []
 
+    # Every material is described first and the whole network is created in one go
+    spec = NetworkSpec()
     for shader_key in material_groups.keys():
 
-        similar_material = None
         # Check if similar material already exists in the scene.
-        for material in scene_materials:
-            if material in shader_key:
-                similar_material = material
+        similar_material = similar_materials.get(shader_key)
 
         if similar_material:
-            shader = similar_material
+            shader = shader_name = similar_material
             shading_group = cmds.listConnections(similar_material, type='shadingEngine')[0]
         else:
-            shader, shading_group = create_ai_standard_surface(name=f'{shader_key.strip("_")}')
+            shader_name = shader_key.strip("_")
+            shader = spec.shader('aiStandardSurface', shader_name)
+            shading_group = spec.shading_group(f'{shader_name}_SG', shader)
 
         for texture in material_groups[shader_key].keys():
 
             if texture_types[texture][2] is False:
                 continue
 
-            highest_tile_id = max(material_groups[shader_key][texture].keys())
+            tiles = material_groups[shader_key][texture]
+            _, texture_file = highest_tile(tiles)
+            infos = [image_infos[file_path] for file_path in tiles.values()]
+            if mismatched_tiles(infos):
+                logging.warning(f'Tiles of {shader_key}{texture} differ in channels or bit depth.')
 
-            file_node = cmds.shadingNode('file', name=f'{shader}{texture}', asTexture=True,
-                                         isColorManaged=True)
+            file_attributes = {'ignoreColorSpaceFileRules': 1}
+            if len(udim_tiles(tiles)) > 1:
+                file_attributes['uvTilingMode'] = 3
 
-            if len(material_groups[shader_key][texture].keys()) > 1:
-                cmds.setAttr(f'{file_node}.uvTilingMode', 3)
+            colorspace = texture_colorspace(infos, is_data=texture_types[texture][0] == 'outAlpha')
+            if colorspace == RAW_COLORSPACE:
+                file_attributes.update(RAW_TEXTURE_ATTRIBUTES)
+            else:
+                file_attributes['colorSpace'] = colorspace
 
-            place_2d_texture = cmds.shadingNode("place2dTexture", asUtility=True)
-            cmds.connectAttr("%s.outUV" % place_2d_texture, "%s.uvCoord" % file_node, f=True)
-            cmds.connectAttr("%s.outUvFilterSize" % place_2d_texture, "%s.uvFilterSize" % file_node, f=True)
-            for attribute in attributes:
-                cmds.connectAttr(f'{place_2d_texture}.{attribute}', f'{file_node}.{attribute}', f=True)
+            # Use the .tx versions when every tile has an up to date one, otherwise queue them for conversion
+            tx_files = [current_tx(file_path) for file_path in tiles.values()]
+            if all(tx_files):
+                texture_file = tx_path(texture_file)
 
-            cmds.setAttr(f'{file_node}.fileTextureName', material_groups[shader_key][texture][highest_tile_id],
-                         type='string')
-            cmds.setAttr(f'{file_node}.ignoreColorSpaceFileRules', 1)
-
-            if texture_types[texture][0] == 'outAlpha':
-                texture_to_raw(file_node)
-            else:
-                cmds.setAttr(f'{file_node}.colorSpace', 'Utility - sRGB - Texture', type='string')
+            file_node = spec.file_texture(f'{shader_name}{texture}', texture_file, file_attributes)
+            if not all(tx_files) and any(wants_tx(image_infos[file_path]) for file_path in tiles.values()):
+                tx_candidates.append(file_node)
 
             if texture_types[texture][1] == 'normal':
-                texture_to_raw(file_node)
-                bump2d = cmds.shadingNode('bump2d', asUtility=1)
-                cmds.setAttr(f'{bump2d}.bumpInterp', 1)
-                cmds.connectAttr(f'{file_node}.outAlpha', f'{bump2d}.bumpValue')
-                cmds.connectAttr(f'{bump2d}.outNormal', f'{shader}.normalCamera', f=1)
+                bump2d = spec.add_node('bump2d', 'bump2d1', {'bumpInterp': 1}, classification='utility')
+                spec.connect(file_node, 'outAlpha', bump2d, 'bumpValue')
+                spec.connect(bump2d, 'outNormal', shader, 'normalCamera')
 
             elif texture_types[texture][1] == 'height':
-                texture_to_raw(file_node)
-                displacement_map = cmds.shadingNode('displacementShader', asUtility=1)
-                cmds.connectAttr(f'{file_node}.outAlpha', f'{displacement_map}.displacement')
-                cmds.connectAttr(f'{displacement_map}.displacement', f'{shading_group}.displacementShader', f=1)
+                displacement_map = spec.add_node('displacementShader', 'displacementShader1',
+                                                 classification='utility')
+                spec.connect(file_node, 'outAlpha', displacement_map, 'displacement')
+                spec.connect(displacement_map, 'displacement', shading_group, 'displacementShader')
 
             else:
-                cmds.connectAttr(f'{file_node}.{texture_types[texture][0]}',
-                                 f'{shader}.{texture_types[texture][1]}',
-                                 f=1)
-
-
-def link_file_node(dest_node, dest_attribute='color'):
-    attributes = (
-        "coverage", "translateFrame", "rotateFrame", "mirrorU", "mirrorV", "stagger", "wrapU", "wrapV", "repeatUV",
-        "vertexUvOne", "vertexUvTwo", "vertexUvThree", "vertexCameraOne", "noiseUV", "offset", "rotateUV")
+                spec.connect(file_node, texture_types[texture][0], shader, texture_types[texture][1])
 
-    file_node = cmds.shadingNode('file', name=f'file1', asTexture=True,
-                                 isColorManaged=True)
+    node_names = build_network(spec)
+    if tx_candidates:
+        queue_tx_conversion([node_names[file_node] for file_node in tx_candidates], convert_tx=convert_tx)
+    return node_names
 
-    place_2d_texture = cmds.shadingNode("place2dTexture", asUtility=True)
-    cmds.connectAttr("%s.outUV" % place_2d_texture, "%s.uvCoord" % file_node, f=True)
-    cmds.connectAttr("%s.outUvFilterSize" % place_2d_texture, "%s.uvFilterSize" % file_node, f=True)
 
-    for attribute in attributes:
-        cmds.connectAttr(f'{place_2d_texture}.{attribute}', f'{file_node}.{attribute}', f=True)
-
-    cmds.connectAttr(f'{file_node}.outColor', f'{dest_node}.{dest_attribute}', f=1)
-    return file_node
+def link_file_node(dest_node, dest_attribute='color'):
+    spec = NetworkSpec()
+    file_node = spec.file_texture('file1')
+    spec.connect(file_node, 'outColor', dest_node, dest_attribute)
+    return build_network(spec)[file_node]
 
 
-def build_hdri(hdri_path, name):
+def build_hdri(hdri_path, name, convert_tx=None):
     selected = cmds.ls(sl=1)
     if len(selected) == 1 and find_object_type(cmds.listRelatives(selected[0], f=1, s=1)) == 'aiSkyDomeLight':
         skydome = cmds.listRelatives(selected[0], s=1, f=1)[0]
@@ -396,179 +390,25 @@ def build_hdri(hdri_path, name):
         cmds.rename(cmds.listRelatives(skydome, p=1, f=1), name)
 
     cmds.setAttr(f'{file_node}.fileTextureName', hdri_path, type='string')
+    queue_tx_conversion([file_node], convert_tx=convert_tx)
     cmds.select(cmds.listRelatives(skydome, p=1, f=1), r=1)
 
 
-# https://gist.github.com/Kif11/247f6b05e8d3a6c3ffb193b8c6f4dec7#file-obj_in_frust-py-L1
 # Find if object located within camera frustum
 # Usage:
-#   from obj_in_frust import in_frustum
 #   in_frustum('camera1', 'pCube1')
+#   in_frustum('camera1', ['pCube1', 'pSphere1'], frames=range(1001, 1101))
 
-class Plane(object):
-    def __init__(self, normalisedVector):
-        # OpenMaya.MVector.__init__()
-        self.vector = normalisedVector
-        self.distance = 0.0
-
-    def relativeToPlane(self, point):
-        # Converting the point as a vector from the origin to its position
-        pointVec = OpenMaya.MVector(point.x, point.y, point.z)
-        val = (self.vector * pointVec) + self.distance
-
-        if (val > 0.0):
-            return 1  # In front
-        elif (val < 0.0):
-            return -1  # Behind
-
-        return 0  # On the plane
-
-
-class Frustum(object):
-    def __init__(self, cameraName):
-        # Initialising selected transforms into its associated dagPaths
-        selectionList = OpenMaya.MSelectionList()
-        objDagPath = OpenMaya.MDagPath()
-        selectionList.add(cameraName)
-        selectionList.getDagPath(0, objDagPath)
-        self.camera = OpenMaya.MFnCamera(objDagPath)
-
-        self.nearClip = self.camera.nearClippingPlane()
-        self.farClip = self.camera.farClippingPlane()
-        self.aspectRatio = self.camera.aspectRatio()
-
-        left_util = OpenMaya.MScriptUtil()
-        left_util.createFromDouble(0.0)
-        ptr0 = left_util.asDoublePtr()
-
-        right_util = OpenMaya.MScriptUtil()
-        right_util.createFromDouble(0.0)
-        ptr1 = right_util.asDoublePtr()
-
-        bot_util = OpenMaya.MScriptUtil()
-        bot_util.createFromDouble(0.0)
-        ptr2 = bot_util.asDoublePtr()
-
-        top_util = OpenMaya.MScriptUtil()
-        top_util.createFromDouble(0.0)
-        ptr3 = top_util.asDoublePtr()
-
-        stat = self.camera.getViewingFrustum(self.aspectRatio, ptr0, ptr1, ptr2, ptr3, False, True)
-
-        planes = []
-
-        left = left_util.getDoubleArrayItem(ptr0, 0)
-        right = right_util.getDoubleArrayItem(ptr1, 0)
-        bottom = bot_util.getDoubleArrayItem(ptr2, 0)
-        top = top_util.getDoubleArrayItem(ptr3, 0)
-
-        ## planeA = right plane
-        a = OpenMaya.MVector(right, top, -self.nearClip)
-        b = OpenMaya.MVector(right, bottom, -self.nearClip)
-        c = (a ^ b).normal()  ## normal of plane = cross product of vectors a and b
-        planeA = Plane(c)
-        planes.append(planeA)
-
-        ## planeB = left plane
-        a = OpenMaya.MVector(left, bottom, -self.nearClip)
-        b = OpenMaya.MVector(left, top, -self.nearClip)
-        c = (a ^ b).normal()
-        planeB = Plane(c)
-        planes.append(planeB)
-
-        ##planeC = bottom plane
-        a = OpenMaya.MVector(right, bottom, -self.nearClip)
-        b = OpenMaya.MVector(left, bottom, -self.nearClip)
-        c = (a ^ b).normal()
-        planeC = Plane(c)
-        planes.append(planeC)
-
-        ##planeD = top plane
-        a = OpenMaya.MVector(left, top, -self.nearClip)
-        b = OpenMaya.MVector(right, top, -self.nearClip)
-        c = (a ^ b).normal()
-        planeD = Plane(c)
-        planes.append(planeD)
-
-        # planeE = far plane
-        c = OpenMaya.MVector(0, 0, 1)
-        planeE = Plane(c)
-        planeE.distance = self.farClip
-        planes.append(planeE)
-
-        # planeF = near plane
-        c = OpenMaya.MVector(0, 0, -1)
-        planeF = Plane(c)
-        planeF.distance = self.nearClip
-        planes.append(planeF)
-
-        self.planes = planes
-        self.numPlanes = 6
-
-    def relativeToFrustum(self, pointsArray):
-        numInside = 0
-        numPoints = len(pointsArray)
-
-        for j in range(0, 6):
-            numBehindThisPlane = 0
-
-            for i in range(0, numPoints):
-                if (self.planes[j].relativeToPlane(pointsArray[i]) == -1):  # Behind
-                    numBehindThisPlane += 1
-                if numBehindThisPlane == numPoints:
-                    ##all points were behind the same plane
-                    return False
-                elif (numBehindThisPlane == 0):
-                    numInside += 1
-
-        if (numInside == self.numPlanes):
-            return True  # Inside
-        return True  # Intersect
-
-
-def in_frustum(cameraName, objectName):
+def in_frustum(cameraName, objectName, frames=None):
     """
-    returns: True if withing the frustum of False if not
+    returns: True if withing the frustum of False if not, a list of bools when given a list of objects.
+    With frames, an object counts as within the frustum if it is on any of those frames.
+    Objects that don't exist are never within the frustum.
     """
-    selectionList = OpenMaya.MSelectionList()
-    camDagPath = OpenMaya.MDagPath()
-    selectionList.add(cameraName)
-    selectionList.getDagPath(0, camDagPath)
-
-    cameraDagPath = OpenMaya.MFnCamera(camDagPath)
-
-    camInvWorldMtx = camDagPath.inclusiveMatrixInverse()
-
-    fnCam = Frustum(cameraName)
-    points = []
-
-    # For node inobjectList
-    selectionList = OpenMaya.MSelectionList()
-    objDagPath = OpenMaya.MDagPath()
-    selectionList.add(objectName)
-    selectionList.getDagPath(0, objDagPath)
-
-    fnDag = OpenMaya.MFnDagNode(objDagPath)
-    obj = objDagPath.node()
-
-    dWorldMtx = objDagPath.exclusiveMatrix()
-    bbox = fnDag.boundingBox()
-
-    minx = bbox.min().x
-    miny = bbox.min().y
-    minz = bbox.min().z
-    maxx = bbox.max().x
-    maxy = bbox.max().y
-    maxz = bbox.max().z
-
-    # Getting points relative to the cameras transmformation matrix
-    points.append(bbox.min() * dWorldMtx * camInvWorldMtx)
-    points.append(OpenMaya.MPoint(maxx, miny, minz) * dWorldMtx * camInvWorldMtx)
-    points.append(OpenMaya.MPoint(maxx, miny, maxz) * dWorldMtx * camInvWorldMtx)
-    points.append(OpenMaya.MPoint(minx, miny, maxz) * dWorldMtx * camInvWorldMtx)
-    points.append(OpenMaya.MPoint(minx, maxy, minz) * dWorldMtx * camInvWorldMtx)
-    points.append(OpenMaya.MPoint(maxx, maxy, minz) * dWorldMtx * camInvWorldMtx)
-    points.append(bbox.max() * dWorldMtx * camInvWorldMtx)
-    points.append(OpenMaya.MPoint(minx, maxy, maxz) * dWorldMtx * camInvWorldMtx)
-
-    return fnCam.relativeToFrustum(points)
+    object_names = [objectName] if isinstance(objectName, str) else list(objectName)
+    found, corners = frustum.node_bounding_boxes(object_names)
+    visible = found & frustum.frustum_visibility(cameraName, corners, frames)
+
+    if isinstance(objectName, str):
+        return bool(visible[0])
+    return visible.tolist()
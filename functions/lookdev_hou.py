@@ -1,10 +1,11 @@
 import hou
 import os
-import glob
 import re
-import json
 from difflib import SequenceMatcher
 
+from CETools.functions.texture_sets import index_texture_sets, merge_texture_sets, highest_tile, udim_path
+from CETools.functions.shader_connections import load_shader_connections
+
 
 def alternate_names(name):
     def camel_case(st):
@@ -23,8 +24,7 @@ def read_shader_connections(node, file_path, ignore, try_alternate_names):
     print(try_alternate_names)
 
     material_library = node.node('auto_materials')
-    with open(file_path, 'r') as f:
-        shader_data = json.load(f)
+    shader_data = load_shader_connections(file_path)
 
     if ignore:
         for shader_reference in shader_data.keys():
@@ -128,25 +128,12 @@ def connect_textures(node, folder_path, udim=False, use_latest=True, shader_from
         hou.ui.displayMessage(f"Invalid file path at:   {folder_path}")
         return
 
-    image_files = [f for f in glob.iglob(f'{folder_path}/*') if f.endswith((".png", ".jpg", ".tiff"))]
-
-    if use_latest is True:
-        image_files.sort(key=lambda f: int(''.join(filter(str.isdigit, f))))
-
-    if shader_from_file is True:
-        image_files = [f for f in glob.iglob(f'{folder_path}/*') if f.endswith((".png", ".jpg", ".tiff"))]
-        material_groups = {}
-        for file in image_files:
-            for texture_type in texture_types.keys():
-                if texture_type in file:
-                    file_name = os.path.basename(file)
-                    shader_name = file_name.split(texture_type)[0]
-                    tile_id = re.findall(r"\d+", file_name)[-1]
-                    if shader_name not in material_groups.keys():
-                        material_groups[shader_name] = {}
-                    if texture_type not in material_groups[shader_name].keys():
-                        material_groups[shader_name][texture_type] = {}
-                    material_groups[shader_name][texture_type][tile_id] = file
+    # use_latest picks the highest version when a folder holds several versions of a texture, without
+    # shader_from_file the whole folder becomes one material named after it
+    material_groups = index_texture_sets(folder_path, channels=tuple(texture_types), use_latest=use_latest)
+    if not shader_from_file:
+        material_groups = merge_texture_sets(material_groups, os.path.basename(os.path.normpath(folder_path)),
+                                             use_latest=use_latest)
 
     for shader_key in material_groups.keys():
 
@@ -155,16 +142,14 @@ def connect_textures(node, folder_path, udim=False, use_latest=True, shader_from
 
         for texture in material_groups[shader_key].keys():
 
-            highest_tile_id = max(material_groups[shader_key][texture].keys())
-            file_name = material_groups[shader_key][texture][highest_tile_id]
+            _, file_name = highest_tile(material_groups[shader_key][texture])
 
             file_node = material.createNode("arnold::image", node_name=f'{shader_key}{texture}')
 
             if len(material_groups[shader_key][texture].keys()) == 1:
                 file_node.parm('filename').set(file_name)
             else:
-                udim_name = re.sub('(\d{4})', "<UDIM>", file_name)
-                file_node.parm('filename').set(udim_name)
+                file_node.parm('filename').set(udim_path(file_name))
 
             if texture_types[texture][0] == 'a':
                 file_node = texture_to_raw(file_node, material, shader_key)
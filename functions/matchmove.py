@@ -4,11 +4,18 @@ from math import ceil, floor
 from maya.app.stereo import stereoCameraRig
 import random
 
+import numpy as np
 import maya.cmds as cmds
 import maya.api.OpenMaya as om2
 
 from CETools.functions.commonFunctions import *
 from CETools.functions.rigging import set_index_color
+from CETools.functions import kuper
+from CETools.functions.matrix_math import to_matrices, translation, euler_to_matrix, matrix_to_euler, \
+    normalized_rotation, continuous_euler
+from CETools.functions.renaming import RenameTarget, parse_name, plan_renames, find_collisions, needs_temp_names
+from CETools.functions.retime_table import is_retime_file, read_retime_columns
+from CETools.functions.exr_header import read_exr_sizes_many
 
 
 def unlock(objects):
@@ -40,22 +47,48 @@ def snap():
             cmds.xform(src, t=t, ro=ro, s=s, ws=1)
 
 
-def bake_selected(state='fast'):
+def bake_nodes(nodes, start_time, end_time, smart=False, attributes=('tx', 'ty', 'tz', 'rx', 'ry', 'rz'),
+               chunk_size=None, progress=None, is_cancelled=None):
+    # Bake every node in a single timeline sweep. With a chunk_size the sweep is split into frame blocks so
+    # progress(frame, start_time, end_time) can report and is_cancelled() can stop between blocks. Only the last
+    # block hands control to the baked curves, until then constraints and expressions keep driving the channels
+    # so each block samples the real motion. Returns False if the bake was cancelled.
+    if not chunk_size:
+        cmds.bakeResults(nodes, at=list(attributes), t=(start_time, end_time), smart=smart)
+        if progress:
+            progress(end_time, start_time, end_time)
+        return True
+
+    chunk_start = start_time
+    while chunk_start <= end_time:
+        if is_cancelled and is_cancelled():
+            return False
+        chunk_end = min(chunk_start + chunk_size - 1, end_time)
+        cmds.bakeResults(nodes, at=list(attributes), t=(chunk_start, chunk_end), smart=smart,
+                         preserveOutsideKeys=True, disableImplicitControl=chunk_end >= end_time)
+        if progress:
+            progress(chunk_end, start_time, end_time)
+        chunk_start = chunk_end + 1
+    return True
+
+
+def bake_selected(state='fast', evaluation_mode=None, chunk_size=None, progress=None, is_cancelled=None):
     selected = cmds.ls(selection=True)
     if not selected:
         logging.warning("Select an object to bake")
         return
-    with UndoStack("bake"):
+    with UndoStack("bake"), EvaluationMode(evaluation_mode):
+        start_time = cmds.playbackOptions(q=True, minTime=True)
+        end_time = cmds.playbackOptions(q=True, maxTime=True)
 
-        for sel in selected:
-            if state == 'fast':
-                cmds.bakeResults(sel, at=['tx', 'ty', 'tz', 'rx', 'ry', 'rz'], t=(
-                    cmds.playbackOptions(q=True, minTime=True), cmds.playbackOptions(q=True, maxTime=True)))
-            else:
-                cmds.bakeResults(sel, at=['tx', 'ty', 'tz', 'rx', 'ry', 'rz'], t=(
-                    cmds.playbackOptions(q=True, minTime=True), cmds.playbackOptions(q=True, maxTime=True)), smart=True)
+        if not bake_nodes(selected, start_time, end_time, smart=(state != 'fast'), chunk_size=chunk_size,
+                          progress=progress, is_cancelled=is_cancelled):
+            logging.warning("Bake cancelled, constraints were left in place.")
+            return
 
-            cmds.delete(cmds.listRelatives(sel, type='constraint'))
+        constraints = cmds.listRelatives(selected, type='constraint')
+        if constraints:
+            cmds.delete(constraints)
 
 
 def get_active_camera():
@@ -79,6 +112,31 @@ def get_avg_pos(selection):
     z = sum(cmds.xform(s, q=1, t=1, ws=1)[2] for s in selection) / len(selection)
     return x, y, z
 
+def screen_pan(cam_matrices, positions, focal_length, camera_scale=1.0, h_film_offset=0.0, v_film_offset=0.0):
+    # Project world positions into each frame's camera space and convert to 2D pan values (inches)
+    points = np.concatenate((positions, np.ones((len(positions), 1))), axis=1)
+    relative_pos = np.einsum('fi,fij->fj', points, np.linalg.inv(cam_matrices))
+
+    x = -(focal_length * (relative_pos[:, 0] / relative_pos[:, 2])) / 25.4
+    y = -(focal_length * (relative_pos[:, 1] / relative_pos[:, 2])) / 25.4
+
+    return (x / camera_scale) - h_film_offset, (y / camera_scale) - v_film_offset
+
+
+def pan_settings(camera):
+    return (cmds.getAttr(f'{camera}.cameraScale'), cmds.getAttr(f'{camera}.horizontalFilmOffset'),
+            cmds.getAttr(f'{camera}.verticalFilmOffset'))
+
+
+def key_screen_pan(camera, target, frames, focal_length):
+    # Pan the camera so target stays centred, sampled and keyed for every frame at once
+    horizontal_pan, vertical_pan = screen_pan(sample_world_matrices(camera, frames),
+                                              translation(sample_world_matrices(target, frames)),
+                                              focal_length, *pan_settings(camera))
+    set_keys(camera, 'horizontalPan', frames, horizontal_pan)
+    set_keys(camera, 'verticalPan', frames, vertical_pan)
+
+
 def cam_focus_2d():
     viewport_cam = get_active_camera()
     if viewport_cam is None:
@@ -110,26 +168,8 @@ def cam_focus_2d():
             cmds.xform(loc, t=(x, y, z), ws=1)
 
             cmds.parent(loc, shape)
-            camera_scale = cmds.getAttr('%s.cameraScale' % viewport_cam)
-            h_film_offset = cmds.getAttr('%s.horizontalFilmOffset' % viewport_cam)
-            v_film_offset = cmds.getAttr('%s.verticalFilmOffset' % viewport_cam)
-            for f in range(start_frame, end_frame + 1):
-                cam_world = om2.MMatrix(cmds.getAttr('%s.worldMatrix' % viewport_cam, t=f))
-                sel_pos = om2.MPoint(cmds.getAttr('%s.worldPosition[0]' % loc[0], t=f)[0])
-
-                relative_pos = sel_pos * cam_world.inverse()
-
-                x = -(focal_length * (relative_pos[0] / relative_pos[2])) / 25.4
-                y = -(focal_length * (relative_pos[1] / relative_pos[2])) / 25.4
-
-                horizontal_pan = (x / camera_scale) - h_film_offset
-                vertical_pan = (y / camera_scale) - v_film_offset
-
-                cmds.setAttr('%s.horizontalPan' % viewport_cam, horizontal_pan)
-                cmds.setAttr('%s.verticalPan' % viewport_cam, vertical_pan)
-
-                cmds.setKeyframe('%s.horizontalPan' % viewport_cam, time=f, v=horizontal_pan)
-                cmds.setKeyframe('%s.verticalPan' % viewport_cam, time=f, v=vertical_pan)
+            frames = np.arange(start_frame, end_frame + 1, dtype=np.float64)
+            key_screen_pan(viewport_cam, loc[0], frames, focal_length)
 
             cmds.delete(loc)
     else:
@@ -149,72 +189,105 @@ def delete_track():
     cmds.setAttr('%s.zoom' % viewport_cam, 1)
 
 
-def duplicate_camera(camera=None):
+def duplicate_camera(camera=None, stereo=True, lock=True, group='camTrack'):
+    # Fresh copies of one or more cameras (and their image planes) under the camTrack group.
+    # A single camera becomes CamMain, several (witness cams) keep their own names.
+    # Returns {old camera: new camera} with long names.
     if camera is None:
-        camera = cmds.ls(sl=1)
-        if not cmds.listRelatives(camera, type='camera'):
-            logging.warning("Select a camera to create a fresh copy.")
-            return
+        camera = cmds.ls(sl=1, l=1)
+    cameras = [cam for cam in cmds.ls(camera, l=1) if cmds.listRelatives(cam, type='camera', f=1)]
+    if not cameras:
+        logging.warning("Select a camera to create a fresh copy.")
+        return
 
     with UndoStack('duplicateCam'):
+        new_cameras = []
+        image_planes = []
+        for cam in cameras:
+            camera_shape = cmds.listRelatives(cam, type='camera', f=1)[0]
+            old_nodes = set(cmds.listRelatives(camera_shape, f=1) or [])
+
+            new_cam = cmds.ls(cmds.duplicate(cam, un=1, rc=1)[0], l=1)[0]
+            new_cameras.append(new_cam)
+
+            # Duplicated image planes come out under the original camera shape
+            new_shape = cmds.listRelatives(new_cam, type='camera', f=1)[0]
+            for node in cmds.listRelatives(camera_shape, f=1) or []:
+                if node not in old_nodes:
+                    image_planes.append((cmds.listRelatives(node, s=1, f=1), new_shape))
+
+        for image_plane, new_shape in image_planes:
+            cmds.imagePlane(image_plane, e=1, c=new_shape, sia=0)
+
+        if lock:
+            for cam in new_cameras:
+                for attr in ('translateX', 'translateY', 'translateZ', 'rotateX', 'rotateY', 'rotateZ'):
+                    cmds.setAttr(f"{cam}.{attr}", lock=True)
+
+        if not cmds.objExists(f'|{group}'):
+            cmds.group(em=1, name=group, w=1)
+        # Copies of cameras already under the group are there already, parent only the others so the
+        # list keeps lining up with the source cameras
+        to_move = [i for i, cam in enumerate(new_cameras) if cmds.listRelatives(cam, p=1, f=1) != [f'|{group}']]
+        if to_move:
+            moved = cmds.ls(cmds.parent([new_cameras[i] for i in to_move], f'|{group}'), l=1)
+            for i, new_cam in zip(to_move, moved):
+                new_cameras[i] = new_cam
+
+        if len(cameras) == 1:
+            names = ['CamMain' if 'CamMain' not in new_cameras[0].split('|')[-1] else None]
+        else:
+            names = [cam.split('|')[-1].split(':')[-1] for cam in cameras]
+        for i, name in enumerate(names):
+            if name:
+                new_cameras[i] = cmds.ls(cmds.rename(new_cameras[i], name), l=1)[0]
 
-        camera_shape = cmds.listRelatives(camera, s=1, f=1)[0]
-        old_nodes = cmds.listRelatives(camera_shape, f=1)
-
-        cam = cmds.duplicate(camera, un=1, rc=1)[0]
-        if 'CamMain' not in cam:
-            cam = cmds.rename(cam, 'CamMain')
-
-        parent = cmds.listRelatives(cam, p=1)
-        if parent:
-            cam = cmds.parent(cam, w=1)[0]
+        if stereo:
+            # Set up the stereo camera rig
+            for cam in new_cameras:
+                stereoCameraRig.rigRoot(cmds.listRelatives(cam, f=1)[0])
 
-        cam_shape = cmds.listRelatives(cam, s=1, f=1)[0]
+        cmds.select(new_cameras, r=1)
+        return dict(zip(cameras, new_cameras))
 
-        new_nodes = cmds.listRelatives(camera_shape, f=1)
-        if new_nodes:
-            for n in new_nodes:
-                if n not in old_nodes:
-                    cmds.imagePlane(cmds.listRelatives(n, s=1), e=1, c=cam_shape, sia=0)
 
-        for attr in ['translateX', 'translateY', 'translateZ', 'rotateX', 'rotateY', 'rotateZ']:
-            cmds.setAttr(f"{cam}.{attr}", lock=True)
+RETIME_ATTRIBUTES = ('translateX', 'translateY', 'translateZ', 'rotateX', 'rotateY', 'rotateZ')
 
-        if not cmds.objExists('camTrack'):
-            cmds.group(em=1, name='camTrack', w=1)
 
-        cmds.parent(cam, '|camTrack')
-        fresh_camera = '|camTrack|' + cam
+def retime_keys(targets, old_time, new_time, attributes=RETIME_ATTRIBUTES):
+    # Every channel is sampled at the old times in one pass before any new keys are written,
+    # so the new keys never read back values that were already retimed.
+    for target in targets:
+        for at in attributes:
+            cmds.setAttr(f"{target}.{at}", lock=False)
+            values = sample_anim_curve(target, at, old_time)
+            if values is not None:
+                set_keys(target, at, new_time, values)
 
-        # Set up the stereo camera rig
-        stereoCameraRig.rigRoot(cmds.listRelatives(fresh_camera, f=1)[0])
-        cmds.select(fresh_camera, r=1)
-        return fresh_camera
+    # First new frame whose source frame falls past the end of the retimed range
+    past_end = new_time[old_time > new_time.max()]
+    return float(past_end[0]) if past_end.size else 0.0
 
 
 def run_retime(camera='camera1', retime_path=None, sequence_path=None, overwrite=False, insert=True,
                reverse_order=False):
     # assign default preferences
 
-    if not retime_path or not path.isfile(retime_path) or not retime_path.endswith(
-            '.ascii') or not retime_path.endswith('.txt'):
-        logging.warning("Retime File is not a valid .ascii or .txt, aborting.")
+    if not is_retime_file(retime_path):
+        logging.warning("Retime File is not a valid .ascii, .txt or .csv, aborting.")
         return
 
     if sequence_path is None or not path.isfile(sequence_path) or not sequence_path.endswith('.exr'):
         logging.warning("Sequence File is not a valid .exr, aborting.")
         return
 
-    old_column = 0
-    new_column = 1
-
-    if reverse_order is True:
-        old_column, new_column = 1, 0
-
     selected = cmds.ls(sl=1, l=1)
 
     with UndoStack("retime"):
-        camera = duplicate_camera(camera)
+        fresh_cameras = duplicate_camera(camera)
+        if not fresh_cameras:
+            return
+        camera = list(fresh_cameras.values())[0]
         cam_shp = cmds.listRelatives(camera, f=1)
 
         targets = [camera]
@@ -224,40 +297,18 @@ def run_retime(camera='camera1', retime_path=None, sequence_path=None, overwrite
             target_list.extend(selected)
             targets = list(set(target_list))
 
-        old_time = []
-        new_time = []
-        with open(retime_path) as file:
-            for item in file:
-                try:
-                    item = item.strip("\n")
-                    line = item.split(" ")
-                    old_time.append(line[old_column])
-                    new_time.append(line[new_column])
-                except IndexError:
-                    pass
-
-        # Remove empty spaces
-        old_time = [float(i) for i in old_time if i]
-        new_time = [float(i) for i in new_time if i]
-        end_frame = 0.0
+        old_time, new_time = read_retime_columns(retime_path, reverse_order=reverse_order)
+        if not old_time.size:
+            logging.warning("Retime File has no readable frames, aborting.")
+            return
 
-        for target in targets:
-            for o, n in zip(old_time, new_time):
-                for at in ['translateX', 'translateY', 'translateZ', 'rotateX', 'rotateY', 'rotateZ']:
-                    cmds.setAttr(f"{target}.{at}", lock=False)
-                    value = cmds.keyframe(target, q=1, at=at, eval=1, t=(o,))
-                    if value:
-                        cmds.setKeyframe(target, time=(n,), v=value[0], at=at)
-                    if end_frame == 0.0:
-                        if o > max(new_time):
-                            end_frame = n
+        end_frame = retime_keys(targets, old_time, new_time)
 
         # Get the lowest and highest keys from combined list, rounded, and set them as the bake animation range
         if overwrite is True:
-            time_range = sorted(new_time)
-            start = floor(float(time_range[0]))
-            end = ceil(float(time_range[-1]))
-            if max(old_time) > max(new_time):
+            start = floor(new_time.min())
+            end = ceil(new_time.max())
+            if old_time.max() > new_time.max():
                 end_frame = end
 
             cmds.bakeResults(camera, time=(start, end_frame))
@@ -286,42 +337,103 @@ def run_retime(camera='camera1', retime_path=None, sequence_path=None, overwrite
             pass
 
 
+def inverted_local_matrices(host_matrices, host_rest, target_matrices, parent_matrices=None):
+    # Target motion with the host's animation moved onto it: host_rest is where the host stays once its keys
+    # are gone, so target relative to host is unchanged on every frame. Returns (F, 4, 4) local matrices.
+    world = target_matrices @ np.linalg.inv(host_matrices) @ host_rest
+    if parent_matrices is None:
+        return world
+    return world @ np.linalg.inv(parent_matrices)
+
+
+def transform_channels(node, local_matrices):
+    # Translate and rotate values (F, 3) that give node these local matrices, taking its rotate order,
+    # rotate axis, pivots and (static) scale into account
+    rotate_order = cmds.getAttr(f'{node}.rotateOrder')
+    rotate_pivot = np.array(cmds.getAttr(f'{node}.rotatePivot')[0])
+    rotate_pivot_translate = np.array(cmds.getAttr(f'{node}.rotatePivotTranslate')[0])
+    scale_pivot = np.array(cmds.getAttr(f'{node}.scalePivot')[0])
+    scale_pivot_translate = np.array(cmds.getAttr(f'{node}.scalePivotTranslate')[0])
+    scale = np.array(cmds.getAttr(f'{node}.scale')[0])
+    rotate_axis = euler_to_matrix(cmds.getAttr(f'{node}.rotateAxis')[0])
+
+    rotation = normalized_rotation(local_matrices)
+    channels_rotation = np.swapaxes(rotate_axis, -1, -2) @ rotation
+    rotates = continuous_euler(matrix_to_euler(channels_rotation, rotate_order))
+
+    # M = SP^-1 S SP ST RP^-1 RA R RP RT T, solved for T
+    pivot_offset = (-scale_pivot * scale + scale_pivot + scale_pivot_translate - rotate_pivot)
+    translates = (translation(local_matrices) - np.einsum('i,fij->fj', pivot_offset, rotation) - rotate_pivot
+                  - rotate_pivot_translate)
+    return translates, rotates
+
+
 def invert_anim(host=None, target=None):
-    if not cmds.objExists(host):
+    # Moves the host's animation onto one or more targets: afterwards the host is still and every target moves
+    # so that its placement relative to the host is the same on every frame. Keys are computed from sampled
+    # world matrices, no temporary nodes or bakes.
+    targets = [target] if isinstance(target, str) else list(target or [])
+
+    if not host or not cmds.objExists(host):
         logging.warning('Animated Object is not valid, aborting.')
         return
 
-    if not cmds.objExists(target):
+    if not targets or not all(cmds.objExists(t) for t in targets):
         logging.warning('Target is not valid, aborting.')
         return
 
     with UndoStack("invertAnim"):
-        duplicate = cmds.duplicate(target, rc=1, po=1)[0]
-        target_grp = cmds.listRelatives(target, p=1)
-        grp = cmds.group(target)
-        new_dest = cmds.parent(grp, host)[0]
-
-        target = host + '|' + new_dest + '|' + target.split('|')[-1]
-        con_pnt = cmds.pointConstraint(duplicate, target)
-        con_ori = cmds.orientConstraint(duplicate, target)
-
-        start_time = cmds.playbackOptions(query=True, minTime=True)
-        end_time = cmds.playbackOptions(query=True, maxTime=True)
-        cmds.bakeResults(target, time=(start_time, end_time))
-
-        cmds.delete(con_pnt, con_ori)
-        if target_grp:
-            cmds.parent(target, target_grp)
-        else:
-            cmds.parent(target, w=1)
+        frames = get_playback_frames()
+        host_matrices = sample_world_matrices(host, frames)
+        host_rest = to_matrices(cmds.getAttr(f'{host}.worldMatrix[0]'))[0]
+
+        channels = []
+        for t in targets:
+            parent = cmds.listRelatives(t, p=1, f=1)
+            parent_matrices = sample_world_matrices(parent[0], frames) if parent else None
+            local_matrices = inverted_local_matrices(host_matrices, host_rest, sample_world_matrices(t, frames),
+                                                     parent_matrices)
+            channels.append(transform_channels(t, local_matrices))
+
+        # Everything is sampled before the first key goes down, so targets parented under each other still
+        # read their original motion
+        for t, (translates, rotates) in zip(targets, channels):
+            cmds.cutKey(t, at=['tx', 'ty', 'tz', 'rx', 'ry', 'rz'], cl=1)
+            for i, attribute in enumerate(('tx', 'ty', 'tz')):
+                set_keys(t, attribute, frames, translates[:, i])
+            for i, attribute in enumerate(('rx', 'ry', 'rz')):
+                set_keys(t, attribute, frames, rotates[:, i])
 
         cmds.cutKey(host, s=True)
-        cmds.delete(duplicate, grp)
+
+
+def get_track_cone_shading_group():
+    if not cmds.objExists('track_cones_MAT'):
+        shader = cmds.shadingNode("surfaceShader", asShader=True, name='track_cones_MAT')
+        cmds.setAttr(shader + ".outColor", 1, 0, 0, type="double3")
+    shading_groups = cmds.listConnections('track_cones_MAT.outColor', type='shadingEngine')
+    if shading_groups:
+        return shading_groups[0]
+
+    shading_group = cmds.sets(renderable=True, noSurfaceShader=True, empty=True, name="track_cones_SG")
+    cmds.connectAttr('track_cones_MAT.outColor', f'{shading_group}.surfaceShader', f=True)
+    return shading_group
+
+
+def create_track_cone(height=2, initial_scaling_value=5):
+    # Cone pointing down with its pivot on the tip, so placing it at a point puts the tip on the point
+    cone = cmds.polyCone(radius=1, height=height, subdivisionsX=20, subdivisionsY=1, ch=0)[0]
+    cmds.xform(cone, scale=(initial_scaling_value, initial_scaling_value, initial_scaling_value),
+               rotation=(180, 0, 0), translation=(0, initial_scaling_value, 0))
+    cmds.makeIdentity(cone, apply=True, translate=True, rotate=True, scale=True)
+    bbox = cmds.exactWorldBoundingBox(cone)
+    cmds.xform(cone, piv=[(bbox[0] + bbox[3]) / 2, bbox[1], (bbox[2] + bbox[5]) / 2], ws=True)
+    return cone
 
 
 def create_cones_at_pivots():
     # Get the selection from the outliner
-    selected = cmds.ls(sl=1)
+    selected = cmds.ls(sl=1, l=1)
 
     if not selected:
         logging.warning("No objects selected in the outliner.")
@@ -329,47 +441,19 @@ def create_cones_at_pivots():
     with UndoStack('createCones'):
         # Create a group for the cones in the outliner
         cone_group = cmds.group(empty=True, name="track_cones")
+        positions = np.array(cmds.xform(selected, q=True, t=True, ws=True)).reshape(-1, 3).tolist()
 
-        # Loop through selected objects and create cones at their pivots
-        for sel in selected:
-            height = 2
-            # Create a cone at the pivot position with default scaling
-            cone = cmds.polyCone(radius=1, height=height, subdivisionsX=20, subdivisionsY=1)
-            cmds.setAttr(cone[0] + ".scaleX", 5)
-            cmds.setAttr(cone[0] + ".scaleY", 5)
-            cmds.setAttr(cone[0] + ".scaleZ", 5)
-
-            # Rotate the cone to 180 degrees
-            cmds.setAttr(cone[0] + ".rotateX", 180)
-            cmds.setAttr(cone[0] + ".rotateY", 0)
-            cmds.setAttr(cone[0] + ".rotateZ", 0)
-
-            # Translate the cone to match the initial scaling in Y
-            initial_scaling_value = 5
-            cmds.setAttr(cone[0] + ".translateY", initial_scaling_value)
-
-            # Move the pivot of the cone to the bottom vertex
-            cmds.makeIdentity(cone[0], apply=True, translate=True, rotate=True, scale=True)
-            bbox = cmds.exactWorldBoundingBox(cone[0])
-            bottom = [(bbox[0] + bbox[3]) / 2, bbox[1], (bbox[2] + bbox[5]) / 2]
-            cmds.xform(cone[0], piv=bottom, ws=True)
-
-            # Move the cone to the pivot position of the object
-            pivot_position = cmds.xform(sel, q=True, t=True, ws=True)
-            cmds.xform(cone[0], translation=pivot_position, r=True)
-
-            # Create a red surface shader and assign it to the cone
-            if not cmds.objExists('track_cones_MAT'):
-                shader = cmds.shadingNode("surfaceShader", asShader=True, name='track_cones_MAT')
-                cmds.sets(renderable=True, noSurfaceShader=True, empty=True, name="track_cones_SG")
-                cmds.setAttr(shader + ".outColor", 1, 0, 0, type="double3")
-                cmds.select(cone[0])
-                cmds.hyperShade(assign=shader)
-            else:
-                cmds.select(cone[0])
-                cmds.hyperShade(assign='track_cones_MAT')
+        # One cone is built and shaded, every other cone is an instance of its shape
+        prototype = create_track_cone()
+        cmds.sets(cmds.listRelatives(prototype, s=1, f=1), e=1, forceElement=get_track_cone_shading_group())
+        prototype = cmds.parent(prototype, cone_group)[0]
+
+        cones = [prototype]
+        for _ in positions[1:]:
+            cones.append(cmds.instance(prototype)[0])
 
-            cmds.parent(cone[0], cone_group)
+        for cone, pivot_position in zip(cones, positions):
+            cmds.xform(cone, translation=pivot_position, ws=True)
 
 
 def select_cones():
@@ -388,32 +472,141 @@ def scale_cones(factor=1.0):
         cmds.xform(sel, scale=new_scale)
 
 
-def cam_depth(size=1.0):
-    selected = cmds.ls(sl=1)
+def depth_scales(cam_positions, positions, focal_length, size=1.0):
+    # Scale that keeps each object a constant size through the lens, 0.254 for inches conversion.
+    # cam_positions/focal_length can be per frame, giving a (frames, objects) array.
+    dist = np.linalg.norm(positions - np.asarray(cam_positions)[..., None, :], axis=-1)
+    return size * ((0.254 * dist) / np.asarray(focal_length, dtype=np.float64)[..., None])
+
+
+def key_uniform_scale(nodes, frames, scales):
+    # scales is (nodes, frames). Nodes without scale inputs get one new curve, filled with a single setAttr, that
+    # drives scaleX, Y and Z together. Scale channels that are already keyed or driven are merged with set_keys.
+    ktv_range = f'ktv[0:{len(frames) - 1}]'
+    for node, node_scales in zip(nodes, scales):
+        sel = om2.MSelectionList()
+        sel.add(node)
+        fn_node = om2.MFnDependencyNode(sel.getDependNode(0))
+        if any(fn_node.findPlug(at, False).isDestination for at in ('scaleX', 'scaleY', 'scaleZ')):
+            for at in ('scaleX', 'scaleY', 'scaleZ'):
+                set_keys(node, at, frames, node_scales)
+            continue
+
+        curve = cmds.createNode('animCurveTU', name=f'{node.split("|")[-1]}_scale', skipSelect=True)
+        cmds.setAttr(f'{curve}.{ktv_range}', *np.column_stack((frames, node_scales)).ravel().tolist())
+        set_key_tangents(curve, np.arange(len(frames)), *default_tangents())
+        for at in ('scaleX', 'scaleY', 'scaleZ'):
+            cmds.connectAttr(f'{curve}.output', f'{node}.{at}')
+
+
+def set_uniform_scale(nodes, scales):
+    # Every node's scaleX, Y and Z set in one MDGModifier, run as a single undoable command
+    modifier = om2.MDGModifier()
+    for node, scale in zip(nodes, scales.tolist()):
+        sel = om2.MSelectionList()
+        sel.add(node)
+        fn_node = om2.MFnDependencyNode(sel.getDependNode(0))
+        for at in ('scaleX', 'scaleY', 'scaleZ'):
+            modifier.newPlugValueDouble(fn_node.findPlug(at, False), scale)
+    do_modifier(modifier)
+
+
+def cam_depth(size=1.0, animate=False):
+    selected = cmds.ls(sl=1, l=1)
+    if not selected:
+        logging.warning("Select the cones or locators to scale.")
+        return
+
     viewports = cmds.getPanel(type='modelPanel')
     visible = cmds.getPanel(vis=True)
     active_panel = ''
 
-    with UndoStack(cam_depth):
+    for i in viewports:
+        if i in visible:
+            active_panel = i
 
-        for i in viewports:
-            if i in visible:
-                active_panel = i
+    if active_panel == '':
+        logging.warning("No visible viewport camera found.")
+        return
 
-        viewport_cam = cmds.modelPanel(active_panel, q=True, camera=True)
-        focal_length = cmds.getAttr('%s.focalLength' % viewport_cam)
-        t1 = cmds.xform(viewport_cam, q=1, t=1)
-        v1 = om2.MVector(t1)
+    viewport_cam = cmds.modelPanel(active_panel, q=True, camera=True)
+    camera_shape = (cmds.listRelatives(viewport_cam, type='camera', f=True) or [viewport_cam])[0]
+
+    # One query for every selected position
+    positions = np.array(cmds.xform(selected, q=1, t=1, ws=1), dtype=np.float64).reshape(-1, 3)
+
+    with UndoStack('cam_depth'):
 
-        for sel in selected:
-            t2 = cmds.xform(sel, q=1, t=1, ws=1)
-            v2 = om2.MVector(t2)
+        if animate:
+            # Moving camera: one scale key per frame, all frames computed at once
+            frames = get_playback_frames()
+            cam_positions = translation(sample_world_matrices(viewport_cam, frames))
+            focal_length = sample_attribute(f'{camera_shape}.focalLength', frames)
+            scales = depth_scales(cam_positions, positions, focal_length, size)
+
+            key_uniform_scale(selected, frames, scales.T)
+
+        else:
+            cam_position = cmds.xform(viewport_cam, q=1, t=1, ws=1)
+            focal_length = cmds.getAttr(f'{camera_shape}.focalLength')
+            scales = depth_scales(cam_position, positions, focal_length, size)
+
+            set_uniform_scale(selected, scales)
+
+
+def get_image_plane_shape(camera):
+    cam_shape = cmds.listRelatives(camera, type='camera', f=1) or [camera]
+    image_plane = cmds.listRelatives(cam_shape[0], f=1)
+    if not image_plane:
+        return None
+    image_shape = cmds.listRelatives(image_plane[0], type='imagePlane', f=1) or \
+        cmds.ls(image_plane[0], type='imagePlane', l=1)
+    return image_shape[0] if image_shape else None
+
+
+def coverage_origins(coverages, new_sizes, pixel_aspect=1):
+    # Offsets (N, 2) that keep the current coverage centred on the bigger (overscan) plates
+    coverages = np.asarray(coverages, dtype=np.float64).reshape(-1, 2)
+    new_sizes = np.asarray(new_sizes, dtype=np.float64).reshape(-1, 2)
+    return (new_sizes - coverages) * (pixel_aspect, 1.0) / 2
+
+
+def filmback_correct_batch(camera_files, pixel_aspect=1, window='data'):
+    # camera_files is {camera: undistorted exr}. Plate sizes come from the exr headers (the dataWindow, or the
+    # displayWindow with window='display'), read in parallel, so Maya never has to load an image to report its
+    # size. Returns {camera: (coverage origin x, coverage origin y)} for the cameras that were corrected.
+    cameras, image_shapes, files = [], [], []
+    for camera, file in camera_files.items():
+        if file is None or not path.isfile(file) or not file.endswith('.exr'):
+            logging.warning(f"{camera}: Undistorted Sequence File is not a valid .exr, skipped.")
+            continue
+        image_shape = get_image_plane_shape(camera)
+        if image_shape is None:
+            logging.warning(f'{camera} needs an image plane, skipped.')
+            continue
+        cameras.append(camera)
+        image_shapes.append(image_shape)
+        files.append(file)
+
+    sizes = read_exr_sizes_many(files)
+    valid = [i for i, size in enumerate(sizes) if size is not None]
+    for i in set(range(len(files))) - set(valid):
+        logging.warning(f"{cameras[i]}: couldn't read the exr header of {files[i]}, skipped.")
+    if not valid:
+        return {}
+
+    coverages = [cmds.getAttr(f'{image_shapes[i]}.coverage')[0] for i in valid]
+    new_sizes = [sizes[i][2:] if window == 'display' else sizes[i][:2] for i in valid]
+    origins = coverage_origins(coverages, new_sizes, pixel_aspect)
 
-            dist = om2.MVector(v2 - v1).length()
+    with UndoStack('filmback'):
+        for i, coverage, origin in zip(valid, coverages, origins.tolist()):
+            image_shape = image_shapes[i]
+            cmds.setAttr(f'{image_shape}.imageName', files[i], type='string')
+            cmds.setAttr(f'{image_shape}.coverageOrigin', *origin)
+            cmds.setAttr(f'{image_shape}.coverage', *coverage)
 
-            scale = size * ((0.254 * dist) / focal_length)  # 0.254 for inches conversion
-            new_scale = (scale, scale, scale)
-            cmds.xform(sel, scale=new_scale)
+    return {cameras[i]: tuple(origin) for i, origin in zip(valid, origins.tolist())}
 
 
 def filmback_correct(file=None, pixel_aspect=1):
@@ -438,32 +631,7 @@ def filmback_correct(file=None, pixel_aspect=1):
         logging.warning("No active viewport camera found. Make sure a viewport window is currently in focus.")
         return
 
-    cam_shape = cmds.listRelatives(viewport_cam)
-    image_plane = cmds.listRelatives(cam_shape)
-
-    try:
-        image_shape = cmds.listRelatives(image_plane)[0]
-    except TypeError:
-        logging.warning('Current camera needs an image plane.')
-        return
-
-    with UndoStack('filmback'):
-
-        coverage_x = cmds.getAttr('%s.coverageX' % image_shape)
-        coverage_y = cmds.getAttr('%s.coverageY' % image_shape)
-
-        cmds.setAttr('%s.imageName' % image_shape, file, type='string')
-
-        new_width = cmds.getAttr('%s.coverageX' % image_shape)
-        new_height = cmds.getAttr('%s.coverageY' % image_shape)
-
-        cov_origin_x = ((new_width * pixel_aspect) - (coverage_x * pixel_aspect)) / 2
-        cov_origin_y = (new_height - coverage_y) / 2
-
-        cmds.setAttr('%s.coverageOriginX' % image_shape, cov_origin_x)
-        cmds.setAttr('%s.coverageOriginY' % image_shape, cov_origin_y)
-        cmds.setAttr('%s.coverageX' % image_shape, coverage_x)
-        cmds.setAttr('%s.coverageY' % image_shape, coverage_y)
+    return filmback_correct_batch({viewport_cam: file}, pixel_aspect=pixel_aspect)
 
 
 def define_selection():
@@ -499,179 +667,123 @@ def choose_file():
         return
 
 
-def open_file(which_file, f_kuper):
-    if which_file:
-        try:
-            if f_kuper.closed is True:
-                f_kuper = open(which_file, 'w')
-            else:
-                f_kuper = open(which_file, 'a')
-        except:
-            f_kuper = open(which_file, 'w')
-        return True, f_kuper
-    else:
-        return False, None
-
-
-def close_file(f_kuper):
-    try:
-        f_kuper.close()
-        print('closed file\n')
-    except:
-        print('')
-
-
 def write_camera_anim(which_cam, f_kuper):
-    frame_start = cmds.playbackOptions(q=True, minTime=True)
-    frame_end = cmds.playbackOptions(q=True, maxTime=True)
-
-    # ---------------- Header -----------------------------------
-    # f.write('group_camera = %s' %whichCam)
-    f_kuper.write('Axes = frame, VTrack, VEW, VNS, Vpan, VTilt, VRoll, focal\n')
-
-    # frames
-    for frame in range(int(frame_start), int(frame_end) + 1):
-        cmds.currentTime(frame, edit=True)
-        translates = cmds.xform(which_cam, q=True, ws=True, t=True)
-        tx = translates[0]
-        ty = translates[1]
-        tz = translates[2]
-
-        rotates = cmds.xform(which_cam, q=True, ws=True, ro=True)
-        rx = rotates[0]
-        ry = rotates[1]
-        rz = rotates[2]
-        focal = cmds.camera(which_cam, q=True, fl=True)
-        f_kuper.write('%.6f %.9f %.9f %.9f %.9f %.9f %.9f %.9f\n' % (frame, tz, tx, ty, -ry, rx, -rz, focal))
+    kuper.write_rows(f_kuper, kuper.CAMERA_HEADER, kuper.camera_rows(which_cam, get_playback_frames()),
+                     kuper.CAMERA_FORMAT)
 
 
 def write_object_anim(which_obj, f_kuper):
-    frame_start = cmds.playbackOptions(q=True, minTime=True)
-    frame_end = cmds.playbackOptions(q=True, maxTime=True)
-
-    f_kuper.write('Axes = frame, VTrack, VEW, VNS, Vpan, VTilt, VRoll\n')
-
-    # frames
-    for frame in range(int(frame_start), int(frame_end) + 1):
-        cmds.currentTime(frame, edit=True)
-        translates = cmds.xform(which_obj, q=True, ws=True, t=True)
-        tx = translates[0]
-        ty = translates[1]
-        tz = translates[2]
-
-        rotates = cmds.xform(which_obj, q=True, ws=True, ro=True)
-        rx = rotates[0]
-        ry = rotates[1]
-        rz = rotates[2]
-        # order is = Frame, Tz, Tx, Ty, -Ry, Rx, -Rz (with spaces)
-        f_kuper.write('%.6f %.9f %.9f %.9f %.9f %.9f %.9f\n' % (frame, tz, tx, ty, -ry, rx, -rz))
+    kuper.write_rows(f_kuper, kuper.OBJECT_HEADER, kuper.object_rows(which_obj, get_playback_frames()),
+                     kuper.OBJECT_FORMAT)
 
 
 def write_pts_info(which_type, which_grp, f_kuper):
-    locator_list = []
-
-    f_kuper.write('\npoints_%s = %s\n' % (which_type, which_grp))
-    child_list = cmds.listRelatives(which_grp, type='transform', c=True)
-
-    for eachSel in child_list:
-        shape = cmds.listRelatives(eachSel, s=True, c=True)[0]
-
-        if cmds.objectType(str(shape)) == 'locator':
-            locator_list.append(str(eachSel))
-
-    for transform in locator_list:
-        t = cmds.xform(transform, q=1, ws=1, t=1)
-        tokens = transform.split("|")
-
-        f_kuper.write((tokens[- 1] + " point x: " + str(t[0]) + " y: " + str(t[1]) + " z: " + str(t[2]) + "\n"))
+    kuper.write_points(f_kuper, which_type, which_grp)
 
 
 def kuper_main():
-    file_to_write_kuper = ''
-    f_kuper = None
-
     selection_list = define_selection()
-    if len(selection_list) > 0:
-        file_to_write_kuper = choose_file()
-    else:
+    if not selection_list:
         logging.warning('please select a camera, point group, and or object group')
+        return
 
-    for each in selection_list:
-        group_type = str(each.split('_')[0])
-        if group_type == 'camera':
-            camera = each.split('camera_')[1]
-            if file_to_write_kuper != '':
-                is_file, f_kuper = open_file(file_to_write_kuper, f_kuper)
-                if is_file:
-                    write_camera_anim(camera, f_kuper)
-
-        if group_type == 'vobjgroup':
-            obj_group = each.split('vobjgroup_')[1]
-            if file_to_write_kuper != '':
-                is_file, f_kuper = open_file(file_to_write_kuper, f_kuper)
-                if is_file:
-                    write_object_anim(obj_group, f_kuper)
-
-    if file_to_write_kuper != '':
-        close_file(f_kuper)
+    cameras = [each.split('camera_', 1)[1] for each in selection_list if each.startswith('camera_')]
+    obj_groups = [each.split('vobjgroup_', 1)[1] for each in selection_list if each.startswith('vobjgroup_')]
 
+    file_to_write_kuper = choose_file()
+    if file_to_write_kuper:
+        kuper.write_kuper(file_to_write_kuper, cameras=cameras, objects=obj_groups)
+
+
+def aim_rotations(cam_matrices, positions):
+    # Local rotations (F, 3) of a group under a camera-following parent, aimed down +z at positions (F, 3)
+    # with +y kept towards world up, the same result as aimConstraint(aim=(0, 0, 1)) with default up vectors.
+    # Returns the rotations and the camera to target distances.
+    offsets = positions - translation(cam_matrices)
+    distances = np.linalg.norm(offsets, axis=1)
+
+    z_axis = offsets / np.where(distances == 0.0, 1.0, distances)[:, None]
+    x_axis = np.cross([0.0, 1.0, 0.0], z_axis)
+    x_lengths = np.linalg.norm(x_axis, axis=1)
+    # Looking straight up or down, fall back to world x
+    straight_up = x_lengths < 1e-12
+    x_axis[straight_up] = (1.0, 0.0, 0.0)
+    x_lengths[straight_up] = 1.0
+    x_axis /= x_lengths[:, None]
+    y_axis = np.cross(z_axis, x_axis)
+
+    world_rotations = np.stack([x_axis, y_axis, z_axis], axis=1)
+    local_rotations = world_rotations @ np.swapaxes(normalized_rotation(cam_matrices), 1, 2)
+    return continuous_euler(matrix_to_euler(local_rotations)), distances
+
+
+def z_constrain(src_obj, dest_obj, from_matrices=True):
+    # Depth rig for one camera and any number of targets. Every target gets a screenXY group aimed at it from a
+    # shared worldXYZ group that follows the camera, with a distance locator in front it is point constrained to.
+    # Sliding distance.tz then moves the target along the camera ray without changing its screen position.
+    # from_matrices keys the helpers straight from sampled world matrices, otherwise the helpers are constrained
+    # and all of them baked together in one sweep.
+    targets = [dest_obj] if isinstance(dest_obj, str) else list(dest_obj)
 
-def z_constrain(src_obj, dest_obj):
-    # create a locator and parent to camera
     if not cmds.objExists(src_obj):
         logging.warning('Camera is not valid.')
         return
 
-    if not cmds.objExists(dest_obj):
+    if not targets or not all(cmds.objExists(target) for target in targets):
         logging.warning('Target Object is not valid.')
         return
 
     with UndoStack('z_constrain'):
         cmds.select(cl=1)
+        frames = get_playback_frames()
 
-        world_grp = cmds.group(n="worldXYZ", em=1)
-        world_grp = cmds.ls(world_grp, l=1)[0]
-        cmds.parentConstraint(src_obj, world_grp, mo=0)
-        cmds.select(world_grp, r=1)
-        bake_selected(state="fast")
-
-        new_group = cmds.group(n="screenXY", em=1)
-        new_group = cmds.ls(new_group, l=1)[0]
-
-        cmds.parent(new_group, world_grp, r=1)
-        cmds.aimConstraint(dest_obj, world_grp + new_group, aim=(0, 0, 1))
-        cmds.select(world_grp + new_group, r=1)
-        bake_selected(state="fast")
-
-        distance_locator = cmds.spaceLocator(n="distance")[0]
-        distance_locator = cmds.ls(distance_locator, l=1)[0]
-
-        cmds.parent(distance_locator, world_grp + new_group, r=1)
-
-        cmds.setAttr(world_grp + new_group + distance_locator + ".translateZ", 10)
-        print(world_grp + new_group + distance_locator)
-        z_constraint = \
-            cmds.pointConstraint(dest_obj, world_grp + new_group + distance_locator, offset=(0, 0, 0), skip=('x', 'y'),
-                                 weight=1)[0]
-        cmds.select(cl=1)
-
-        start_time = cmds.playbackOptions(q=1, min=1)
-        end_time = cmds.playbackOptions(q=1, max=1)
-        cmds.bakeResults(world_grp + new_group + distance_locator, t=(start_time, end_time), sampleBy=1,
-                         disableImplicitControl=True, preserveOutsideKeys=True, sparseAnimCurveBake=True,
-                         controlPoints=True, shape=True, at="tz")
+        world_grp = cmds.ls(cmds.group(n="worldXYZ", em=1), l=1)[0]
+        screen_groups = []
+        distance_locators = []
+        for target in targets:
+            screen_group = cmds.parent(cmds.group(n="screenXY", em=1), world_grp, r=1)[0]
+            screen_group = cmds.ls(screen_group, l=1)[0]
+            distance_locator = cmds.parent(cmds.spaceLocator(n="distance")[0], screen_group, r=1)[0]
+            screen_groups.append(screen_group)
+            distance_locators.append(cmds.ls(distance_locator, l=1)[0])
+
+        if from_matrices:
+            cam_matrices = sample_world_matrices(src_obj, frames)
+            cam_translates = translation(cam_matrices)
+            cam_rotates = continuous_euler(matrix_to_euler(cam_matrices, cmds.getAttr(f'{world_grp}.rotateOrder')))
+            for i, attribute in enumerate(('tx', 'ty', 'tz')):
+                set_keys(world_grp, attribute, frames, cam_translates[:, i])
+            for i, attribute in enumerate(('rx', 'ry', 'rz')):
+                set_keys(world_grp, attribute, frames, cam_rotates[:, i])
+
+            for target, screen_group, distance_locator in zip(targets, screen_groups, distance_locators):
+                rotations, distances = aim_rotations(cam_matrices, translation(sample_world_matrices(target, frames)))
+                for i, attribute in enumerate(('rx', 'ry', 'rz')):
+                    set_keys(screen_group, attribute, frames, rotations[:, i])
+                set_keys(distance_locator, 'tz', frames, distances)
+        else:
+            cmds.parentConstraint(src_obj, world_grp, mo=0)
+            for target, screen_group, distance_locator in zip(targets, screen_groups, distance_locators):
+                cmds.aimConstraint(target, screen_group, aim=(0, 0, 1))
+                cmds.setAttr(distance_locator + ".translateZ", 10)
+                cmds.pointConstraint(target, distance_locator, offset=(0, 0, 0), skip=('x', 'y'), weight=1)
 
-        cmds.delete(z_constraint)
+            helpers = [world_grp] + screen_groups + distance_locators
+            bake_nodes(helpers, frames[0], frames[-1])
+            cmds.delete(cmds.listRelatives(helpers, type='constraint'))
 
-        cmds.cutKey(dest_obj, at=['tx', 'ty', 'tz'], option='keys', cl=1)
-        cmds.pointConstraint(world_grp + new_group + distance_locator, dest_obj, mo=0)
+        for target, distance_locator in zip(targets, distance_locators):
+            cmds.cutKey(target, at=['tx', 'ty', 'tz'], option='keys', cl=1)
+            cmds.pointConstraint(distance_locator, target, mo=0)
 
-        cmds.select(world_grp + new_group + distance_locator, r=1)
+        cmds.select(distance_locators, r=1)
+        return distance_locators
 
 
 def z_bake(dest_obj=''):
-    if cmds.objExists(dest_obj):
-        cmds.select(dest_obj)
+    targets = dest_obj.split() if isinstance(dest_obj, str) else list(dest_obj)
+    if targets and all(cmds.objExists(target) for target in targets):
+        cmds.select(targets)
         bake_selected(state='fast')
     else:
         logging.warning('Target object is not valid.')
@@ -680,14 +792,56 @@ def z_bake(dest_obj=''):
 
 def z_constrain_selected():
     objs = cmds.ls(sl=1)
-    if len(objs) == 2:
-        z_constrain(objs[0], objs[1])
+    if len(objs) >= 2:
+        z_constrain(objs[0], objs[1:])
+    else:
+        logging.warning("zconstrain requires a camera and at least one target selected")
+        return
+
+
+def smoothing_kernel(samples, kernel='average'):
+    # Weights for the 2 * samples + 1 values around each key
+    offsets = np.arange(-samples, samples + 1, dtype=np.float64)
+
+    if kernel == 'gaussian':
+        sigma = max(samples / 2.0, 0.5)
+        weights = np.exp(-0.5 * (offsets / sigma) ** 2)
+    elif kernel == 'savgol':
+        # Quadratic least-squares fit evaluated at the centre sample (Savitzky-Golay)
+        vandermonde = np.vander(offsets, min(3, len(offsets)), increasing=True)
+        return np.linalg.pinv(vandermonde)[0]
     else:
-        logging.warning("zconstrain requires two selected objects")
+        weights = np.ones_like(offsets)
+
+    return weights / weights.sum()
+
+
+def smooth_curve(crv, samples, rate, iterations, kernel='average'):
+    key_indices = cmds.keyframe(crv, q=True, sl=True, iv=True)
+    if not key_indices:
         return
 
+    key_times = np.array(cmds.keyframe(crv, q=True, sl=True, tc=True), dtype=np.float64)
+    weights = smoothing_kernel(samples, kernel)
+    sample_times = (key_times[:, None] + rate * np.arange(-samples, samples + 1)).ravel()
+
+    # Iterate on a scratch copy so every pass reads the previous pass' result (Jacobi style), not a mix of
+    # smoothed and unsmoothed keys. The real curve is only written once at the end.
+    scratch = cmds.duplicate(crv)[0]
+    fn_scratch = get_anim_curve(scratch)
+    internal_scale = 1.0 / anim_curve_unit_scale(fn_scratch)
+
+    values = evaluate_anim_curve(fn_scratch, key_times)
+    for _ in range(iterations):
+        values = evaluate_anim_curve(fn_scratch, sample_times).reshape(len(key_times), -1) @ weights
+        for index, value in zip(key_indices, values):
+            fn_scratch.setValue(index, value * internal_scale)
+
+    cmds.delete(scratch)
+    set_key_values(crv, key_indices, key_times, values)
+
 
-def z_smooth(samples, rate, iterations):
+def z_smooth(samples, rate, iterations, kernel='average'):
     selected = cmds.ls(sl=True)
 
     if not selected or not cmds.keyframe(selected, q=True, sl=True):
@@ -698,23 +852,8 @@ def z_smooth(samples, rate, iterations):
 
         unlock(selected)
 
-        for sel in selected:
-            anim_curves = cmds.keyframe(sel, q=True, sl=True, n=True)
-            for repeats in range(0, iterations):
-                for crv in anim_curves:
-                    sel_keys = cmds.keyframe(crv, q=True, sl=True)
-                    for i in range(0, len(sel_keys) - 1):
-                        value_list = []
-                        key = int(sel_keys[i])
-                        key_val = cmds.keyframe(crv, t=(key,), q=True, ev=True)[0]
-
-                        for s in range(-samples, samples):
-                            val = cmds.keyframe(crv, t=(key + rate * s,), q=True, ev=True)[0]
-                            value_list.append(val)
-
-                        total = sum(value_list) + key_val
-                        average = total / (1 + samples * 2)
-                        cmds.setKeyframe(crv, v=average, t=key)
+        for crv in set(cmds.keyframe(selected, q=True, sl=True, n=True)):
+            smooth_curve(crv, samples, rate, iterations, kernel)
 
 
 def get_object_type(sel):
@@ -746,54 +885,99 @@ def get_shape_list(transform_list):
     return shape_list
 
 
+class HoldoutIndex(object):
+    # holdOut plugs of every surface shape in the scene, gathered in one pass and kept until shapes are added or
+    # removed, the scene changes or an undo/redo. Plug values are read again on every toggle, so holdout set by hand
+    # in the attribute editor is always seen. Toggles only write the plugs that actually change, with undoable
+    # setAttr calls.
+    def __init__(self):
+        self.plugs = []
+        self.dirty = True
+        self.callback_ids = []
+
+    def mark_dirty(self, *args):
+        self.dirty = True
+
+    def add_callbacks(self):
+        self.callback_ids = add_scene_callbacks(self.mark_dirty)
+        self.callback_ids.append(om2.MDGMessage.addNodeAddedCallback(self.mark_dirty, 'surfaceShape'))
+        self.callback_ids.append(om2.MDGMessage.addNodeRemovedCallback(self.mark_dirty, 'surfaceShape'))
+
+    def remove_callbacks(self):
+        if self.callback_ids:
+            om2.MMessage.removeCallbacks(self.callback_ids)
+        self.callback_ids = []
+        self.mark_dirty()
+
+    def rebuild(self):
+        if not self.callback_ids:
+            self.add_callbacks()
+
+        # (MObjectHandle, plug) pairs, the handles tell when a shape went away before the callbacks fired
+        self.plugs = []
+        it = om2.MItDependencyNodes(om2.MFn.kSurface)
+        while not it.isDone():
+            fn_node = om2.MFnDependencyNode(it.thisNode())
+            if fn_node.hasAttribute('holdOut'):
+                self.plugs.append((om2.MObjectHandle(fn_node.object()), fn_node.findPlug('holdOut', False)))
+            it.next()
+        self.dirty = False
+
+    def scene_plugs(self):
+        if self.dirty:
+            self.rebuild()
+        return [plug for handle, plug in self.plugs if handle.isAlive()]
+
+    @staticmethod
+    def plugs_for(shapes):
+        sel = om2.MSelectionList()
+        for shape in shapes:
+            sel.add(shape)
+        plugs = []
+        for i in range(sel.length()):
+            fn_node = om2.MFnDependencyNode(sel.getDependNode(i))
+            if fn_node.hasAttribute('holdOut'):
+                plugs.append(fn_node.findPlug('holdOut', False))
+        return plugs
+
+    @staticmethod
+    def set_state(plugs, state):
+        changed = [plug for plug in plugs if plug.asBool() != state]
+        with UndoStack('holdout'):
+            for plug in changed:
+                node = om2.MDagPath.getAPathTo(plug.node()).fullPathName()
+                cmds.setAttr(f'{node}.holdOut', state)
+        return len(changed)
+
+    def toggle_all(self):
+        # Any holdout in the scene turns everything off, otherwise everything goes on
+        plugs = self.scene_plugs()
+        enabled = [plug for plug in plugs if plug.asBool()]
+        if enabled:
+            return self.set_state(enabled, False)
+        return self.set_state(plugs, True)
+
+    def toggle(self, shapes):
+        # Each shape flips its own state
+        plugs = self.plugs_for(shapes)
+        turn_on = [plug for plug in plugs if not plug.asBool()]
+        turn_off = [plug for plug in plugs if plug.asBool()]
+        with UndoStack('holdout'):
+            return self.set_state(turn_on, True) + self.set_state(turn_off, False)
+
+
+holdout_index = HoldoutIndex()
+
+
 def holdout():
     selected_geo = cmds.ls(selection=True, long=True)
     selected_shapes = get_shape_list(selected_geo)
-    selected_shapes_len = len(selected_shapes)
-
-    with UndoStack("holdout"):
-
-        active_camera = get_active_camera()
-
-        if selected_shapes_len == 0 or is_one_image_plane_selected(selected_shapes):  # If nothing is selected toggle
-            # all_objects geometry in scene.
-            holdout_geo_exists = False
-            geo_list = cmds.ls(geometry=True, long=True)  # Get list of geometric Dag objects in scene.
-            for geo in geo_list:
-                try:
-                    holdout_geo_exists = cmds.getAttr(geo + '.holdOut')
-                except:
-                    pass
-
-            if holdout_geo_exists:  # If Holdout Geometry exists in scene...
-                for geo in geo_list:
-                    try:
-                        cmds.setAttr(geo + '.holdOut', 0)  # Turn off holdout for all_objects geometry in scene
-                        # cmds.modelEditor(activePanel, e=1, hos=0)
-
-                    except:
-                        pass
-                return
-
-            if not holdout_geo_exists:  # If there is no Holdout Geometry in scene...
-                for geo in geo_list:
-                    try:
-                        cmds.setAttr(geo + '.holdOut', 1)  # Turn on holdout for all_objects geometry in scene
-                        # cmds.modelEditor(activePanel, e=1, hos=1)
-
-                    except:
-                        pass
-                return
-
-        elif selected_shapes_len >= 0:
-            for sel_geo_shape in selected_shapes:
-                try:
-                    toggle_state = cmds.getAttr(sel_geo_shape + '.holdOut')
-                    cmds.setAttr(sel_geo_shape + '.holdOut', (not toggle_state))
-                    # togglePanel = cmds.modelEditor(activePanel, q=1, hos=1)
-                    # cmds.modelEditor(activePanel, e=1, hos=(not toggle_state))
-                except:
-                    pass
+
+    if len(selected_shapes) == 0 or is_one_image_plane_selected(selected_shapes):  # If nothing is selected toggle
+        # all_objects geometry in scene.
+        holdout_index.toggle_all()
+    else:
+        holdout_index.toggle(selected_shapes)
 
 
 def find_object_type(item):
@@ -804,157 +988,6 @@ def find_object_type(item):
     return item_type
 
 
-def legacy_rename(prefix='', name='', suffix='', pad_index=1, padding=3, lock_prefix=False, lock_name=False,
-                  lock_suffix=False, lock_padding=False, smart_suffix=False, letter_suffix=False, selected=True,
-                  hierarchy=False, all_objects=False, preserve_namespaces=True):
-    suffix_dict = {
-        "joint": "JNT",
-        "jointEnd": "END",
-        "mesh": "OBJ",
-        "transform": "GRP",
-        "camera": "CAM",
-        "ikEffector": "EFF",
-        "ikHandle": "IK",
-        "nurbsSurface": "SRF",
-        "nurbsCurve": "CRV",
-        "locator": "LOC",
-        "clusterHandle": "CLT",
-        "aiLightPortal": "PTL",
-        "imagePlane": "IMG",
-        "parentConstraint": "PaCON",
-        "pointConstraint": "PoCON",
-        "orientConstraint": "OCON",
-        "scaleConstraint": "SCON",
-        "poleVectorConstraint": "PV",
-        "aimConstraint": "AIM",
-    }
-
-    a = -1
-
-    if hierarchy:
-        items = cmds.ls(os=True, dag=True, tr=True, l=True)
-    elif selected:
-        items = cmds.ls(os=True, l=True)
-    elif all_objects:
-        logging.warning("This doesn't work! Thanks Maya! WOO")
-        return
-    else:
-        return
-
-    with UndoStack("smart_rename"):
-        for i, item in enumerate(items):
-
-            if hierarchy:
-                items = cmds.ls(os=True, dag=True, tr=True, l=True)
-            elif selected:
-                items = cmds.ls(os=True, l=True)
-            elif all_objects:
-                logging.warning("This doesn't work! Thanks Maya!")
-                return
-            else:
-                return
-
-            item_name = extract_name(set_fields=False, target_object=(cmds.ls(items[i], sn=True)))
-            item_type = get_object_type(items[i])
-
-            # CHANGE LETTERING BASED ON CHILD OBJECTS
-            parent_object = cmds.listRelatives(items[i], parent=True, f=True)
-            previous_parent = cmds.listRelatives(items[i - 1], parent=True, f=True)
-            children = cmds.listRelatives(items[i], children=True, f=True)
-            p_children = None
-
-            if parent_object:
-                parent_name = extract_name(set_fields=False, target_object=(cmds.ls(parent_object, sn=True)))
-                p_children = cmds.listRelatives(parent_object, children=True, f=True)
-
-                if parent_name[2] != name:
-                    a = 0
-
-            if p_children:
-                if len(p_children) > 1:
-                    a += 1
-                else:
-                    a += 1
-            else:
-                a += 1
-
-            if selected:
-                a = i
-
-            # TESTING FOR LIKE OBJECTS IN SAME LEVEL OF HIERARCHY, THIS COULD GET MESSY
-
-            if parent_object:
-                if item_type != get_object_type(parent_object):
-                    if parent_object != previous_parent:
-                        a = 0
-
-            # SUFFIX MODIFIERS
-
-            if smart_suffix and suffix != '':
-                if item_type not in suffix_dict:  # IF TYPE IS NOT IN DICTIONARY
-                    item_type = "mesh"
-                    logging.warning("Some objects aren't registered in the suffix database. Will use _OBJ_ instead.")
-
-                if children is None:
-                    if item_type == "joint":
-                        item_type = "jointEnd"
-
-                suffix = (suffix_dict.get(item_type)).lower()
-
-            padding_text = ''
-            if letter_suffix:
-                padding_text += str(chr(ord('@') + (a + 1))).lower()
-
-            if lock_padding:
-                padding_text = item_name[4]
-            else:
-                padding_text += str(f"{pad_index :{'0'}<{padding + 1}}")
-                padding_text = padding_text[:-1]
-
-                if not letter_suffix:
-                    padding_text += str(a + 1)
-                else:
-                    padding_text += '1'
-
-            final_name = ''
-
-            '''
-            STRING CONSTRUCTION LOGIC:
-                if a field is blank, it is removed (or not added)
-                if a field is not blank and not locked, it is added
-                if a field is locked, it is ignored, and the original is used
-            '''
-
-            if not lock_prefix:
-                if prefix != '':
-                    final_name += prefix + '_'
-            if lock_prefix and item_name[1] != '':
-                final_name += item_name[1] + '_'
-
-            if not lock_name:
-                if name != '':
-                    final_name += name
-            if lock_name and item_name[2] != '':
-                final_name += item_name[2]
-
-            if not lock_suffix:
-                if suffix != '':
-                    final_name += '_' + suffix
-            if lock_suffix and item_name[3] != '':
-                final_name += '_' + item_name[3]
-
-            if not lock_padding:
-                if padding_text != '':
-                    final_name += '_' + padding_text
-            if lock_padding and item_name[4] != '':
-                final_name += '_' + item_name[4]
-
-            # CREATE FINAL NAME
-            print(final_name)
-            if final_name != '':
-                cmds.rename(items[i], final_name)
-
-
 def extract_name(set_fields=True, target_object=None, prefix_field=None, name_field=None, suffix_field=None,
                  pad_index_field=None,
                  padding_field=None, letter_check=None, preserve_namespaces=False):
@@ -965,44 +998,13 @@ def extract_name(set_fields=True, target_object=None, prefix_field=None, name_fi
 
     if len(input_object) == 1:
 
-        prefix = ''
-        name = ''
-        suffix = ''
         pad_index = 0
         padding = 0
-        letter = ''
-        number = ''
         padding_text = ''
 
-        if '|' in input_object:
-            input_object = input_object.split('|')[-1]
-        if ':' in input_object:
-            if preserve_namespaces:
-                namespace = ':'.join(x for x in input_object.split(':')[0:-1])
-            input_object = input_object.split(':')[-1]
-
         # OBJECT NAME ANALYSIS
 
-        components = input_object[0].split('_')
-
-        if len(components) > 1 and (any(char.isdigit() for char in components[-1])):
-            pad_value = components[-1]
-            letter = ''.join(x for x in pad_value if x.isalpha())
-            number = ''.join(x for x in pad_value if x.isdigit())
-            components.pop()
-
-        if len(components) == 1:
-            name = ''.join(x for x in components[0] if not x.isdigit())
-            number = ''.join(x for x in components[0] if x.isdigit())
-
-        if len(components) == 2:
-            name = components[0]
-            suffix = components[1]
-
-        if len(components) >= 3:
-            prefix = components[0]
-            name = '_'.join(components[1:(len(components) - 1)])
-            suffix = components[-1]
+        namespace, prefix, name, suffix, letter, number = parse_name(input_object[0])
 
         if set_fields:
 
@@ -1032,7 +1034,7 @@ def extract_name(set_fields=True, target_object=None, prefix_field=None, name_fi
 
         else:
             clean_name = ''
-            if preserve_namespaces:
+            if preserve_namespaces and namespace:
                 clean_name = namespace + ':' + clean_name
             if prefix:
                 clean_name += prefix + '_'
@@ -1052,353 +1054,191 @@ def extract_name(set_fields=True, target_object=None, prefix_field=None, name_fi
         return
 
 
+def camera_space_positions(cam_matrices, positions, frame_indices):
+    # World positions (P, 3) to the camera's local space at the matching frame, all points in one batch.
+    # Same values a motion trail anchored to the camera gives.
+    inverse = np.linalg.inv(cam_matrices)[frame_indices]
+    homogeneous = np.concatenate([positions, np.ones((len(positions), 1))], axis=1)
+    return np.einsum('pi,pij->pj', homogeneous, inverse)[:, :3]
+
+
 def screen_anim_visualiser(interval, frame_range):
     selected = cmds.ls(sl=1, type='transform')
-    camera = selected[0]
-    targets = selected[1:]
-
-    if not selected:
-        logging.warning('Select a camera and an animated object')
-        return
 
     if len(selected) < 2:
         logging.warning('Select a camera and an animated object')
         return
 
-    for target in targets:
+    camera = selected[0]
+    targets = selected[1:]
 
+    # Frames each target's path covers, and the frames that become curve points
+    target_frames = []
+    for target in targets:
         if frame_range == 'playback':
-            start_time = cmds.playbackOptions(q=True, min=True)
-            end_time = cmds.playbackOptions(q=True, max=True)
+            frames = get_playback_frames()
         else:
             all_keys = sorted(cmds.keyframe(target, q=True) or [])
-            if all_keys:
-                start_time = all_keys[0]
-                end_time = all_keys[1]
-            else:
-                return
-
-        snapshot = cmds.snapshot(target, motionTrail=1, increment=1, startTime=start_time, endTime=end_time,
-                                 anchorTransform=camera)
-        motion_trail = cmds.listRelatives(snapshot[0], c=1)[0]
-        points = cmds.getAttr(f'{motion_trail}.points')
-        keyframes = cmds.getAttr(f'{motion_trail}.keyframeTimes')
-
-        curve_points = []
-        for i, point in enumerate(points):
-            if interval == 'key':
-                if (i + start_time) in keyframes:
-                    stripped_point = point[:-1]
-                    curve_points.append(stripped_point)
-            else:
-                stripped_point = point[:-1]
-                curve_points.append(stripped_point)
-
-        curve = cmds.curve(p=curve_points, n=f'{target}_screen_path_crv')
-
-        set_index_color(random.randint(3, 31), [curve])
-        cmds.parentConstraint(camera, curve)
-        cmds.scaleConstraint(camera, curve)
-        cmds.delete(snapshot)
-
-
-def smart_rename(prefix='', name='', suffix='', pad_index=1, padding=3, lock_prefix=False, lock_name=False,
-                 lock_suffix=False, lock_padding=False, smart_suffix=False, letter_suffix=False, selected=True,
-                 hierarchy=False, all_objects=False, preserve_namespaces=True):
-    suffix_dict = {
-        "joint": "JNT",
-        "jointEnd": "END",
-        "mesh": "OBJ",
-        "transform": "GRP",
-        "camera": "CAM",
-        "ikEffector": "EFF",
-        "ikHandle": "IK",
-        "nurbsSurface": "SRF",
-        "nurbsCurve": "CRV",
-        "locator": "LOC",
-        "clusterHandle": "CLT",
-        "aiLightPortal": "PTL",
-        "imagePlane": "IMG",
-        "parentConstraint": "PaCON",
-        "pointConstraint": "PoCON",
-        "orientConstraint": "OCON",
-        "scaleConstraint": "SCON",
-        "poleVectorConstraint": "PV",
-        "aimConstraint": "AIM",
-    }
-
-    '''
-        def build_hierarchy_dict(node):
-        """
-        Recursively build a dictionary representing the hierarchy starting from the given node.
-        """
-        # Initialize the dictionary for this node
-        outliner_hierarchy = {node: {}}
-
-        # List children of the current node, excluding intermediate objects
-        node_children = cmds.listRelatives(node, children=True, type='transform', path=True) or []
-
-        # Recursively build the hierarchy for each child
-        for child in node_children:
-            outliner_hierarchy[node].update(build_hierarchy_dict(child))
-        print(outliner_hierarchy)
-        return outliner_hierarchy
-
-    def get_scene_hierarchy(root_nodes):
-        """
-        Builds the hierarchy dictionary for all top-level nodes in the scene.
-        """
-        # List all top-level transform nodes in the scene
-
-        top_level_nodes = cmds.ls(root_nodes)
-
-        # Build the hierarchy starting from each top-level node
-        scene_hierarchy = {}
-        for node in top_level_nodes:
-            scene_hierarchy.update(build_hierarchy_dict(node))
-
-        return scene_hierarchy
-    '''
-
-    def get_all_keys(d):
-        for key, value in d.items():
-            yield key
-            if isinstance(value, dict):
-                yield from get_all_keys(value)
-
-    def count(d):
-        return sum([count(v) if isinstance(v, dict) else 1 for v in d.values()])
-
-    def build_hierarchy_dict(node_name, node_uuid):
-        """
-        Recursively build a dictionary representing the hierarchy starting from the given node.
-        """
-
-        # Initialize the dictionary for this node
-        outliner_hierarchy = {node_uuid: {}}
-
-        # List children of the current node, excluding intermediate objects
-        node_children = cmds.listRelatives(node_name, children=True, type='transform', path=True) or []
-
-        # Recursively build the hierarchy for each child
-        for child in node_children:
-            outliner_hierarchy[node_uuid].update(build_hierarchy_dict(child, cmds.ls(child, uuid=1)[0]))
-
-        return outliner_hierarchy
-
-    def get_scene_hierarchy(root_nodes):
-        """
-        Builds the hierarchy dictionary for all top-level nodes in the scene.
-        """
-        # List all top-level transform nodes in the scene
-
-        top_level_nodes = cmds.ls(root_nodes)
-
-        # Build the hierarchy starting from each top-level node
-        scene_hierarchy = {}
-        for node in top_level_nodes:
-            node_uuid = cmds.ls(node, uuid=1)[0]
-            scene_hierarchy.update(build_hierarchy_dict(node, node_uuid))
-
-        return scene_hierarchy
-
-    with UndoStack("smart_rename"):
-
-        if hierarchy:
-            roots = cmds.ls(os=True, dag=True, tr=True, l=1)
-        elif selected:
-            roots = cmds.ls(os=True, l=1)
-        elif all_objects:
-            roots = cmds.ls(assemblies=True, l=1)
-        else:
-            return
-
-        scene_hierarchy = get_scene_hierarchy(root_nodes=roots)
-
-        i = 0
-        a = -1
-
-        for node in get_all_keys(scene_hierarchy):
-            node_longname = cmds.ls(node, l=1)[0]
-            item_name = extract_name(set_fields=False, target_object=cmds.ls(node, sn=1))
-
-            try:
-                cmds.rename(node_longname, f'node_temp_name_{i}')
-            except RuntimeError:
+            if not all_keys:
+                logging.warning(f'{target} has no keys, skipped.')
                 continue
+            frames = np.arange(all_keys[0], all_keys[-1] + 1, dtype=np.float64)
 
-            node_longname = cmds.ls(node, l=1)[0]
-
-            item_type = get_object_type(node_longname)
-
-            # Operate on name
-
-            if smart_suffix and suffix != '':
-                if item_type not in suffix_dict:  # IF TYPE IS NOT IN DICTIONARY
-                    item_type = "mesh"
-                    logging.warning("Some objects aren't registered in the suffix database. Will use _OBJ_ instead.")
-
-                '''
-                if children is None:
-                    if item_type == "joint":
-                        item_type = "jointEnd"
-
-                '''
-                suffix = (suffix_dict.get(item_type)).lower()
-
-            padding_text = ''
-            if letter_suffix:
-                padding_text += str(chr(ord('@') + (a + 1))).lower()
+        if interval == 'key':
+            keyframes = set(cmds.keyframe(target, q=True) or [])
+            frames = np.array([frame for frame in frames if frame in keyframes], dtype=np.float64)
 
-            if lock_padding:
-                padding_text = item_name[4]
-            else:
-                padding_text += str(f"{pad_index :{'0'}<{padding + 1}}")
-                padding_text = padding_text[:-1]
-
-                if not letter_suffix:
-                    padding_text += str(a + 1)
-                else:
-                    padding_text += '1'
-
-            final_name = ''
-
-            '''
-            STRING CONSTRUCTION LOGIC:
-                if a field is blank, it is removed (or not added)
-                if a field is not blank and not locked, it is added
-                if a field is locked, it is ignored, and the original is used
-            '''
-
-            if not lock_prefix:
-                if prefix != '':
-                    final_name += prefix + '_'
-            if lock_prefix and item_name[1] != '':
-                final_name += item_name[1] + '_'
-
-            if not lock_name:
-                if name != '':
-                    final_name += name
-            if lock_name and item_name[2] != '':
-                final_name += item_name[2]
-
-            if not lock_suffix:
-                if suffix != '':
-                    final_name += '_' + suffix
-            if lock_suffix and item_name[3] != '':
-                final_name += '_' + item_name[3]
-
-            if not lock_padding:
-                if padding_text != '':
-                    final_name += '_' + padding_text
-            if lock_padding and item_name[4] != '':
-                final_name += '_' + item_name[4]
-
-            # CREATE FINAL NAME
-            if final_name != '':
-                cmds.rename(node_longname, final_name)
-
-            i += 1
+        if len(frames) < 2:
+            logging.warning(f'{target} has less than two frames to draw, skipped.')
+            continue
+        target_frames.append((target, frames))
 
+    if not target_frames:
         return
 
-        a = -1
+    all_frames = np.unique(np.concatenate([frames for _, frames in target_frames]))
+    cam_matrices = sample_world_matrices(camera, all_frames)
+
+    positions = np.concatenate([translation(sample_world_matrices(target, frames)) for target, frames in target_frames])
+    frame_indices = np.searchsorted(all_frames, np.concatenate([frames for _, frames in target_frames]))
+    local_positions = camera_space_positions(cam_matrices, positions, frame_indices)
+
+    with UndoStack("screen_anim_visualiser"):
+        curves = []
+        offset = 0
+        for target, frames in target_frames:
+            curve_points = local_positions[offset:offset + len(frames)]
+            offset += len(frames)
+
+            curve = cmds.curve(p=curve_points.tolist(), d=min(3, len(curve_points) - 1),
+                               n=f'{target}_screen_path_crv')
+            set_index_color(random.randint(3, 31), [curve])
+            curves.append(curve)
+
+        for curve in curves:
+            cmds.parentConstraint(camera, curve)
+            cmds.scaleConstraint(camera, curve)
+
+    return curves
+
+
+def snapshot_rename_targets(roots, recursive=False):
+    # Read names, types and parents for every node to rename in one OpenMaya pass. Returns the RenameTarget
+    # records in outliner (depth-first) order, an MDagPath per key (stays valid through renames) and the current
+    # children names of every affected parent for collision checks.
+    sel = om2.MSelectionList()
+    for root in roots:
+        sel.add(root)
+
+    targets = []
+    dag_paths = {}
+    siblings = {}
+
+    def transform_children(dag_path):
+        children = []
+        for i in range(dag_path.childCount()):
+            child = dag_path.child(i)
+            if child.hasFn(om2.MFn.kTransform):
+                child_path = om2.MDagPath(dag_path)
+                child_path.push(child)
+                children.append(child_path)
+        return children
+
+    def node_type(dag_path, fn_node):
+        for i in range(dag_path.childCount()):
+            child = dag_path.child(i)
+            if child.hasFn(om2.MFn.kShape) and not om2.MFnDagNode(child).isIntermediateObject:
+                return om2.MFnDependencyNode(child).typeName
+        return fn_node.typeName
+
+    def parent_of(dag_path):
+        parent_path = om2.MDagPath(dag_path)
+        parent_path.pop()
+        if parent_path.length() == 0:
+            return None, om2.MItDag().root()
+        return om2.MFnDependencyNode(parent_path.node()).uuid().asString(), parent_path.node()
+
+    def child_names(parent_node):
+        fn_parent = om2.MFnDagNode(parent_node)
+        children = []
+        for i in range(fn_parent.childCount()):
+            fn_child = om2.MFnDependencyNode(fn_parent.child(i))
+            children.append((fn_child.uuid().asString(), fn_child.name()))
+        return children
+
+    visited = set()
+    stack = []
+    for i in reversed(range(sel.length())):
+        try:
+            stack.append(sel.getDagPath(i))
+        except TypeError:
+            continue
 
-        for i, item in enumerate(items):
+    while stack:
+        dag_path = stack.pop()
+        fn_node = om2.MFnDagNode(dag_path)
+        key = fn_node.uuid().asString()
+        if key in visited:
+            continue
+        visited.add(key)
+        children = transform_children(dag_path)
 
-            # CHANGE LETTERING BASED ON CHILD OBJECTS
-            parent_object = cmds.listRelatives(items[i], parent=True, f=True)
-            previous_parent = cmds.listRelatives(items[i - 1], parent=True, f=True)
-            children = cmds.listRelatives(items[i], children=True, f=True)
-            p_children = None
+        # Default cameras, locked and referenced nodes can't be renamed
+        if not (fn_node.isDefaultNode or fn_node.isLocked or fn_node.isFromReferencedFile):
+            parent, parent_node = parent_of(dag_path)
+            targets.append(RenameTarget(key, fn_node.name(), node_type(dag_path, fn_node), parent,
+                                        bool(children)))
+            dag_paths[key] = om2.MDagPath(dag_path)
+            if parent not in siblings:
+                siblings[parent] = child_names(parent_node)
 
-            if parent_object:
-                parent_name = extract_name(set_fields=False, target_object=(cmds.ls(parent_object, sn=True)))
-                p_children = cmds.listRelatives(parent_object, children=True, f=True)
+        if recursive:
+            stack.extend(reversed(children))
 
-                if parent_name[2] != name:
-                    a = 0
+    return targets, dag_paths, siblings
 
-            if p_children:
-                if len(p_children) > 1:
-                    a += 1
-                else:
-                    a += 1
-            else:
-                a += 1
 
-            if selected:
-                a = i
+def apply_rename_plan(plan, dag_paths, temp_names=False):
+    # MDagPaths follow renames, so each node's current path is read straight from its path, no ls lookups
+    if temp_names:
+        for i, (key, _, _) in enumerate(plan):
+            cmds.rename(dag_paths[key].fullPathName(), f'node_temp_name_{i}')
 
-            # TESTING FOR LIKE OBJECTS IN SAME LEVEL OF HIERARCHY, THIS COULD GET MESSY
+    for key, _, new_name in plan:
+        cmds.rename(dag_paths[key].fullPathName(), new_name)
 
-            if parent_object:
-                if item_type != get_object_type(parent_object):
-                    if parent_object != previous_parent:
-                        a = 0
 
-            # SUFFIX MODIFIERS
+def smart_rename(prefix='', name='', suffix='', pad_index=1, padding=3, lock_prefix=False, lock_name=False,
+                 lock_suffix=False, lock_padding=False, smart_suffix=False, letter_suffix=False, selected=True,
+                 hierarchy=False, all_objects=False, preserve_namespaces=True, dry_run=False):
+    # With dry_run the scene is left alone and {long name: new name} is returned for previewing
+    if hierarchy or selected:
+        roots = cmds.ls(os=True, l=1)
+    elif all_objects:
+        roots = cmds.ls(assemblies=True, l=1)
+    else:
+        return
 
-            if smart_suffix and suffix != '':
-                if item_type not in suffix_dict:  # IF TYPE IS NOT IN DICTIONARY
-                    item_type = "mesh"
-                    logging.warning("Some objects aren't registered in the suffix database. Will use _OBJ_ instead.")
+    if not roots:
+        logging.warning("Select objects to rename.")
+        return
 
-                if children is None:
-                    if item_type == "joint":
-                        item_type = "jointEnd"
+    targets, dag_paths, siblings = snapshot_rename_targets(roots, recursive=(hierarchy or all_objects))
+    plan = plan_renames(targets, prefix=prefix, name=name, suffix=suffix, pad_index=pad_index, padding=padding,
+                        lock_prefix=lock_prefix, lock_name=lock_name, lock_suffix=lock_suffix,
+                        lock_padding=lock_padding, smart_suffix=smart_suffix, letter_suffix=letter_suffix,
+                        preserve_namespaces=preserve_namespaces)
 
-                suffix = (suffix_dict.get(item_type)).lower()
+    collisions = find_collisions(plan, targets, siblings)
+    for (_, final_name), keys in collisions.items():
+        logging.warning(f"{len(keys)} objects would be named '{final_name}' under the same parent.")
 
-            padding_text = ''
-            if letter_suffix:
-                padding_text += str(chr(ord('@') + (a + 1))).lower()
+    if dry_run:
+        return {dag_paths[key].fullPathName(): new_name for key, _, new_name in plan}
 
-            if lock_padding:
-                padding_text = item_name[4]
-            else:
-                padding_text += str(f"{pad_index :{'0'}<{padding + 1}}")
-                padding_text = padding_text[:-1]
-
-                if not letter_suffix:
-                    padding_text += str(a + 1)
-                else:
-                    padding_text += '1'
-
-            final_name = ''
-
-            '''
-            STRING CONSTRUCTION LOGIC:
-                if a field is blank, it is removed (or not added)
-                if a field is not blank and not locked, it is added
-                if a field is locked, it is ignored, and the original is used
-            '''
-
-            if not lock_prefix:
-                if prefix != '':
-                    final_name += prefix + '_'
-            if lock_prefix and item_name[1] != '':
-                final_name += item_name[1] + '_'
-
-            if not lock_name:
-                if name != '':
-                    final_name += name
-            if lock_name and item_name[2] != '':
-                final_name += item_name[2]
-
-            if not lock_suffix:
-                if suffix != '':
-                    final_name += '_' + suffix
-            if lock_suffix and item_name[3] != '':
-                final_name += '_' + item_name[3]
-
-            if not lock_padding:
-                if padding_text != '':
-                    final_name += '_' + padding_text
-            if lock_padding and item_name[4] != '':
-                final_name += '_' + item_name[4]
-
-            # CREATE FINAL NAME
-            print(final_name)
-            if final_name != '':
-                cmds.rename(items[i], final_name)
+    if collisions:
+        logging.warning("Rename aborted, nothing was changed.")
+        return
+
+    with UndoStack("smart_rename"):
+        apply_rename_plan(plan, dag_paths, temp_names=needs_temp_names(plan, targets, siblings))
@@ -0,0 +1,84 @@
+import numpy as np
+
+# Matches the rotateOrder enum on Maya transforms
+ROTATE_ORDERS = ('xyz', 'yzx', 'zxy', 'xzy', 'yxz', 'zyx')
+
+_next_axis = (1, 2, 0, 1)
+
+
+def to_matrices(values):
+    # Flat 16 value matrices (as returned by getAttr/xform) to (..., 4, 4) arrays, Maya's row-vector layout.
+    return np.asarray(values, dtype=np.float64).reshape(-1, 4, 4)
+
+
+def axis_rotation(axis, degrees):
+    # Row-vector rotation matrices about a single axis for an array of angles
+    radians = np.radians(np.asarray(degrees, dtype=np.float64))
+    c, s = np.cos(radians), np.sin(radians)
+    matrices = np.zeros(radians.shape + (3, 3))
+    a, b = (axis + 1) % 3, (axis + 2) % 3
+    matrices[..., axis, axis] = 1.0
+    matrices[..., a, a] = c
+    matrices[..., a, b] = s
+    matrices[..., b, a] = -s
+    matrices[..., b, b] = c
+    return matrices
+
+
+def euler_to_matrix(rotations, rotate_order=0):
+    # (..., 3) xyz rotations in degrees to (..., 3, 3) rotation matrices, first axis of the order applied first
+    rotations = np.asarray(rotations, dtype=np.float64)
+    order = ROTATE_ORDERS[rotate_order]
+    matrix = None
+    for char in order:
+        axis = 'xyz'.index(char)
+        rotation = axis_rotation(axis, rotations[..., axis])
+        matrix = rotation if matrix is None else matrix @ rotation
+    return matrix
+
+
+def normalized_rotation(matrices):
+    # Strip scale from the upper 3x3 so only rotation is left
+    rotation = np.array(matrices[..., :3, :3], dtype=np.float64)
+    lengths = np.linalg.norm(rotation, axis=-1, keepdims=True)
+    lengths[lengths == 0.0] = 1.0
+    rotation /= lengths
+    flip = np.linalg.det(rotation) < 0
+    rotation[flip, 2] *= -1
+    return rotation
+
+
+def matrix_to_euler(matrices, rotate_order=0):
+    # Decompose (..., 4, 4) or (..., 3, 3) matrices to xyz rotations in degrees for the given rotate order,
+    # the same values xform(q=1, ro=1) reports.
+    order = ROTATE_ORDERS[rotate_order]
+    i = 'xyz'.index(order[0])
+    parity = 0 if order in ('xyz', 'yzx', 'zxy') else 1
+    j = _next_axis[i + parity]
+    k = _next_axis[i - parity + 1]
+
+    # Maya matrices act on row vectors, transpose to the column-vector form the extraction is written for
+    m = np.swapaxes(normalized_rotation(matrices), -1, -2)
+
+    cy = np.sqrt(m[..., i, i] ** 2 + m[..., j, i] ** 2)
+    gimbal = cy <= 1e-12
+    ai = np.where(gimbal, np.arctan2(-m[..., j, k], m[..., j, j]), np.arctan2(m[..., k, j], m[..., k, k]))
+    aj = np.arctan2(-m[..., k, i], cy)
+    ak = np.where(gimbal, 0.0, np.arctan2(m[..., j, i], m[..., i, i]))
+    if parity:
+        ai, aj, ak = -ai, -aj, -ak
+
+    rotations = np.empty(cy.shape + (3,))
+    rotations[..., i] = ai
+    rotations[..., j] = aj
+    rotations[..., k] = ak
+    return np.degrees(rotations)
+
+
+def continuous_euler(rotations):
+    # Remove 360 degree jumps between frames of (F, 3) rotations, like an euler filter on baked curves
+    return np.degrees(np.unwrap(np.radians(rotations), axis=0))
+
+
+def translation(matrices):
+    return np.asarray(matrices)[..., 3, :3]
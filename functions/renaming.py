@@ -0,0 +1,231 @@
+import re
+import logging
+from functools import lru_cache
+from collections import namedtuple, defaultdict
+
+# Pure python side of Smart Rename. The scene is read once into RenameTarget records, every new name is
+# worked out here, and nothing in this module touches Maya.
+
+SUFFIX_DICT = {
+    "joint": "JNT",
+    "jointEnd": "END",
+    "mesh": "OBJ",
+    "transform": "GRP",
+    "camera": "CAM",
+    "ikEffector": "EFF",
+    "ikHandle": "IK",
+    "nurbsSurface": "SRF",
+    "nurbsCurve": "CRV",
+    "locator": "LOC",
+    "clusterHandle": "CLT",
+    "aiLightPortal": "PTL",
+    "imagePlane": "IMG",
+    "parentConstraint": "PaCON",
+    "pointConstraint": "PoCON",
+    "orientConstraint": "OCON",
+    "scaleConstraint": "SCON",
+    "poleVectorConstraint": "PV",
+    "aimConstraint": "AIM",
+}
+
+# key is anything unique per node (the snapshot uses UUIDs), parent is the parent's key or None for world
+RenameTarget = namedtuple('RenameTarget', ['key', 'name', 'node_type', 'parent', 'has_children'])
+ParsedName = namedtuple('ParsedName', ['namespace', 'prefix', 'name', 'suffix', 'letter', 'number'])
+
+
+# The name grammar: [path|][namespace:]body[_padding], where padding is the last underscore component if it has a
+# digit in it. The body then splits into prefix_name_suffix.
+_padded_name = re.compile(r'(?P<body>.*)_(?P<padding>[^_]*\d[^_]*)')
+_digits = re.compile(r'\d+')
+_non_digits = re.compile(r'\D+')
+_non_alpha = re.compile(r'[\W\d_]+')
+
+
+@lru_cache(maxsize=65536)
+def parse_name(full_name):
+    # Split a node name into namespace, prefix, name, suffix and padding (letter + number).
+    # Parsed names are cached, UI refreshes and rename previews parse the same names over and over.
+    namespace, _, short_name = full_name.rpartition('|')[2].rpartition(':')
+    match = _padded_name.fullmatch(short_name)
+
+    prefix = ''
+    name = ''
+    suffix = ''
+    letter = ''
+    number = ''
+
+    if match:
+        short_name, padding = match.groups()
+        letter = _non_alpha.sub('', padding)
+        number = _non_digits.sub('', padding)
+
+    components = short_name.split('_')
+
+    if len(components) == 1:
+        name = _digits.sub('', components[0])
+        number = _non_digits.sub('', components[0])
+
+    if len(components) == 2:
+        name = components[0]
+        suffix = components[1]
+
+    if len(components) >= 3:
+        prefix = components[0]
+        name = '_'.join(components[1:(len(components) - 1)])
+        suffix = components[-1]
+
+    return ParsedName(namespace, prefix, name, suffix, letter, number)
+
+
+def parse_many(names):
+    return [parse_name(full_name) for full_name in names]
+
+
+def letter_index(index):
+    # Spreadsheet style letters for a 0 based index: a..z, aa, ab..az, ba..
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('a') + remainder) + letters
+    return letters
+
+
+def build_name(item_name, index, prefix='', name='', suffix='', pad_index=1, padding=3, lock_prefix=False,
+               lock_name=False, lock_suffix=False, lock_padding=False, letter_suffix=False):
+    '''
+    STRING CONSTRUCTION LOGIC:
+        if a field is blank, it is removed (or not added)
+        if a field is not blank and not locked, it is added
+        if a field is locked, it is ignored, and the original is used
+    '''
+    item_padding = item_name.letter + item_name.number
+
+    padding_text = ''
+    if letter_suffix:
+        padding_text += letter_index(index)
+
+    if lock_padding:
+        padding_text = item_padding
+    else:
+        padding_text += str(f"{pad_index :{'0'}<{padding + 1}}")
+        padding_text = padding_text[:-1]
+
+        if not letter_suffix:
+            padding_text += str(index + 1)
+        else:
+            padding_text += '1'
+
+    final_name = ''
+
+    if not lock_prefix:
+        if prefix != '':
+            final_name += prefix + '_'
+    if lock_prefix and item_name.prefix != '':
+        final_name += item_name.prefix + '_'
+
+    if not lock_name:
+        if name != '':
+            final_name += name
+    if lock_name and item_name.name != '':
+        final_name += item_name.name
+
+    if not lock_suffix:
+        if suffix != '':
+            final_name += '_' + suffix
+    if lock_suffix and item_name.suffix != '':
+        final_name += '_' + item_name.suffix
+
+    if not lock_padding:
+        if padding_text != '':
+            final_name += '_' + padding_text
+    if lock_padding and item_padding != '':
+        final_name += '_' + item_padding
+
+    return final_name
+
+
+def smart_suffix_for(target):
+    item_type = target.node_type
+    if item_type == 'joint' and not target.has_children:
+        item_type = 'jointEnd'
+    if item_type not in SUFFIX_DICT:
+        return None
+    return SUFFIX_DICT[item_type].lower()
+
+
+def plan_renames(targets, prefix='', name='', suffix='', pad_index=1, padding=3, lock_prefix=False,
+                 lock_name=False, lock_suffix=False, lock_padding=False, smart_suffix=False, letter_suffix=False,
+                 preserve_namespaces=True):
+    # Returns [(key, old_name, new_name)] in target order, nodes whose name wouldn't change are left out
+    plan = []
+    unregistered = False
+
+    parsed = parse_many(target.name for target in targets)
+    for index, (target, item_name) in enumerate(zip(targets, parsed)):
+
+        item_suffix = suffix
+        if smart_suffix and suffix != '':
+            item_suffix = smart_suffix_for(target)
+            if item_suffix is None:
+                unregistered = True
+                item_suffix = SUFFIX_DICT['mesh'].lower()
+
+        final_name = build_name(item_name, index, prefix=prefix, name=name, suffix=item_suffix,
+                                pad_index=pad_index, padding=padding, lock_prefix=lock_prefix, lock_name=lock_name,
+                                lock_suffix=lock_suffix, lock_padding=lock_padding, letter_suffix=letter_suffix)
+        if final_name == '':
+            continue
+        if preserve_namespaces and item_name.namespace:
+            final_name = f'{item_name.namespace}:{final_name}'
+        if final_name != target.name:
+            plan.append((target.key, target.name, final_name))
+
+    if unregistered:
+        logging.warning("Some objects aren't registered in the suffix database. Will use _OBJ_ instead.")
+    return plan
+
+
+def find_collisions(plan, targets, siblings):
+    # Names that would end up shared by two children of the same parent once the plan is applied.
+    # siblings maps each parent key (None for world) to [(key, name)] of all its current children.
+    # Returns {(parent, name): [keys]}.
+    parents = {target.key: target.parent for target in targets}
+    new_names = {key: new_name for key, _, new_name in plan}
+
+    renamed_by_parent = defaultdict(list)
+    for key in new_names:
+        renamed_by_parent[parents[key]].append(key)
+
+    collisions = {}
+    for parent, keys in renamed_by_parent.items():
+        owners = defaultdict(list)
+        listed = set()
+        for key, current_name in siblings.get(parent, ()):
+            listed.add(key)
+            owners[new_names.get(key, current_name)].append(key)
+        for key in keys:
+            if key not in listed:
+                owners[new_names[key]].append(key)
+
+        for final_name, owner_keys in owners.items():
+            if len(owner_keys) > 1:
+                collisions[(parent, final_name)] = owner_keys
+    return collisions
+
+
+def needs_temp_names(plan, targets, siblings):
+    # True if a new name is currently held by another node in the same parent that is also being renamed,
+    # in which case the plan has to go through temporary names first.
+    parents = {target.key: target.parent for target in targets}
+    renamed = {key for key, _, _ in plan}
+    current_owner = {}
+    for parent in {parents[key] for key in renamed}:
+        for sibling_key, sibling_name in siblings.get(parent, ()):
+            current_owner[(parent, sibling_name)] = sibling_key
+
+    for key, _, new_name in plan:
+        owner = current_owner.get((parents[key], new_name))
+        if owner is not None and owner != key and owner in renamed:
+            return True
+    return False
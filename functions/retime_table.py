@@ -0,0 +1,76 @@
+import os
+import re
+from array import array
+
+import numpy as np
+
+# Editorial retime files come out of different packages as space, tab or comma separated columns.
+RETIME_EXTENSIONS = ('.ascii', '.txt', '.csv')
+
+_separator = re.compile(r'[,\s]+')
+_table_cache = {}
+
+
+def is_retime_file(retime_path):
+    return bool(retime_path) and os.path.isfile(retime_path) and retime_path.lower().endswith(RETIME_EXTENSIONS)
+
+
+def parse_retime_lines(lines):
+    # Stream numeric rows into a flat float64 buffer. The first row with at least two numbers decides the column
+    # count, so a lone frame count in the header can't. Headers, comments, single values and short rows are skipped,
+    # empty fields from leading or trailing separators are ignored.
+    values = array('d')
+    columns = 0
+    for line in lines:
+        fields = [f for f in _separator.split(line) if f]
+        if len(fields) < 2:
+            continue
+        try:
+            row = [float(f) for f in fields]
+        except ValueError:
+            continue
+
+        if not columns:
+            columns = len(row)
+        if len(row) < columns:
+            continue
+        values.extend(row[:columns])
+
+    if not columns:
+        return np.empty((0, 2), dtype=np.float64)
+    return np.frombuffer(values, dtype=np.float64).reshape(-1, columns)
+
+
+def read_retime_table(retime_path):
+    # Parsed tables are cached on path + mtime, so the same editorial file is only read once per session
+    # no matter how many shots get retimed with it.
+    retime_path = os.path.abspath(retime_path)
+    stat = os.stat(retime_path)
+    key = (retime_path, stat.st_mtime_ns, stat.st_size)
+
+    table = _table_cache.get(key)
+    if table is None:
+        with open(retime_path, 'r') as file:
+            table = parse_retime_lines(file)
+        table.setflags(write=False)
+
+        for old_key in [k for k in _table_cache if k[0] == retime_path]:
+            del _table_cache[old_key]
+        _table_cache[key] = table
+
+    return table
+
+
+def read_retime_columns(retime_path, reverse_order=False):
+    table = read_retime_table(retime_path)
+    if table.shape[1] < 2:
+        return np.empty(0, dtype=np.float64), np.empty(0, dtype=np.float64)
+
+    old_time, new_time = table[:, 0], table[:, 1]
+    if reverse_order:
+        old_time, new_time = new_time, old_time
+    return old_time, new_time
+
+
+def clear_cache():
+    _table_cache.clear()
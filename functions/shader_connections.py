@@ -0,0 +1,77 @@
+import os
+import gzip
+import json
+
+# Shader connection files, {shader: [object paths]}, written by the Maya exporter and read by the Houdini lookdev
+# tools, so no DCC imports here. Plain .json keeps that layout. Files ending in .gz are columnar instead: shader
+# names, member counts and one flat member column, gzipped. load_shader_connections reads both.
+
+COLUMNAR_SUFFIX = '.gz'
+COLUMNAR_FORMAT = 'ce_shader_connections'
+COLUMNAR_VERSION = 1
+_chunk_size = 4096
+_gzip_magic = b'\x1f\x8b'
+
+
+def write_strings(f, strings, leading_comma=False):
+    # Stream json strings in chunks instead of building the whole document in memory
+    for i in range(0, len(strings), _chunk_size):
+        if i or leading_comma:
+            f.write(',')
+        f.write(','.join(json.dumps(string) for string in strings[i:i + _chunk_size]))
+
+
+def write_json(shader_data, f):
+    f.write('{')
+    for i, (shader, members) in enumerate(shader_data.items()):
+        if i:
+            f.write(',\n')
+        f.write(f'{json.dumps(shader)}:[')
+        write_strings(f, members)
+        f.write(']')
+    f.write('}\n')
+
+
+def write_columnar(shader_data, f):
+    header = {'format': COLUMNAR_FORMAT, 'version': COLUMNAR_VERSION, 'shaders': list(shader_data),
+              'counts': [len(members) for members in shader_data.values()]}
+    f.write(json.dumps(header)[:-1] + ',"members":[')
+    written = False
+    for members in shader_data.values():
+        write_strings(f, members, leading_comma=written)
+        written = written or bool(members)
+    f.write(']}\n')
+
+
+def save_shader_connections(shader_data, file_path):
+    # Written to a temp file first so an interrupted export never leaves a broken file behind
+    temp_path = file_path + '.tmp'
+    if file_path.endswith(COLUMNAR_SUFFIX):
+        with gzip.open(temp_path, 'wt', encoding='utf-8') as f:
+            write_columnar(shader_data, f)
+    else:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            write_json(shader_data, f)
+    os.replace(temp_path, file_path)
+
+
+def load_shader_connections(file_path):
+    with open(file_path, 'rb') as f:
+        compressed = f.read(2) == _gzip_magic
+
+    if not compressed:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    with gzip.open(file_path, 'rt', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('format') != COLUMNAR_FORMAT or data.get('version') != COLUMNAR_VERSION:
+        raise ValueError(f'{file_path} is not a shader connections file.')
+
+    members = data['members']
+    shader_data = {}
+    start = 0
+    for shader, count in zip(data['shaders'], data['counts']):
+        shader_data[shader] = members[start:start + count]
+        start += count
+    return shader_data
@@ -0,0 +1,208 @@
+from collections import namedtuple
+
+import maya.api.OpenMaya as om2
+
+from CETools.functions.commonFunctions import do_modifier
+
+# Shading networks described as plain specs (nodes, attribute values, connections) and created in one MDGModifier,
+# instead of a shadingNode/connectAttr/setAttr command per node and plug. The modifier runs through the ceDoModifier
+# command, so the whole network is a single undoable step. Nodes in a spec are referenced by the index add_node
+# returns, existing scene nodes by name. An attribute index of [-1] means the next free element.
+
+PLACE2D_ATTRIBUTES = (
+    "coverage", "translateFrame", "rotateFrame", "mirrorU", "mirrorV", "stagger", "wrapU", "wrapV", "repeatUV",
+    "vertexUvOne", "vertexUvTwo", "vertexUvThree", "vertexCameraOne", "noiseUV", "offset", "rotateUV")
+
+# What shadingNode -asShader/-asTexture/-asUtility hooks up so the nodes show in the hypershade
+CLASSIFICATION_LISTS = {
+    'shader': ('defaultShaderList1', 'shaders'),
+    'texture': ('defaultTextureList1', 'textures'),
+    'utility': ('defaultRenderUtilityList1', 'utilities'),
+}
+
+# What shadingNode -isColorManaged connects on file nodes
+COLOR_MANAGEMENT_CONNECTIONS = (
+    ('cmEnabled', 'colorManagementEnabled'),
+    ('configFileEnabled', 'colorManagementConfigFileEnabled'),
+    ('configFilePath', 'colorManagementConfigFilePath'),
+    ('workingSpaceName', 'workingSpace'),
+)
+
+NodeSpec = namedtuple('NodeSpec', ['node_type', 'name', 'attributes', 'classification'])
+
+
+class NetworkSpec(object):
+    def __init__(self, share_place2d=True):
+        self.nodes = []
+        self.connections = []
+        self.share_place2d = share_place2d
+        self.place2d_nodes = {}
+
+    def add_node(self, node_type, name, attributes=None, classification=None):
+        self.nodes.append(NodeSpec(node_type, name, dict(attributes or {}), classification))
+        return len(self.nodes) - 1
+
+    def connect(self, source, source_attribute, destination, destination_attribute):
+        self.connections.append((source, source_attribute, destination, destination_attribute))
+
+    def set_attributes(self, node, **attributes):
+        self.nodes[node].attributes.update(attributes)
+
+    def place2d_texture(self, **uv_settings):
+        # One place2dTexture per distinct set of uv settings, shared by every file node that uses them
+        key = tuple(sorted(uv_settings.items()))
+        if self.share_place2d and key in self.place2d_nodes:
+            return self.place2d_nodes[key]
+        node = self.add_node('place2dTexture', 'place2dTexture1', uv_settings, classification='utility')
+        self.place2d_nodes[key] = node
+        return node
+
+    def file_texture(self, name, file_path=None, attributes=None, uv_settings=None):
+        attributes = dict(attributes or {})
+        if file_path is not None:
+            attributes['fileTextureName'] = file_path
+        file_node = self.add_node('file', name, attributes, classification='texture')
+        place_2d_texture = self.place2d_texture(**(uv_settings or {}))
+        self.connect(place_2d_texture, 'outUV', file_node, 'uvCoord')
+        self.connect(place_2d_texture, 'outUvFilterSize', file_node, 'uvFilterSize')
+        for attribute in PLACE2D_ATTRIBUTES:
+            self.connect(place_2d_texture, attribute, file_node, attribute)
+        for source_attribute, destination_attribute in COLOR_MANAGEMENT_CONNECTIONS:
+            self.connect('defaultColorMgtGlobals', source_attribute, file_node, destination_attribute)
+        return file_node
+
+    def shader(self, node_type, name, attributes=None):
+        return self.add_node(node_type, name, attributes, classification='shader')
+
+    def shading_group(self, name, shader=None):
+        # Same hookups sets -renderable makes: render partition, material info and light linking
+        shading_group = self.add_node('shadingEngine', name, {'renderableOnlySet': True})
+        material_info = self.add_node('materialInfo', 'materialInfo1')
+        self.connect(shading_group, 'partition', 'renderPartition', 'sets[-1]')
+        self.connect(shading_group, 'message', material_info, 'shadingGroup')
+        self.connect('defaultLightSet', 'message', 'lightLinker1', 'link[-1].light')
+        self.connect(shading_group, 'message', 'lightLinker1', 'link[-1].object')
+        self.connect('defaultLightSet', 'message', 'lightLinker1', 'shadowLink[-1].shadowLight')
+        self.connect(shading_group, 'message', 'lightLinker1', 'shadowLink[-1].shadowObject')
+        if shader is not None:
+            self.connect(shader, 'outColor', shading_group, 'surfaceShader')
+        return shading_group
+
+    def stats(self):
+        return {'nodes': len(self.nodes), 'connections': len(self.connections),
+                'place2d_nodes': sum(1 for node in self.nodes if node.node_type == 'place2dTexture')}
+
+
+class _ArrayIndices(object):
+    # Next free logical index per array plug, so [-1] in a spec acts like connectAttr -nextAvailable. Keyed on the
+    # spec reference and attribute, plugs on nodes the modifier hasn't created yet have no usable name.
+    def __init__(self):
+        self.next_index = {}
+
+    def element(self, key, array_plug):
+        if key not in self.next_index:
+            existing = array_plug.getExistingArrayAttributeIndices()
+            self.next_index[key] = (max(existing) + 1) if existing else 0
+        index = self.next_index[key]
+        self.next_index[key] += 1
+        return array_plug.elementByLogicalIndex(index)
+
+
+def find_plug(node, attribute_path):
+    # attribute_path like 'outColor', 'textures[3]' or 'link[0].light'
+    fn_node = om2.MFnDependencyNode(node)
+    plug = None
+    for part in attribute_path.split('.'):
+        name, _, index = part.partition('[')
+        plug = fn_node.findPlug(name, False) if plug is None else plug.child(fn_node.attribute(name))
+        if index:
+            plug = plug.elementByLogicalIndex(int(index.rstrip(']')))
+    return plug
+
+
+def find_plug_child(node, plug, child_path):
+    fn_node = om2.MFnDependencyNode(node)
+    for part in child_path.split('.'):
+        plug = plug.child(fn_node.attribute(part))
+    return plug
+
+
+def find_destination(reference, node, attribute_path, indices, pending_elements):
+    # [-1] picks the next free element like connectAttr -nextAvailable. 'a[-1].b' followed by 'a[-1].c' on the
+    # same node land on the same new element, the next 'a[-1].b' starts a new one.
+    if '[-1]' not in attribute_path:
+        return find_plug(node, attribute_path)
+
+    array_path, _, child_path = attribute_path.partition('[-1]')
+    child_path = child_path.strip('.')
+    key = (reference, array_path)
+    element, used_children = pending_elements.get(key, (None, set()))
+    if element is None or not child_path or child_path in used_children:
+        element = indices.element(key, find_plug(node, array_path))
+        used_children = set()
+    used_children.add(child_path)
+    pending_elements[key] = (element, used_children)
+
+    if not child_path:
+        return element
+    return find_plug_child(node, element, child_path)
+
+
+def set_plug_value(modifier, plug, value):
+    if isinstance(value, bool):
+        modifier.newPlugValueBool(plug, value)
+    elif isinstance(value, int):
+        modifier.newPlugValueInt(plug, value)
+    elif isinstance(value, float):
+        modifier.newPlugValueDouble(plug, value)
+    else:
+        modifier.newPlugValueString(plug, str(value))
+
+
+def get_node(name):
+    sel = om2.MSelectionList()
+    sel.add(name)
+    return sel.getDependNode(0)
+
+
+def build_network(spec):
+    # Create every node, value and connection of the spec in one MDGModifier, run as one undoable command. Returns
+    # the node names in spec order.
+    modifier = om2.MDGModifier()
+    nodes = []
+    for node_spec in spec.nodes:
+        node = modifier.createNode(node_spec.node_type)
+        modifier.renameNode(node, node_spec.name)
+        nodes.append(node)
+
+    scene_nodes = {}
+
+    def resolve(reference):
+        if isinstance(reference, int):
+            return nodes[reference]
+        if reference not in scene_nodes:
+            scene_nodes[reference] = get_node(reference)
+        return scene_nodes[reference]
+
+    indices = _ArrayIndices()
+    for node, node_spec in zip(nodes, spec.nodes):
+        for attribute, value in node_spec.attributes.items():
+            set_plug_value(modifier, find_plug(node, attribute), value)
+        if node_spec.classification:
+            list_node, list_attribute = CLASSIFICATION_LISTS[node_spec.classification]
+            modifier.connect(om2.MFnDependencyNode(node).findPlug('message', False),
+                             indices.element((list_node, list_attribute),
+                                             find_plug(resolve(list_node), list_attribute)))
+
+    pending_elements = {}
+    for source, source_attribute, destination, destination_attribute in spec.connections:
+        source_plug = find_plug(resolve(source), source_attribute)
+        destination_plug = find_destination(destination, resolve(destination), destination_attribute, indices,
+                                            pending_elements)
+        # Replace existing inputs, like connectAttr -force
+        if destination_plug.isDestination:
+            modifier.disconnect(destination_plug.source(), destination_plug)
+        modifier.connect(source_plug, destination_plug)
+
+    do_modifier(modifier)
+    return [om2.MFnDependencyNode(node).name() for node in nodes]
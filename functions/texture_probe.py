@@ -0,0 +1,246 @@
+import os
+import json
+import struct
+import logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from CETools.functions.exr_header import EXR_MAGIC, read_exr_header, window_size
+
+# Image header probe for texture libraries: size, bit depth, channel count and tiling for PNG, JPEG, TIFF (and .tx)
+# and EXR files, read from the first bytes of each file without decoding any pixels. Results are cached on disk by
+# path, mtime and size, so only new or changed textures are ever opened again.
+
+ImageInfo = namedtuple('ImageInfo', ['format', 'width', 'height', 'bit_depth', 'channels', 'is_float', 'tiled'])
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'CETools', 'texture_probe.json')
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+_png_channels = {0: 1, 2: 3, 3: 3, 4: 2, 6: 4}
+# SOF markers carry the frame size, C4 (DHT), C8 (JPG) and CC (DAC) don't
+_jpeg_sof = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+_tiff_types = {1: 'B', 3: 'H', 4: 'I', 16: 'Q'}
+# Pixel type in an EXR channel list: 0 = uint, 1 = half, 2 = float
+_exr_bit_depth = {0: 32, 1: 16, 2: 32}
+
+
+def probe_png(f):
+    f.seek(len(PNG_SIGNATURE))
+    length, chunk_type = struct.unpack('>I4s', f.read(8))
+    if chunk_type != b'IHDR':
+        return None
+    width, height, bit_depth, color_type = struct.unpack('>IIBB', f.read(10))
+    return ImageInfo('png', width, height, bit_depth, _png_channels.get(color_type, 3), False, False)
+
+
+def probe_jpeg(f):
+    f.seek(2)
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        # Fill bytes and standalone markers have no length
+        if marker[1] == 0xFF:
+            f.seek(-1, os.SEEK_CUR)
+            continue
+        if marker[1] in (0x01,) or 0xD0 <= marker[1] <= 0xD9:
+            continue
+        length = struct.unpack('>H', f.read(2))[0]
+        if marker[1] in _jpeg_sof:
+            precision, height, width, components = struct.unpack('>BHHB', f.read(6))
+            return ImageInfo('jpeg', width, height, precision, components, False, False)
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def probe_tiff(f):
+    f.seek(0)
+    order = '<' if f.read(2) == b'II' else '>'
+    version, ifd_offset = struct.unpack(order + 'HI', f.read(6))
+    if version != 42:
+        # BigTIFF isn't used for textures
+        return None
+
+    f.seek(ifd_offset)
+    count = struct.unpack(order + 'H', f.read(2))[0]
+    tags = {}
+    for _ in range(count):
+        tag, value_type, value_count, value = struct.unpack(order + 'HHI4s', f.read(12))
+        code = _tiff_types.get(value_type)
+        if code is None:
+            continue
+        if struct.calcsize(code) * value_count <= 4:
+            tags[tag] = struct.unpack_from(order + code, value)[0]
+        else:
+            # Only the first value is needed (bits per sample is the same for every channel)
+            position = f.tell()
+            f.seek(struct.unpack(order + 'I', value)[0])
+            tags[tag] = struct.unpack(order + code, f.read(struct.calcsize(code)))[0]
+            f.seek(position)
+
+    return ImageInfo('tiff', tags.get(256, 0), tags.get(257, 0), tags.get(258, 1), tags.get(277, 1),
+                     tags.get(339, 1) == 3, 322 in tags)
+
+
+def parse_exr_channels(data):
+    # [(name, pixel type)] from a chlist attribute
+    channels = []
+    position = 0
+    while position < len(data) and data[position] != 0:
+        end = data.index(b'\0', position)
+        name = data[position:end].decode('ascii', 'replace')
+        pixel_type = struct.unpack_from('<i', data, end + 1)[0]
+        channels.append((name, pixel_type))
+        position = end + 1 + 16
+    return channels
+
+
+def probe_exr(file_path):
+    header = read_exr_header(file_path, attributes=('dataWindow', 'channels', 'tiles'))
+    if 'dataWindow' not in header:
+        return None
+    width, height = window_size(header['dataWindow'])
+    channels = parse_exr_channels(header.get('channels', b''))
+    bit_depth = max((_exr_bit_depth.get(pixel_type, 32) for _, pixel_type in channels), default=16)
+    return ImageInfo('exr', width, height, bit_depth, len(channels), True, 'tiles' in header)
+
+
+def probe_image(file_path):
+    # Returns an ImageInfo, or None for formats that aren't handled
+    with open(file_path, 'rb') as f:
+        magic = f.read(8)
+        if magic.startswith(PNG_SIGNATURE):
+            return probe_png(f)
+        if magic.startswith(b'\xff\xd8'):
+            return probe_jpeg(f)
+        if magic[:4] in (b'II*\x00', b'MM\x00*'):
+            return probe_tiff(f)
+    if struct.unpack('<i', magic[:4])[0] == EXR_MAGIC:
+        return probe_exr(file_path)
+    return None
+
+
+class ProbeCache(object):
+    # {path: [mtime_ns, size, info]} in a json file
+    def __init__(self, cache_path=DEFAULT_CACHE_PATH):
+        self.cache_path = cache_path
+        self.entries = None
+        self.changed = False
+
+    def load(self):
+        if self.entries is not None:
+            return
+        self.entries = {}
+        if self.cache_path and os.path.isfile(self.cache_path):
+            try:
+                with open(self.cache_path, 'r') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                logging.warning(f'Texture probe cache at {self.cache_path} is unreadable, starting a new one.')
+
+    def get(self, file_path, stat):
+        self.load()
+        entry = self.entries.get(file_path)
+        if entry and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+            return ImageInfo(*entry[2]) if entry[2] else None
+        raise KeyError(file_path)
+
+    def set(self, file_path, stat, info):
+        self.load()
+        self.entries[file_path] = [stat.st_mtime_ns, stat.st_size, list(info) if info else None]
+        self.changed = True
+
+    def save(self):
+        if not (self.changed and self.cache_path):
+            return
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        temp_path = self.cache_path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(self.entries, f, separators=(',', ':'))
+        os.replace(temp_path, self.cache_path)
+        self.changed = False
+
+
+_caches = {}
+
+
+def get_cache(cache_path=DEFAULT_CACHE_PATH):
+    if cache_path not in _caches:
+        _caches[cache_path] = ProbeCache(cache_path)
+    return _caches[cache_path]
+
+
+def probe_many(file_paths, workers=None, cache_path=DEFAULT_CACHE_PATH):
+    # {path: ImageInfo or None} for every file. Cache misses are read in a thread pool, the work is all
+    # file system latency.
+    cache = get_cache(cache_path)
+    results = {}
+    missing = []
+    for file_path in file_paths:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            results[file_path] = None
+            continue
+        try:
+            results[file_path] = cache.get(file_path, stat)
+        except KeyError:
+            missing.append((file_path, stat))
+
+    def safe_probe(file_path):
+        try:
+            return probe_image(file_path)
+        except (OSError, ValueError, KeyError, struct.error):
+            return None
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=workers or min(32, len(missing))) as pool:
+            for (file_path, stat), info in zip(missing, pool.map(safe_probe, [m[0] for m in missing])):
+                results[file_path] = info
+                cache.set(file_path, stat, info)
+        cache.save()
+
+    return results
+
+
+# Colorspace, tiling and .tx decisions made from the probed headers
+
+SRGB_COLORSPACE = 'Utility - sRGB - Texture'
+LINEAR_COLORSPACE = 'Utility - Linear - sRGB'
+RAW_COLORSPACE = 'Utility - Raw'
+TX_MIN_SIZE = 1024
+
+
+def texture_colorspace(infos, is_data=False):
+    # Data channels and single channel (grayscale, or grayscale + alpha) images are raw. Color is linear when any
+    # tile holds float or more than 16 bit pixels, sRGB otherwise.
+    infos = [info for info in infos if info]
+    if is_data or (infos and all(info.channels <= 2 for info in infos)):
+        return RAW_COLORSPACE
+    if any(info.is_float or info.bit_depth > 16 for info in infos):
+        return LINEAR_COLORSPACE
+    return SRGB_COLORSPACE
+
+
+def mismatched_tiles(infos):
+    # True when the tiles of one channel disagree on channel count, bit depth or float pixels
+    return len({(info.channels, info.bit_depth, info.is_float) for info in infos if info}) > 1
+
+
+def tx_path(file_path):
+    return os.path.splitext(file_path)[0] + '.tx'
+
+
+def current_tx(file_path):
+    # The .tx next to the file if it is at least as new as the file, otherwise None
+    tx_file = tx_path(file_path)
+    try:
+        if os.stat(tx_file).st_mtime_ns >= os.stat(file_path).st_mtime_ns:
+            return tx_file
+    except OSError:
+        pass
+    return None
+
+
+def wants_tx(info, min_size=TX_MIN_SIZE):
+    # Large scanline images are worth converting to tiled, mipmapped .tx
+    return bool(info) and not info.tiled and max(info.width, info.height) >= min_size
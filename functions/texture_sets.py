@@ -0,0 +1,138 @@
+import os
+import re
+import logging
+
+# Texture folder index shared by the Maya and Houdini lookdev builders, so no DCC imports here.
+# Files are named <material><Channel><anything>[<UDIM>].<ext>, e.g. chair_wood_BaseColor.1001.png, and get indexed
+# as {material: {channel: {udim: path}}}. The udim is the last 4 digit group in the name, '' when there is none.
+
+CHANNELS = ('BaseColor', 'Roughness', 'Metalness', 'Normal', 'Height')
+TEXTURE_EXTENSIONS = ('.png', '.jpg', '.tif', '.tiff', '.exr')
+
+_udim = re.compile(r'\d{4}')
+_number = re.compile(r'\d+')
+_grammar_cache = {}
+_index_cache = {}
+
+
+def texture_grammar(channels=CHANNELS, extensions=TEXTURE_EXTENSIONS):
+    # One compiled pattern per channel/extension set. The material is everything before the first channel name.
+    key = (tuple(channels), tuple(extensions))
+    grammar = _grammar_cache.get(key)
+    if grammar is None:
+        channel_group = '|'.join(re.escape(channel) for channel in sorted(channels, key=len, reverse=True))
+        extension_group = '|'.join(re.escape(extension) for extension in extensions)
+        grammar = re.compile(rf'(?P<material>.*?)(?P<channel>{channel_group})(?P<rest>.*)(?:{extension_group})')
+        _grammar_cache[key] = grammar
+    return grammar
+
+
+def version_key(file_path):
+    # Numbers in the file name other than the udim, e.g. (2,) for table_Height_v002.1001.png
+    file_name = os.path.basename(file_path)
+    tiles = list(_udim.finditer(file_name))
+    if tiles:
+        start, end = tiles[-1].span()
+        file_name = f'{file_name[:start]}{file_name[end:]}'
+    return tuple(int(number) for number in _number.findall(file_name))
+
+
+def add_texture(channel_tiles, udim, file_path, use_latest=True):
+    # Several files for the same tile (versions) resolve to the highest version, or the lowest without use_latest
+    existing = channel_tiles.get(udim)
+    if existing is None:
+        channel_tiles[udim] = file_path
+        return
+    newer = version_key(file_path) > version_key(existing)
+    if newer == use_latest:
+        channel_tiles[udim] = file_path
+    logging.warning(f'{os.path.basename(existing)} and {os.path.basename(file_path)} are the same texture tile, '
+                    f'using {os.path.basename(channel_tiles[udim])}.')
+
+
+def scan_texture_sets(folder_path, channels=CHANNELS, extensions=TEXTURE_EXTENSIONS, use_latest=True):
+    # One scandir pass over the folder, entries in name order so the result doesn't depend on the file system
+    grammar = texture_grammar(channels, extensions)
+    index = {}
+    with os.scandir(folder_path) as entries:
+        entries = sorted(entries, key=lambda entry: entry.name)
+    for entry in entries:
+        match = grammar.fullmatch(entry.name)
+        if match is None or not entry.is_file():
+            continue
+        material, channel = match.group('material'), match.group('channel')
+        tiles = _udim.findall(entry.name)
+        udim = tiles[-1] if tiles else ''
+        add_texture(index.setdefault(material, {}).setdefault(channel, {}), udim, entry.path, use_latest)
+    return index
+
+
+def index_texture_sets(folder_path, channels=CHANNELS, extensions=TEXTURE_EXTENSIONS, use_latest=True):
+    # Cached on the folder's mtime, which changes whenever a texture is added, removed or renamed.
+    # The returned index is shared, don't edit it.
+    folder_path = os.path.abspath(folder_path)
+    mtime = os.stat(folder_path).st_mtime_ns
+    key = (folder_path, tuple(channels), tuple(extensions), use_latest)
+
+    cached = _index_cache.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    index = scan_texture_sets(folder_path, channels, extensions, use_latest)
+    _index_cache[key] = (mtime, index)
+    return index
+
+
+def merge_texture_sets(index, material, use_latest=True):
+    # Every material's textures as one material, for folders that hold a single texture set
+    merged = {}
+    for channels in index.values():
+        for channel, tiles in channels.items():
+            for udim, file_path in tiles.items():
+                add_texture(merged.setdefault(channel, {}), udim, file_path, use_latest)
+    return {material: merged} if merged else {}
+
+
+UDIM_RANGE = range(1001, 2001)
+
+
+def udim_tiles(tiles):
+    # Tile numbers that are real UDIMs (1001-2000), in numeric order
+    return sorted((udim for udim in tiles if udim and int(udim) in UDIM_RANGE), key=int)
+
+
+def highest_tile(tiles):
+    # (udim, path) of the numerically highest tile of a channel, files without a tile number count as lowest
+    udim = max(tiles, key=lambda tile: int(tile) if tile else -1)
+    return udim, tiles[udim]
+
+
+def udim_path(file_path):
+    # Replace the tile number in the file name with the <UDIM> token
+    folder, file_name = os.path.split(file_path)
+    tiles = list(_udim.finditer(file_name))
+    if not tiles:
+        return file_path
+    start, end = tiles[-1].span()
+    return os.path.join(folder, f'{file_name[:start]}<UDIM>{file_name[end:]}')
+
+
+def match_materials(material_keys, scene_materials):
+    # {material key: scene material} for every key that contains the name of an existing material, the longest
+    # name wins. Every substring of each key is looked up in a set instead of testing every scene material.
+    by_name = set(scene_materials)
+    lengths = sorted({len(name) for name in by_name}, reverse=True)
+
+    matches = {}
+    for key in material_keys:
+        for length in lengths:
+            found = next((key[i:i + length] for i in range(len(key) - length + 1) if key[i:i + length] in by_name),
+                         None)
+            if found:
+                matches[key] = found
+                break
+    return matches
+
+
+def clear_cache():
+    _index_cache.clear()
@@ -0,0 +1,178 @@
+import os
+import sys
+import glob
+import shutil
+import logging
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import maya.cmds as cmds
+import maya.utils
+import maya.api.OpenMaya as om2
+
+from CETools.functions.texture_probe import tx_path, current_tx
+from CETools.functions.texture_sets import udim_path
+
+# Background conversion of linked textures to tiled, mipmapped .tx files. Every conversion is its own converter
+# process, the pool threads only wait on them. When every tile of a file node is converted the node is switched to
+# the .tx on Maya's main thread, unless its path was changed in the meantime. Quitting Maya drops the queued
+# conversions and kills the running converters, instead of waiting for all of them to finish.
+# Converters are argument lists where {source} and {output} get replaced with the file paths.
+
+DEFAULT_CONVERTER = ('maketx', '-u', '--oiio', '{source}', '-o', '{output}')
+# Copies the source to the output, for testing the queue without maketx
+STUB_CONVERTER = (sys.executable, '-c', 'import shutil, sys; shutil.copyfile(sys.argv[1], sys.argv[2])',
+                  '{source}', '{output}')
+
+
+def converter_command(converter, source, output):
+    return [arg.format(source=source, output=output) for arg in converter]
+
+
+def convert_texture(source, converter=DEFAULT_CONVERTER, force=False, processes=None):
+    # Returns (output, status) with status 'skipped' when the .tx is already newer than the source,
+    # 'converted' or 'failed'. The running converter is kept in processes ({partial path: Popen}) when given.
+    output = tx_path(source)
+    if not force and current_tx(source):
+        return output, 'skipped'
+
+    # Convert next to the output and swap it in, so a half written .tx is never picked up
+    partial = os.path.splitext(output)[0] + '.partial.tx'
+    process = subprocess.Popen(converter_command(converter, source, partial), stdout=subprocess.DEVNULL,
+                               stderr=subprocess.PIPE)
+    if processes is not None:
+        processes[partial] = process
+    try:
+        _, stderr = process.communicate()
+    finally:
+        if processes is not None:
+            processes.pop(partial, None)
+
+    if process.returncode != 0 or not os.path.isfile(partial):
+        logging.warning(f'Converting {source} failed: {stderr.decode(errors="replace").strip()}')
+        remove_partial(partial)
+        return output, 'failed'
+    os.replace(partial, output)
+    return output, 'converted'
+
+
+def remove_partial(partial):
+    try:
+        os.remove(partial)
+    except OSError:
+        pass
+
+
+def texture_tiles(file_path, tiling_mode=0):
+    # Every file a file node reads, all tiles of a UDIM texture
+    if not tiling_mode:
+        return [file_path]
+    pattern = udim_path(file_path).replace('<UDIM>', '[0-9]' * 4)
+    return sorted(glob.glob(pattern)) or [file_path]
+
+
+class TxConversionQueue(object):
+    def __init__(self, converter=DEFAULT_CONVERTER, workers=None):
+        self.converter = tuple(converter)
+        self.workers = workers or os.cpu_count()
+        self.executor = None
+        self.jobs = {}
+        self.processes = {}
+        self.lock = threading.Lock()
+        self.exit_callback_id = None
+
+    def available(self):
+        return shutil.which(self.converter[0]) is not None
+
+    def submit(self, source):
+        # One job per source file, files already being converted aren't queued again
+        with self.lock:
+            future = self.jobs.get(source)
+            if future is not None and not future.done():
+                return future
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.workers)
+            if self.exit_callback_id is None:
+                self.exit_callback_id = om2.MSceneMessage.addCallback(om2.MSceneMessage.kMayaExiting, self.abort)
+            future = self.executor.submit(convert_texture, source, self.converter, processes=self.processes)
+            self.jobs[source] = future
+            return future
+
+    def submit_file_nodes(self, file_nodes, warn=True):
+        # Convert every tile each file node reads and switch the node to the .tx once they are all done
+        if not self.available():
+            if warn:
+                logging.warning(f'{self.converter[0]} not found, textures were not converted to .tx.')
+            return 0
+
+        queued = 0
+        for file_node in file_nodes:
+            file_path = cmds.getAttr(f'{file_node}.fileTextureName')
+            if not file_path or file_path.lower().endswith('.tx') or not os.path.isfile(file_path):
+                continue
+            tiles = texture_tiles(file_path, cmds.getAttr(f'{file_node}.uvTilingMode'))
+            futures = [self.submit(tile) for tile in tiles]
+            pending = [len(futures)]
+
+            def tile_done(_, file_node=file_node, file_path=file_path, futures=futures, pending=pending):
+                with self.lock:
+                    pending[0] -= 1
+                    if pending[0]:
+                        return
+                # Cancelled when Maya quit before the conversion started
+                if not any(future.cancelled() for future in futures) and \
+                        all(future.result()[1] != 'failed' for future in futures):
+                    maya.utils.executeDeferred(swap_to_tx, file_node, file_path)
+
+            for future in futures:
+                future.add_done_callback(tile_done)
+            queued += 1
+        return queued
+
+    def pending(self):
+        with self.lock:
+            return sum(1 for future in self.jobs.values() if not future.done())
+
+    def abort(self, *args):
+        # Maya is quitting: cancel queued conversions, kill the running converters and remove their partial files.
+        # The pool threads only wait on the converters, so they finish right after.
+        with self.lock:
+            executor, self.executor = self.executor, None
+            processes = dict(self.processes)
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        for partial, process in processes.items():
+            process.kill()
+            process.wait()
+            remove_partial(partial)
+
+    def shutdown(self, wait=True):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+def swap_to_tx(file_node, file_path):
+    # Point the file node at the .tx, only if it still reads the file that was converted. This runs whenever the
+    # conversion finishes, so it is kept out of the undo queue instead of landing between the user's own steps.
+    if not cmds.objExists(file_node) or cmds.getAttr(f'{file_node}.fileTextureName') != file_path:
+        return
+    undo_state = cmds.undoInfo(q=True, stateWithoutFlush=True)
+    cmds.undoInfo(stateWithoutFlush=False)
+    try:
+        cmds.setAttr(f'{file_node}.fileTextureName', tx_path(file_path), type='string')
+    finally:
+        cmds.undoInfo(stateWithoutFlush=undo_state)
+    logging.info(f'{file_node} now reads {tx_path(file_path)}')
+
+
+tx_queue = TxConversionQueue()
+
+
+def queue_tx_conversion(file_nodes, queue=None, convert_tx=None):
+    # convert_tx None converts only when the converter is installed, without a warning when it isn't
+    if convert_tx is False:
+        return 0
+    return (queue or tx_queue).submit_file_nodes(file_nodes, warn=convert_tx is True)
@@ -0,0 +1,198 @@
+import os
+import json
+import hashlib
+import logging
+
+import numpy as np
+import maya.cmds as cmds
+
+from CETools.functions import frustum
+from CETools.functions.commonFunctions import UndoStack, get_playback_frames
+
+# Which scene objects each shot camera ever sees, saved next to the scene as <scene>.visibility.npz.
+# The index belongs to the scene file as it was saved: a different mtime means the geometry gets gathered again,
+# entries are only thrown away if the geometry actually changed. Entries are per camera and frame range and are
+# recomputed on their own when the camera's animation, lens or clipping changes.
+
+INDEX_SUFFIX = '.visibility.npz'
+INDEX_VERSION = 1
+
+
+def index_path(scene_path):
+    return os.path.splitext(scene_path)[0] + INDEX_SUFFIX
+
+
+def array_digest(*arrays):
+    digest = hashlib.sha1()
+    for array in arrays:
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+
+class ShotVisibilityIndex(object):
+    def __init__(self, scene_path=None):
+        self.scene_path = os.path.abspath(scene_path or cmds.file(q=True, sceneName=True))
+        self.path = index_path(self.scene_path)
+        self.scene_mtime = None
+        self.names = []
+        self.corners = np.empty((0, 8, 3), dtype=np.float32)
+        self.geometry_key = ''
+        self.entries = []
+
+    def load(self):
+        # Returns False when there is no index for the scene or it was written by another version
+        if not os.path.isfile(self.path):
+            return False
+
+        with np.load(self.path, allow_pickle=False) as data:
+            header = json.loads(bytes(data['header']).decode('utf-8'))
+            if header.get('version') != INDEX_VERSION:
+                return False
+
+            names = bytes(data['names']).decode('utf-8')
+            self.names = names.split('\n') if names else []
+            self.corners = data['corners']
+            self.scene_mtime = header['scene_mtime']
+            self.geometry_key = header['geometry_key']
+            self.entries = []
+            for i, entry in enumerate(header['entries']):
+                entry['visible'] = np.unpackbits(data[f'visible_{i}'], count=len(self.names)).astype(bool)
+                self.entries.append(entry)
+        return True
+
+    def save(self):
+        header = {'version': INDEX_VERSION, 'scene_path': self.scene_path, 'scene_mtime': self.scene_mtime,
+                  'geometry_key': self.geometry_key,
+                  'entries': [{k: v for k, v in entry.items() if k != 'visible'} for entry in self.entries]}
+        arrays = {'header': np.frombuffer(json.dumps(header).encode('utf-8'), dtype=np.uint8),
+                  'names': np.frombuffer('\n'.join(self.names).encode('utf-8'), dtype=np.uint8),
+                  'corners': self.corners}
+        for i, entry in enumerate(self.entries):
+            arrays[f'visible_{i}'] = np.packbits(entry['visible'])
+
+        # Write to a temp file first so an interrupted save never leaves a broken index behind
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(temp_path, self.path)
+
+    def refresh_geometry(self, nodes=None):
+        # Gather bounding boxes again if the scene was saved since the index was written
+        scene_mtime = os.stat(self.scene_path).st_mtime_ns if os.path.isfile(self.scene_path) else None
+        if self.geometry_key and scene_mtime == self.scene_mtime:
+            return False
+
+        names, corners = frustum.gather_bounding_boxes(nodes)
+        corners = corners.astype(np.float32)
+        geometry_key = array_digest(np.frombuffer('\n'.join(names).encode('utf-8'), dtype=np.uint8), corners)
+
+        self.scene_mtime = scene_mtime
+        if geometry_key == self.geometry_key:
+            return False
+
+        self.names = names
+        self.corners = corners
+        self.geometry_key = geometry_key
+        self.entries = []
+        return True
+
+    def find_entry(self, camera, frames):
+        for entry in self.entries:
+            if entry['camera'] == camera and entry['start'] == frames[0] and entry['end'] == frames[-1]:
+                return entry
+        return None
+
+    def update(self, cameras, frames=None, nodes=None, save=True):
+        # Make sure every camera has an up to date entry for the frame range, only cameras that are new or
+        # changed since the last update get tested again
+        if frames is None:
+            frames = get_playback_frames()
+        frames = np.asarray(frames, dtype=np.float64)
+
+        self.refresh_geometry(nodes)
+        corners = self.corners.astype(np.float64)
+
+        changed = False
+        for camera in cameras:
+            camera = cmds.ls(camera, long=True)[0]
+            planes = frustum.camera_world_planes(camera, frames)
+            signature = array_digest(frames, planes)
+
+            entry = self.find_entry(camera, frames)
+            if entry is not None and entry['signature'] == signature:
+                continue
+
+            visible = frustum.ever_visible(corners, planes)
+            if entry is None:
+                self.entries.append({'camera': camera, 'start': float(frames[0]), 'end': float(frames[-1]),
+                                     'signature': signature, 'visible': visible})
+            else:
+                entry['signature'] = signature
+                entry['visible'] = visible
+            changed = True
+
+        if save and changed:
+            self.save()
+        return changed
+
+    def visible_mask(self, cameras=None):
+        # Objects seen by any of the cameras (every indexed camera by default) on any indexed frame range
+        if cameras is not None:
+            cameras = set(cmds.ls(cameras, long=True))
+        mask = np.zeros(len(self.names), dtype=bool)
+        for entry in self.entries:
+            if cameras is None or entry['camera'] in cameras:
+                mask |= entry['visible']
+        return mask
+
+    def visible(self, cameras=None):
+        return [name for name, seen in zip(self.names, self.visible_mask(cameras)) if seen]
+
+    def never_seen(self, cameras=None):
+        return [name for name, seen in zip(self.names, self.visible_mask(cameras)) if not seen]
+
+
+def load_index(scene_path=None):
+    index = ShotVisibilityIndex(scene_path)
+    index.load()
+    return index
+
+
+def build_index(cameras, frames=None, scene_path=None, nodes=None):
+    if not (scene_path or cmds.file(q=True, sceneName=True)):
+        logging.warning('Save the scene first, the visibility index is stored next to it.')
+        return None
+
+    index = load_index(scene_path)
+    index.update(cameras, frames=frames, nodes=nodes)
+    return index
+
+
+def apply_to_never_seen(index, action='hide', cameras=None):
+    # Hide, holdout or unload the references of geometry none of the cameras ever see.
+    # A reference is only unloaded when none of its geometry is seen.
+    never_seen = [name for name in index.never_seen(cameras) if cmds.objExists(name)]
+    if not never_seen:
+        logging.warning('Every indexed object is seen by the shot cameras.')
+        return []
+
+    if action == 'unload':
+        seen_references = {cmds.referenceQuery(name, rfn=True) for name in index.visible(cameras)
+                           if cmds.objExists(name) and cmds.referenceQuery(name, isNodeReferenced=True)}
+        references = {cmds.referenceQuery(name, rfn=True) for name in never_seen
+                      if cmds.referenceQuery(name, isNodeReferenced=True)}
+        unloaded = sorted(references - seen_references)
+        for reference in unloaded:
+            cmds.file(unloadReference=reference)
+        return unloaded
+
+    with UndoStack('apply_to_never_seen'):
+        if action == 'hide':
+            cmds.hide(never_seen)
+        elif action == 'holdout':
+            for name in cmds.ls(never_seen, type='surfaceShape', long=True):
+                cmds.setAttr(f'{name}.holdOut', 1)
+        else:
+            logging.warning(f"Unknown action '{action}', use hide, holdout or unload.")
+            return []
+    return never_seen
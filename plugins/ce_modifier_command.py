@@ -0,0 +1,46 @@
+import maya.api.OpenMaya as om2
+
+from CETools.functions import commonFunctions
+
+# ceDoModifier runs the MDGModifier or MDagModifier handed over by commonFunctions.do_modifier and keeps it for undo
+# and redo. A modifier run on its own sits outside the undo queue, through this command a whole batch of node, value
+# and connection edits is one undoable step. Loaded by do_modifier when first needed.
+
+COMMAND_NAME = 'ceDoModifier'
+
+
+def maya_useNewAPI():
+    pass
+
+
+class DoModifierCommand(om2.MPxCommand):
+    def __init__(self):
+        super(DoModifierCommand, self).__init__()
+        self.modifier = None
+
+    def doIt(self, args):
+        self.modifier = commonFunctions.take_pending_modifier()
+        if self.modifier is None:
+            raise RuntimeError(f'{COMMAND_NAME} only runs modifiers passed to do_modifier.')
+        self.redoIt()
+
+    def redoIt(self):
+        self.modifier.doIt()
+
+    def undoIt(self):
+        self.modifier.undoIt()
+
+    def isUndoable(self):
+        return True
+
+    @staticmethod
+    def creator():
+        return DoModifierCommand()
+
+
+def initializePlugin(plugin):
+    om2.MFnPlugin(plugin, 'CETools').registerCommand(COMMAND_NAME, DoModifierCommand.creator)
+
+
+def uninitializePlugin(plugin):
+    om2.MFnPlugin(plugin).deregisterCommand(COMMAND_NAME)
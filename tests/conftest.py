@@ -0,0 +1,3 @@
+from fake_maya import install
+
+install()
@@ -0,0 +1,178 @@
+import os
+import re
+import sys
+import types
+from unittest import mock
+
+# Stand-ins for the maya modules so the pure python parts of CETools can be tested with a plain python. cmds is an
+# empty module, tests put the commands they need on it. The API modules are mocks, only there to be imported.
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def install():
+    # Make CETools importable from the repo checkout and stub out maya, unless a real Maya is around
+    if 'CETools' not in sys.modules:
+        package = types.ModuleType('CETools')
+        package.__path__ = [REPO_ROOT]
+        sys.modules['CETools'] = package
+    try:
+        import maya.cmds
+        return
+    except ImportError:
+        pass
+
+    maya = types.ModuleType('maya')
+    maya.__path__ = []
+    modules = {'maya': maya, 'maya.cmds': types.ModuleType('maya.cmds'), 'maya.mel': types.ModuleType('maya.mel'),
+               'maya.utils': types.ModuleType('maya.utils'), 'maya.standalone': types.ModuleType('maya.standalone'),
+               'maya.api': types.ModuleType('maya.api'), 'maya.api.OpenMaya': mock.MagicMock(),
+               'maya.api.OpenMayaAnim': mock.MagicMock()}
+    modules['maya.standalone'].initialize = lambda name=None: None
+    modules['maya.utils'].executeDeferred = lambda func, *args: func(*args)
+    for name, module in modules.items():
+        if '.' in name:
+            parent, _, child = name.rpartition('.')
+            setattr(modules[parent], child, module)
+    sys.modules.update(modules)
+
+
+class FakeAnimCurves(object):
+    # Just enough of Maya's keyframe commands to compare set_keys with one setKeyframe per key. Keys are
+    # {time: [value, in tangent, out tangent]}. Keys made by setKeyframe -insert and keyTimeValue setAttr get fixed
+    # tangents like in Maya, setKeyframe gives new keys the default tangents and leaves existing keys' tangents alone.
+    def __init__(self, in_tangent='auto', out_tangent='auto'):
+        self.curves = {}
+        self.inputs = {}
+        self.in_tangent = in_tangent
+        self.out_tangent = out_tangent
+
+    def commands(self):
+        return {name: getattr(self, name) for name in ('attributeQuery', 'listRelatives', 'connectionInfo', 'getAttr',
+                                                       'createNode', 'connectAttr', 'keyframe', 'setKeyframe',
+                                                       'setAttr', 'keyTangent')}
+
+    def curve(self, plug):
+        return plug if plug in self.curves else self.inputs.get(plug)
+
+    def sorted_keys(self, curve):
+        return sorted(self.curves[curve].items())
+
+    def attributeQuery(self, attribute, node=None, exists=False, longName=False):
+        return True if exists else attribute
+
+    def listRelatives(self, *args, **kwargs):
+        return None
+
+    def connectionInfo(self, plug, isDestination=False):
+        return plug in self.inputs
+
+    def getAttr(self, plug, type=False):
+        return 'doubleLinear'
+
+    def createNode(self, node_type, name=None, skipSelect=False):
+        self.curves[name] = {}
+        return name
+
+    def connectAttr(self, source, destination, force=False):
+        self.inputs[destination] = source.split('.')[0]
+
+    def keyframe(self, plug, q=False, name=False, timeChange=False, valueChange=False):
+        curve = self.curve(plug)
+        if curve is None:
+            return None
+        if name:
+            return [curve]
+        keys = self.sorted_keys(curve)
+        if timeChange and valueChange:
+            return [x for t, key in keys for x in (t, key[0])]
+        if timeChange:
+            return [t for t, _ in keys]
+        return [key[0] for _, key in keys]
+
+    def evaluate(self, curve, t):
+        keys = self.sorted_keys(curve)
+        times = [k for k, _ in keys]
+        values = [key[0] for _, key in keys]
+        return float(sum(values) / len(values)) if t not in times else values[times.index(t)]
+
+    def setKeyframe(self, plug, time=(), value=None, insert=False):
+        curve = self.curve(plug)
+        if curve is None:
+            curve = self.createNode('animCurveTL', name=plug.replace('.', '_'))
+            self.connectAttr(f'{curve}.output', plug)
+        keys = self.curves[curve]
+        for t in time:
+            t = float(t)
+            if insert:
+                if t not in keys:
+                    keys[t] = [self.evaluate(curve, t), 'fixed', 'fixed']
+            elif t in keys:
+                keys[t][0] = float(value)
+            else:
+                keys[t] = [float(value), self.in_tangent, self.out_tangent]
+
+    def setAttr(self, plug, *values, **kwargs):
+        curve, first, last = re.match(r'(.*)\.ktv\[(\d+):(\d+)\]$', plug).groups()
+        keys = self.sorted_keys(curve)
+        for i, index in enumerate(range(int(first), int(last) + 1)):
+            t, value = float(values[2 * i]), float(values[2 * i + 1])
+            tangents = keys[index][1][1:] if index < len(keys) else ['fixed', 'fixed']
+            if index < len(keys):
+                del self.curves[curve][keys[index][0]]
+            self.curves[curve][t] = [value] + list(tangents)
+
+    def keyTangent(self, curve=None, q=False, g=False, index=(), inTangentType=None, outTangentType=None):
+        if q and g:
+            return [self.in_tangent if inTangentType else self.out_tangent]
+        keys = self.sorted_keys(curve)
+        for first, last in index:
+            for _, key in keys[first:last + 1]:
+                key[1:] = [inTangentType, outTangentType]
+
+
+class FakeShotScene(object):
+    # A scene with one camera, '|cam', moving one unit along x per frame. Opening a scene whose path contains
+    # 'crash' kills the process, like a mayapy worker going down.
+    def __init__(self):
+        self.scene = None
+
+    def commands(self):
+        return {name: getattr(self, name) for name in ('file', 'getAttr', 'listRelatives', 'playbackOptions', 'ls')}
+
+    def file(self, scene, open=False, force=False, prompt=True):
+        if 'crash' in scene:
+            os._exit(3)
+        if not os.path.isfile(scene):
+            raise RuntimeError(f'File not found: {scene}')
+        self.scene = scene
+
+    def getAttr(self, plug, t=None):
+        attribute = plug.rpartition('.')[2]
+        if attribute == 'worldMatrix[0]':
+            return [1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, float(t), 0.0, 0.0, 1.0]
+        return {'rotateOrder': 0, 'focalLength': 35.0}[attribute]
+
+    def listRelatives(self, node, type=None, f=False, **kwargs):
+        return [f'{node}|{node.split("|")[-1]}Shape']
+
+    def playbackOptions(self, q=False, minTime=False, maxTime=False):
+        return 1001.0 if minTime else 1003.0
+
+    def ls(self, node, uuid=False, **kwargs):
+        return [node]
+
+
+def uncached_sampling():
+    # The sample cache watches nodes through the API, which the stubs don't have
+    from CETools.functions.commonFunctions import transform_sample_cache, sample_world_matrices
+    return transform_sample_cache, 'get', lambda node, frames: sample_world_matrices(node, frames, use_cache=False)
+
+
+def install_shot_scene():
+    # Worker initializer for kuper_batch tests, the spawned processes don't run conftest
+    install()
+    import maya.cmds as cmds
+    for name, command in FakeShotScene().commands().items():
+        setattr(cmds, name, command)
+    setattr(*uncached_sampling())
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+import maya.cmds as cmds
+from fake_maya import FakeShotScene, install_shot_scene, uncached_sampling
+from CETools.functions.kuper_batch import export_shot, run_batch
+
+
+@pytest.fixture
+def shot_scene(monkeypatch, tmp_path):
+    for name, command in FakeShotScene().commands().items():
+        monkeypatch.setattr(cmds, name, command, raising=False)
+    monkeypatch.setattr(*uncached_sampling())
+    scene = tmp_path / 'sh010.ma'
+    scene.write_text('')
+    return str(scene)
+
+
+def read_rows(file_path):
+    with open(file_path) as f:
+        lines = f.read().splitlines()
+    return lines[0], np.loadtxt(lines[1:])
+
+
+def test_export_shot(shot_scene, tmp_path):
+    result = export_shot({'name': 'sh010', 'scene': shot_scene, 'cameras': ['|cam'], 'frame_range': [1001, 1003]},
+                         str(tmp_path))
+    assert result['error'] is None
+    header, rows = read_rows(result['path'])
+    assert header.startswith('Axes = frame')
+    # frame, Tz, Tx, Ty, -Ry, Rx, -Rz, focal
+    assert np.allclose(rows, [[f, 0, f, 0, 0, 0, 0, 35] for f in (1001, 1002, 1003)])
+
+
+def test_export_shot_records_errors(shot_scene, tmp_path):
+    result = export_shot({'name': 'sh020', 'scene': str(tmp_path / 'missing.ma'), 'cameras': ['|cam']},
+                         str(tmp_path))
+    assert result['path'] is None
+    assert result['error'].startswith('RuntimeError')
+
+
+def test_run_batch_survives_worker_crash(shot_scene, tmp_path):
+    shots = [{'name': 'sh010', 'scene': shot_scene, 'cameras': ['|cam']},
+             {'name': 'sh020', 'scene': str(tmp_path / 'crash.ma'), 'cameras': ['|cam']}]
+    results = run_batch(shots, str(tmp_path / 'out'), workers=1, initializer=install_shot_scene)
+    assert [r['name'] for r in results] == ['sh010', 'sh020']
+    assert results[0]['error'] is None and results[0]['path']
+    assert 'BrokenProcessPool' in results[1]['error']
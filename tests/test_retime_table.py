@@ -0,0 +1,17 @@
+import numpy as np
+
+from CETools.functions.retime_table import parse_retime_lines
+
+
+def test_trailing_separators():
+    table = parse_retime_lines(['1001,1001.5,\n', '1002,1003,\n', ',1003,1004.5\n'])
+    assert np.array_equal(table, [[1001, 1001.5], [1002, 1003], [1003, 1004.5]])
+
+
+def test_single_value_header_does_not_set_columns():
+    table = parse_retime_lines(['120\n', '# old new\n', '1001 1001\n', '1002\t1001.5\n', '1003 1002 0.5\n'])
+    assert np.array_equal(table, [[1001, 1001], [1002, 1001.5], [1003, 1002]])
+
+
+def test_no_rows():
+    assert parse_retime_lines(['frames\n', '42\n']).shape == (0, 2)
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+import maya.cmds as cmds
+from fake_maya import FakeAnimCurves
+from CETools.functions.commonFunctions import set_keys
+
+
+@pytest.fixture(params=[('auto', 'auto'), ('linear', 'step'), ('spline', 'linear')])
+def fake_curves(request, monkeypatch):
+    fake = FakeAnimCurves(*request.param)
+    for name, command in fake.commands().items():
+        monkeypatch.setattr(cmds, name, command, raising=False)
+    return fake
+
+
+def key_loop(fake, plug, times, values):
+    # What set_keys stands in for, one setKeyframe per key in order
+    for t, v in zip(times, values):
+        fake.setKeyframe(plug, time=(t,), value=v)
+
+
+def test_new_curve_matches_key_loop(fake_curves):
+    times = [1001.0, 1003.0, 1002.0, 1003.0]
+    values = [1.0, 2.0, 3.0, 4.0]
+    set_keys('fast', 'tx', times, values)
+    key_loop(fake_curves, 'reference.tx', times, values)
+    assert fake_curves.curves[fake_curves.curve('fast.tx')] == fake_curves.curves[fake_curves.curve('reference.tx')]
+
+
+def test_existing_curve_matches_key_loop(fake_curves):
+    rng = np.random.default_rng(1)
+    for trial in range(200):
+        fake_curves.curves.clear()
+        fake_curves.inputs.clear()
+        for node in ('fast', 'reference'):
+            key_loop(fake_curves, f'{node}.tx', [1000.0, 1010.0, 1020.0], [0.0, 5.0, -5.0])
+            # Hand edited tangents on existing keys have to survive
+            fake_curves.curves[fake_curves.curve(f'{node}.tx')][1010.0][1:] = ['flat', 'flat']
+
+        for _ in range(3):
+            times = rng.choice(np.arange(995, 1025, 0.5), size=rng.integers(1, 30))
+            values = rng.normal(size=len(times))
+            set_keys('fast', 'tx', times, values)
+            key_loop(fake_curves, 'reference.tx', times, values)
+            assert (fake_curves.curves[fake_curves.curve('fast.tx')] ==
+                    fake_curves.curves[fake_curves.curve('reference.tx')]), trial
@@ -0,0 +1,31 @@
+import struct
+
+from CETools.functions.texture_probe import ImageInfo, probe_many, texture_colorspace, RAW_COLORSPACE, \
+    LINEAR_COLORSPACE, SRGB_COLORSPACE
+from CETools.functions.exr_header import EXR_MAGIC
+
+
+def exr_without_data_window(file_path):
+    with open(file_path, 'wb') as f:
+        f.write(struct.pack('<ii', EXR_MAGIC, 2))
+        f.write(b'compression\0compression\0' + struct.pack('<i', 1) + b'\0')
+        f.write(b'\0')
+
+
+def test_exr_without_data_window_probes_as_none(tmp_path):
+    file_path = str(tmp_path / 'broken.exr')
+    exr_without_data_window(file_path)
+    assert probe_many([file_path], cache_path=None) == {file_path: None}
+
+
+def test_colorspace_from_headers():
+    rgb8 = ImageInfo('png', 2048, 2048, 8, 3, False, False)
+    gray8 = ImageInfo('png', 2048, 2048, 8, 1, False, False)
+    rgb_half = ImageInfo('exr', 2048, 2048, 16, 3, True, True)
+    rgb32 = ImageInfo('tiff', 2048, 2048, 32, 4, False, False)
+    assert texture_colorspace([rgb8, None]) == SRGB_COLORSPACE
+    assert texture_colorspace([gray8]) == RAW_COLORSPACE
+    assert texture_colorspace([rgb8], is_data=True) == RAW_COLORSPACE
+    assert texture_colorspace([rgb8, rgb_half]) == LINEAR_COLORSPACE
+    assert texture_colorspace([rgb32]) == LINEAR_COLORSPACE
+    assert texture_colorspace([None]) == SRGB_COLORSPACE
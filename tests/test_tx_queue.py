@@ -0,0 +1,31 @@
+import os
+import sys
+import time
+
+from CETools.functions.tx_queue import TxConversionQueue
+
+# Writes the partial output straight away, then takes far longer than the test waits
+SLOW_CONVERTER = (sys.executable, '-c', 'import sys, time; open(sys.argv[2], "w").close(); time.sleep(60)',
+                  '{source}', '{output}')
+
+
+def test_abort_kills_converters_and_removes_partials(tmp_path):
+    sources = []
+    for i in range(3):
+        source = tmp_path / f'texture_{i}.png'
+        source.write_bytes(b'')
+        sources.append(str(source))
+
+    queue = TxConversionQueue(SLOW_CONVERTER, workers=1)
+    futures = [queue.submit(source) for source in sources]
+    partial = str(tmp_path / 'texture_0.partial.tx')
+    deadline = time.time() + 10
+    while not (queue.processes and os.path.isfile(partial)) and time.time() < deadline:
+        time.sleep(0.05)
+
+    start = time.time()
+    queue.abort()
+    assert futures[0].result(timeout=10) == (str(tmp_path / 'texture_0.tx'), 'failed')
+    assert all(future.cancelled() for future in futures[1:])
+    assert time.time() - start < 10
+    assert not os.path.exists(partial)
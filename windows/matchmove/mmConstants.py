@@ -60,7 +60,7 @@ SWAPANIM_ICON_CONST = "{}/icons/swapanim.png"
 
 CONES_NAME_CONST = "Cone Generator"
 CONES_DESC_CONST = "Open Cone Generator Toolbox:\nCreates cones at selected objects and stores\nthem in 'Track Cones' group. Cones can be\nscaled linearly or by distance from the camera."
-CONES_WIDTH_CONST = 270
+CONES_WIDTH_CONST = 320
 CONES_HEIGHT_CONST = 75
 CONES_ICON_CONST = "{}/icons/cones.png"
 
@@ -73,7 +73,7 @@ FILMBACK_ICON_CONST = "{}/icons/filmback.png"
 SMOOTHANIM_NAME_CONST = "Smooth Anim"
 SMOOTHANIM_DESC_CONST = "Open Smooth Anim Toolbox:\nSmooth selected keyframes in\nan object's anim curves."
 SMOOTHANIM_WIDTH_CONST = 150
-SMOOTHANIM_HEIGHT_CONST = 110
+SMOOTHANIM_HEIGHT_CONST = 135
 SMOOTHANIM_ICON_CONST = "{}/icons/smoothanim.png"
 
 RENAME_NAME_CONST = "Smart Rename"
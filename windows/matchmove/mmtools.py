@@ -18,9 +18,9 @@ def set_dir(self, filepath="/home", text_field=None, text='', file_type="EXR fil
         print(file_directory)
 
 
-def set_text_field(target):
+def set_text_field(target, multiple=False):
     sel = cmds.ls(sl=1, l=1) or ['']
-    target.setText(sel[0])
+    target.setText(' '.join(sel) if multiple else sel[0])
 
 
 def flip_text_field(target_a, target_b):
@@ -158,7 +158,7 @@ class Retime(Toolkit):
             retime_select.setIcon(self.style().standardIcon(QtWidgets.QStyle.SP_DirLinkIcon))
             retime_select.clicked.connect(
                 lambda x: set_dir(self, retime_dir.text() or self.dir_path or '', retime_dir, 'Select Retime File',
-                                  "ASCII files (*.ascii);; All Files (*.*)"))
+                                  "Retime files (*.ascii *.txt *.csv);; All Files (*.*)"))
             retime_select.setToolTip("Select File")
             top_layout.addWidget(retime_select, 0, 2)
 
@@ -201,13 +201,13 @@ class ZClean(Toolkit):
 
             z_target = QtWidgets.QLineEdit()
             z_target.setSizePolicy(QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.Fixed)
-            top_layout.addWidget(QtWidgets.QLabel("Target Object: "), 1, 0)
+            top_layout.addWidget(QtWidgets.QLabel("Target Objects: "), 1, 0)
             top_layout.addWidget(z_target, 1, 1)
 
             optionsLayout = QtWidgets.QGridLayout()
 
             clean_btn = QtWidgets.QPushButton("zClean")
-            clean_btn.clicked.connect(lambda x: mmf.z_constrain(src_obj=z_host.text(), dest_obj=z_target.text()))
+            clean_btn.clicked.connect(lambda x: mmf.z_constrain(src_obj=z_host.text(), dest_obj=z_target.text().split()))
             clean_btn.setFixedHeight(25)
             optionsLayout.addWidget(clean_btn, 0, 0)
 
@@ -224,10 +224,10 @@ class ZClean(Toolkit):
             top_layout.addWidget(update_cam_btn, 0, 2)
 
             update_object_btn = QtWidgets.QPushButton()
-            update_object_btn.clicked.connect(lambda x: set_text_field(target=z_target))
+            update_object_btn.clicked.connect(lambda x: set_text_field(target=z_target, multiple=True))
             update_object_btn.setIcon(self.style().standardIcon(QtWidgets.QStyle.SP_ArrowLeft))
             update_object_btn.setFixedSize(20, 20)
-            update_object_btn.setToolTip("Update target selection")
+            update_object_btn.setToolTip("Update target selection (all selected objects)")
             top_layout.addWidget(update_object_btn, 1, 2)
 
             # Add to tool box layout
@@ -251,8 +251,10 @@ class SwapAnim(Toolkit):
             self.build_ui()
 
         def run_invert(self, host, target):
-            mmf.invert_anim(host=host.text(), target=target.text())
-            flip_text_field(target_a=host, target_b=target)
+            targets = target.text().split()
+            mmf.invert_anim(host=host.text(), target=targets)
+            if len(targets) == 1:
+                flip_text_field(target_a=host, target_b=target)
 
         def build_ui(self):
             top_layout = QtWidgets.QGridLayout()
@@ -263,7 +265,7 @@ class SwapAnim(Toolkit):
 
             target = QtWidgets.QLineEdit()
             target.setSizePolicy(QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.Fixed)
-            top_layout.addWidget(QtWidgets.QLabel("Target Object: "), 1, 0)
+            top_layout.addWidget(QtWidgets.QLabel("Target Objects: "), 1, 0)
             top_layout.addWidget(target, 1, 1)
 
             options_layout = QtWidgets.QVBoxLayout()
@@ -281,10 +283,10 @@ class SwapAnim(Toolkit):
             top_layout.addWidget(update_anim_object_btn, 0, 2)
 
             update_target_btn = QtWidgets.QPushButton()
-            update_target_btn.clicked.connect(lambda x: set_text_field(target=target))
+            update_target_btn.clicked.connect(lambda x: set_text_field(target=target, multiple=True))
             update_target_btn.setIcon(self.style().standardIcon(QtWidgets.QStyle.SP_ArrowLeft))
             update_target_btn.setFixedSize(20, 20)
-            update_target_btn.setToolTip("Update target selection")
+            update_target_btn.setToolTip("Update target selection (all selected objects)")
             top_layout.addWidget(update_target_btn, 1, 2)
 
             swap_btn = QtWidgets.QPushButton()
@@ -358,10 +360,15 @@ class ConeGenerator(Toolkit):
             cone_scale_layout.addWidget(cam_cone_scale, 0, 5)
 
             cone_scale = QtWidgets.QPushButton("CAM")
-            cone_scale.clicked.connect(lambda x: mmf.cam_depth(size=cam_cone_scale.value()))
+            cone_scale.clicked.connect(lambda x: mmf.cam_depth(size=cam_cone_scale.value(),
+                                                               animate=cam_cone_animate.isChecked()))
             cone_scale.setFixedSize(40, 25)
             cone_scale_layout.addWidget(cone_scale, 0, 6)
 
+            cam_cone_animate = QtWidgets.QCheckBox("Anim")
+            cam_cone_animate.setToolTip("Key the camera distance scale on every frame of the playback range.")
+            cone_scale_layout.addWidget(cam_cone_animate, 0, 7)
+
             # Add to tool box layout
             self.tool_layout.addLayout(cone_top_layout, 0, 0)
             self.tool_layout.addLayout(cone_scale_layout, 1, 0)
@@ -435,7 +442,8 @@ class SmoothAnim(Toolkit):
             self.smoothZBtn = QtWidgets.QPushButton("Smooth")
             self.smoothZBtn.clicked.connect(
                 lambda x: mmf.z_smooth(samples=smoothSamples.value(), rate=smoothRate.value(),
-                                       iterations=smoothIterations.value()))
+                                       iterations=smoothIterations.value(),
+                                       kernel=smoothKernel.currentData()))
             self.smoothZBtn.setFixedHeight(25)
             self.smoothTopLayout.addWidget(self.smoothZBtn, 0, 3)
 
@@ -461,6 +469,15 @@ class SmoothAnim(Toolkit):
             self.smoothOptionLayout.addWidget(label, 2, 0)
             self.smoothOptionLayout.addWidget(smoothIterations, 2, 1)
 
+            label = QtWidgets.QLabel("Kernel:")
+            label.setToolTip("Weighting applied to the sampled values.")
+            smoothKernel = QtWidgets.QComboBox()
+            smoothKernel.addItem("Average", 'average')
+            smoothKernel.addItem("Gaussian", 'gaussian')
+            smoothKernel.addItem("Savitzky-Golay", 'savgol')
+            self.smoothOptionLayout.addWidget(label, 3, 0)
+            self.smoothOptionLayout.addWidget(smoothKernel, 3, 1)
+
             ## Add to tool box layout
             self.toolLayout.addLayout(self.smoothTopLayout, 1, 0)
             self.toolLayout.addLayout(self.smoothOptionLayout, 0, 0)